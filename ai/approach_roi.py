@@ -0,0 +1,243 @@
+"""
+ai/approach_roi.py — Per-approach counting inside lane polygons
+---------------------------------------------------------------
+A camera watching an intersection sees both the N-S and E-W approaches,
+plus footpaths, parked cars and buildings.  The simulation and
+MLPredictor.record() want NS and EW counts and queues separately, so each
+camera gets a JSON file of approach polygons:
+
+    {
+      "camera": "junction_cam",
+      "approaches": {
+        "ns": [[[0.42, 0.00], [0.58, 0.00], [0.58, 0.40], [0.42, 0.40]],
+               [[0.42, 0.60], [0.58, 0.60], [0.58, 1.00], [0.42, 1.00]]],
+        "ew": [[[0.00, 0.42], [0.40, 0.42], [0.40, 0.58], [0.00, 0.58]],
+               [[0.60, 0.42], [1.00, 0.42], [1.00, 0.58], [0.60, 0.58]]]
+      }
+    }
+
+Coordinates are fractions of the frame width/height, so one file serves
+any resolution.  An approach may have several polygons (the arms either
+side of the junction).
+
+Detection only runs on crops around the polygons.  When the polygons
+cover most of their joint bounding box a single crop is used, otherwise
+one crop per polygon.  A box belongs to the approach whose polygon
+contains its bottom-centre point (where the vehicle meets the road).
+The test is vectorised ray casting over all boxes × polygon edges.  Boxes
+from a polygon's own crop are only tested against that polygon, so
+overlapping crops never double count.
+
+A detector letterboxes every input to one imgsz × imgsz square, so each
+crop would cost as much as a full frame.  For detectors the crops are
+instead packed (shelf packing, MOSAIC_GAP px of grey between them) into
+one mosaic per frame: a single forward pass, at a higher scale than the
+full frame would get.  When the mosaic's longest side would exceed the
+frame's, no mosaic is planned (mosaic_size is None) and callers detect
+on the full frame and assign() the boxes.  MOG2 costs scale with pixels,
+so it keeps running on the individual crops.
+
+A vehicle is "queued" when its anchor moved less than stop_px since the
+previous frame (nearest-neighbour match, vectorised).  This needs no
+tracker.
+"""
+
+import json
+
+import numpy as np
+
+APPROACHES   = ("ns", "ew")
+MERGE_RATIO  = 0.6     # single crop when polygons fill ≥60 % of their joint bbox
+MOSAIC_GAP   = 32      # px of padding between packed crops
+PAD_VALUE    = 114     # letterbox grey, as in ai/detector_backend.py
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Even-odd ray casting for (N, 2) points against one (M, 2) polygon → (N,) bool."""
+    if len(points) == 0:
+        return np.zeros(0, dtype=bool)
+    x, y   = points[:, 0:1], points[:, 1:2]                 # (N, 1)
+    x1, y1 = polygon[:, 0], polygon[:, 1]                   # (M,)
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    spans  = (y1 > y) != (y2 > y)                           # (N, M)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(spans & (x < x_cross), axis=1) % 2 == 1
+
+
+def anchors(xyxy: np.ndarray) -> np.ndarray:
+    """Bottom-centre point of each (x1, y1, x2, y2) box."""
+    xyxy = np.asarray(xyxy, dtype=float).reshape(-1, 4)
+    return np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2, xyxy[:, 3]], axis=1)
+
+
+class ApproachROIs:
+    """Approach polygons for one camera, resolved to pixels for a frame size."""
+
+    def __init__(self, approaches: dict, camera: str = "camera"):
+        unknown = set(approaches) - set(APPROACHES)
+        if unknown:
+            raise ValueError(f"Unknown approaches {sorted(unknown)}; expected {APPROACHES}")
+        self.camera   = camera
+        self.names: list[str] = []                       # approach of each polygon
+        self.norm:  list[np.ndarray] = []
+        for name in APPROACHES:
+            for poly in approaches.get(name, []):
+                poly = np.asarray(poly, dtype=float)
+                if poly.ndim != 2 or poly.shape[1] != 2 or len(poly) < 3:
+                    raise ValueError(f"{name}: polygon needs ≥3 (x, y) points")
+                self.names.append(name)
+                self.norm.append(poly)
+        self.size     = None
+        self.polygons: list[np.ndarray] = []
+        self.crops:    list[tuple]      = []             # (x0, y0, x1, y1, polygon indices)
+        self.tiles:    list[tuple]      = []             # mosaic (x, y) of each crop
+        self.mosaic_size: tuple | None  = None           # (w, h), None = use full frames
+
+    @classmethod
+    def load(cls, path: str) -> "ApproachROIs":
+        with open(path) as f:
+            cfg = json.load(f)
+        return cls(cfg["approaches"], cfg.get("camera", "camera"))
+
+    def resolve(self, width: int, height: int) -> "ApproachROIs":
+        """Convert to pixel polygons and plan the crops for this frame size."""
+        if self.size == (width, height):
+            return self
+        self.size     = (width, height)
+        scale         = np.array([width, height], dtype=float)
+        self.polygons = [p * scale for p in self.norm]
+
+        def bbox(poly):
+            x0, y0 = np.floor(poly.min(axis=0)).astype(int)
+            x1, y1 = np.ceil(poly.max(axis=0)).astype(int)
+            return max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+
+        boxes = [bbox(p) for p in self.polygons]
+        joint = bbox(np.concatenate(self.polygons))
+        area  = lambda b: max(b[2] - b[0], 0) * max(b[3] - b[1], 0)        # noqa: E731
+        if sum(area(b) for b in boxes) >= MERGE_RATIO * area(joint):
+            self.crops = [(*joint, list(range(len(boxes))))]
+        else:
+            self.crops = [(*b, [i]) for i, b in enumerate(boxes)]
+        self._plan_mosaic()
+        return self
+
+    def _plan_mosaic(self):
+        """Shelf-pack the crops, trying shelf widths for the smallest longest side."""
+        sizes = [(x1 - x0, y1 - y0) for x0, y0, x1, y1, _ in self.crops]
+        order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+        best  = None
+        for limit in sorted({sum(w for w, _ in sizes[:k]) for k in range(1, len(sizes) + 1)}
+                            | {max(w for w, _ in sizes)}):
+            limit += MOSAIC_GAP * (len(sizes) - 1)
+            tiles, x, y, shelf_h, width = [None] * len(sizes), 0, 0, 0, 0
+            for i in order:
+                w, h = sizes[i]
+                if x and x + w > limit:                  # start a new shelf
+                    x, y, shelf_h = 0, y + shelf_h + MOSAIC_GAP, 0
+                tiles[i] = (x, y)
+                width    = max(width, x + w)
+                x       += w + MOSAIC_GAP
+                shelf_h  = max(shelf_h, h)
+            size = (width, y + shelf_h)
+            if best is None or (max(size), size[0] * size[1]) < (max(best[1]), best[1][0] * best[1][1]):
+                best = (tiles, size)
+        self.tiles, self.mosaic_size = best
+        if max(self.mosaic_size) > max(self.size):
+            self.tiles, self.mosaic_size = [], None
+
+    def mosaic(self, frame: np.ndarray) -> np.ndarray:
+        """All crops of `frame` packed into one canvas, for one detector pass."""
+        h, w = frame.shape[:2]
+        self.resolve(w, h)
+        mw, mh = self.mosaic_size
+        canvas = np.full((mh, mw) + frame.shape[2:], PAD_VALUE, dtype=frame.dtype)
+        for (x0, y0, x1, y1, _), (tx, ty) in zip(self.crops, self.tiles):
+            canvas[ty:ty + y1 - y0, tx:tx + x1 - x0] = frame[y0:y1, x0:x1]
+        return canvas
+
+    def merge_mosaic_detections(self, xyxy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Mosaic-coordinate boxes → frame-coordinate boxes inside an approach
+        and their approach ids.  A box belongs to the tile holding its
+        anchor and is clipped to that tile.
+        """
+        xyxy = np.asarray(xyxy, dtype=float).reshape(-1, 4)
+        pts  = anchors(xyxy)
+        per_crop = []
+        for (x0, y0, x1, y1, _), (tx, ty) in zip(self.crops, self.tiles):
+            w, h   = x1 - x0, y1 - y0
+            inside = ((pts[:, 0] >= tx) & (pts[:, 0] < tx + w)
+                      & (pts[:, 1] >= ty) & (pts[:, 1] <= ty + h))
+            local  = xyxy[inside] - [tx, ty, tx, ty]
+            per_crop.append(np.clip(local, 0, [w, h, w, h]))
+        return self.merge_crop_detections(per_crop)
+
+    def mosaic_gain(self) -> float:
+        """Detector scale on the mosaic relative to a full-frame pass (both letterboxed)."""
+        return max(self.size) / max(self.mosaic_size)
+
+    def crop(self, frame: np.ndarray) -> list[np.ndarray]:
+        h, w = frame.shape[:2]
+        self.resolve(w, h)
+        return [frame[y0:y1, x0:x1] for x0, y0, x1, y1, _ in self.crops]
+
+    def crop_fraction(self) -> float:
+        """Pixels in the crops relative to the full frame (the MOG2 cost)."""
+        w, h = self.size
+        return sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1, _ in self.crops) / (w * h)
+
+    def assign(self, xyxy: np.ndarray, candidates=None) -> np.ndarray:
+        """
+        Approach index into APPROACHES for each box (-1 = outside every
+        polygon).  candidates limits which polygons are tested.
+        """
+        pts = anchors(xyxy)
+        out = np.full(len(pts), -1, dtype=int)
+        for i in (candidates if candidates is not None else range(len(self.polygons))):
+            inside = points_in_polygon(pts, self.polygons[i]) & (out < 0)
+            out[inside] = APPROACHES.index(self.names[i])
+        return out
+
+    def merge_crop_detections(self, per_crop: list) -> tuple[np.ndarray, np.ndarray]:
+        """
+        per_crop: one (N_i, 4) xyxy array per crop, in crop coordinates.
+        Returns frame-coordinate boxes inside an approach and their approach ids.
+        """
+        boxes, labels = [], []
+        for (x0, y0, _, _, polys), xyxy in zip(self.crops, per_crop):
+            xyxy = np.asarray(xyxy, dtype=float).reshape(-1, 4) + [x0, y0, x0, y0]
+            lab  = self.assign(xyxy, polys)
+            keep = lab >= 0
+            boxes.append(xyxy[keep])
+            labels.append(lab[keep])
+        if not boxes:
+            return np.zeros((0, 4)), np.zeros(0, dtype=int)
+        return np.concatenate(boxes), np.concatenate(labels)
+
+
+class ApproachCounter:
+    """Per-approach counts and stopped-vehicle queues in MLPredictor.record() form."""
+
+    def __init__(self, stop_px: float = 3.0):
+        self.stop_px = stop_px
+        self._prev   = np.zeros((0, 2))
+
+    def update(self, xyxy: np.ndarray, labels: np.ndarray) -> dict:
+        """Returns {"ns_count", "ew_count", "ns_queue", "ew_queue"}."""
+        pts = anchors(xyxy)
+        if len(pts) and len(self._prev):
+            dist    = np.linalg.norm(pts[:, None, :] - self._prev[None, :, :], axis=2)
+            stopped = dist.min(axis=1) < self.stop_px
+        else:
+            stopped = np.zeros(len(pts), dtype=bool)
+        self._prev = pts
+
+        counts = np.bincount(labels, minlength=len(APPROACHES))
+        queues = np.bincount(labels[stopped], minlength=len(APPROACHES))
+        out = {}
+        for i, name in enumerate(APPROACHES):
+            out[f"{name}_count"] = int(counts[i])
+            out[f"{name}_queue"] = int(queues[i])
+        return out
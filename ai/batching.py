@@ -0,0 +1,88 @@
+"""
+ai/batching.py — Batch-size selection for multi-frame inference
+---------------------------------------------------------------
+One inference call over N frames amortises per-call overhead (pre/post
+processing dispatch, thread-pool wake-ups) and keeps CPU vector units
+busy, but it also makes the first frame of the batch wait for the last.
+BatchSizer picks the size with the best per-frame cost whose batch
+latency stays under a cap.
+
+Auto mode doubles the batch (1, 2, 4, …) while per-frame time improves by
+at least MIN_GAIN and the batch still fits the cap, then settles on the
+best size seen.  If latency later exceeds the cap (e.g. the CPU gets
+busier) it halves and re-settles.
+"""
+
+import time
+
+MIN_GAIN       = 0.05   # growing must cut per-frame time by ≥5 %
+PROBE_BATCHES  = 3      # batches measured per candidate size
+
+
+class BatchSizer:
+    """Fixed or auto-tuned batch size under a latency cap."""
+
+    def __init__(self, batch_size: int = 0, max_batch: int = 16, latency_cap_ms: float = 250.0):
+        """batch_size > 0 pins the size; 0 auto-tunes up to max_batch."""
+        self.auto       = batch_size <= 0
+        self.max_batch  = max_batch
+        self.cap_s      = latency_cap_ms / 1000
+        self.current    = 1 if self.auto else batch_size
+        self.settled    = not self.auto
+        self.per_frame: dict[int, float] = {}      # size → mean seconds/frame
+        self._samples: list[float] = []
+
+    def observe(self, n_frames: int, seconds: float):
+        """Report one batch: how many frames it held and how long inference took."""
+        if not self.auto or n_frames < self.current:
+            return                                 # short tail batches say little
+        if self.settled:
+            if seconds > self.cap_s and self.current > 1:
+                self.current //= 2
+                self.per_frame.clear()
+                self._samples.clear()
+                self.settled = False
+            return
+
+        self._samples.append(seconds)
+        if len(self._samples) < PROBE_BATCHES:
+            return
+        batch_s = sorted(self._samples)[len(self._samples) // 2]     # median
+        self._samples.clear()
+        self.per_frame[self.current] = batch_s / self.current
+
+        prev = self.per_frame.get(self.current // 2)
+        improved = prev is None or self.per_frame[self.current] < prev * (1 - MIN_GAIN)
+        can_grow = self.current * 2 <= self.max_batch and batch_s * 2 <= self.cap_s
+        if improved and batch_s <= self.cap_s and can_grow:
+            self.current *= 2
+            return
+        self.current = min(
+            (s for s in self.per_frame if s * self.per_frame[s] <= self.cap_s),
+            key=self.per_frame.get, default=1,
+        )
+        self.settled = True
+
+
+def measure_throughput(infer_batch, frames: list, batch_sizes: list,
+                       repeats: int = 3) -> list[dict]:
+    """
+    Time infer_batch over `frames` at each batch size.
+    Returns [{"batch", "fps", "batch_ms"}] using the best of `repeats` runs.
+    """
+    rows = []
+    for b in batch_sizes:
+        infer_batch(frames[:b])                    # warm-up
+        best = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            for i in range(0, len(frames) - b + 1, b):
+                infer_batch(frames[i:i + b])
+            best = min(best, time.perf_counter() - t0)
+        n_done = (len(frames) // b) * b
+        rows.append({
+            "batch":    b,
+            "fps":      round(n_done / best, 1),
+            "batch_ms": round(best / max(len(frames) // b, 1) * 1000, 2),
+        })
+    return rows
@@ -0,0 +1,176 @@
+"""
+ai/count_bridge.py — Live detection → simulation counts over shared memory
+--------------------------------------------------------------------------
+Detection publishes one fixed-size record per processed frame into a ring
+buffer in a named multiprocessing.shared_memory block.  The simulation
+(another thread or process on the same host) polls it every tick.  There
+are no files, sockets or pickling, and a record is never seen half-written:
+
+    header   head (uint64)   records published so far
+             capacity (uint64)
+    slots    RECORD_DTYPE × capacity
+
+Each slot is guarded like a seqlock.  The writer zeroes the slot's seq,
+fills the fields, then stores seq = n + 1 and bumps head.  A reader copies
+the slot and keeps it only if seq still reads n + 1, so a slot that was
+being rewritten underneath it counts as lost and is never returned half
+done.  Readers keep their own cursor; one that falls more than capacity
+records behind skips to the oldest slot still intact and counts the rest
+as lost.
+
+There is one writer per ring.  MultiStreamDetector already funnels every
+camera through a single emit callback, so one process can publish for
+many cameras (the camera field).
+
+t_frame is time.monotonic() when the frame left the decoder.  On Linux
+that clock is system-wide, so a consumer can compute frame → decision
+latency across processes.
+"""
+
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+DEFAULT_NAME = "smart_traffic_counts"
+CAPACITY     = 256
+NO_VALUE     = -1        # count / queue fields the detector did not measure
+
+RECORD_DTYPE = np.dtype([
+    ("seq",      np.uint64),
+    ("t_frame",  np.float64),
+    ("t_pub",    np.float64),
+    ("camera",   np.int32),
+    ("frame",    np.int32),
+    ("count",    np.int32),
+    ("ns_count", np.int32),
+    ("ew_count", np.int32),
+    ("ns_queue", np.int32),
+    ("ew_queue", np.int32),
+    ("has_rates", np.int32),
+    ("rate_sb",  np.float32),
+    ("rate_nb",  np.float32),
+    ("rate_wb",  np.float32),
+    ("rate_eb",  np.float32),
+])
+_HEADER = 16
+_created: set[str] = set()          # rings this process owns
+_FIELDS = [n for n in RECORD_DTYPE.names if n != "seq"]
+
+
+class CountBridge:
+    """Shared-memory ring of per-frame count records."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm   = shm
+        self.owner = owner
+        self._head = np.ndarray(2, dtype=np.uint64, buffer=shm.buf)
+        self.capacity = int(self._head[1])
+        self.slots = np.ndarray(self.capacity, dtype=RECORD_DTYPE, buffer=shm.buf, offset=_HEADER)
+
+    @classmethod
+    def create(cls, name: str = DEFAULT_NAME, capacity: int = CAPACITY) -> "CountBridge":
+        """New ring (replacing a stale one left by a crashed run)."""
+        size = _HEADER + capacity * RECORD_DTYPE.itemsize
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        np.ndarray(2, dtype=np.uint64, buffer=shm.buf)[1] = capacity
+        _created.add(name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = DEFAULT_NAME) -> "CountBridge":
+        """Open an existing ring; FileNotFoundError until its creator has started."""
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _created:
+            # Only the creator may unlink; stop this process's tracker from doing so at exit
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def head(self) -> int:
+        return int(self._head[0])
+
+    def publish(self, rec: dict, t_frame: float | None = None, camera: int = 0):
+        """
+        Write one record: any of count, ns_count, ew_count, ns_queue,
+        ew_queue, frame and rate_sb/nb/wb/eb (e.g. a detect_video count
+        record).  Missing counts are stored as NO_VALUE.
+        """
+        n    = self.head
+        slot = self.slots[n % self.capacity:n % self.capacity + 1]
+        slot["seq"] = 0                                          # invalidate while writing
+        slot["t_frame"] = time.monotonic() if t_frame is None else t_frame
+        slot["camera"]  = camera
+        for key in ("frame", "count", "ns_count", "ew_count", "ns_queue", "ew_queue"):
+            slot[key] = rec.get(key, NO_VALUE)
+        has_rates = "rate_sb" in rec
+        slot["has_rates"] = has_rates
+        for key in ("rate_sb", "rate_nb", "rate_wb", "rate_eb"):
+            slot[key] = rec.get(key, 0.0)
+        slot["t_pub"] = time.monotonic()
+        slot["seq"]   = n + 1
+        self._head[0] = n + 1
+
+    def reader(self, from_start: bool = False) -> "BridgeReader":
+        return BridgeReader(self, 0 if from_start else self.head)
+
+    def close(self):
+        self.slots = self._head = None
+        self.shm.close()
+        if self.owner:
+            _created.discard(self.shm.name)
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BridgeReader:
+    """
+    One consumer's cursor into a CountBridge.  Built with a name instead
+    of a bridge, it attaches on the first poll() after the publisher has
+    created the ring, and returns [] until then.
+    """
+
+    def __init__(self, bridge: CountBridge | None = None, cursor: int = 0,
+                 name: str = DEFAULT_NAME):
+        self.bridge = bridge
+        self.name   = name
+        self.cursor = cursor
+        self.lost   = 0
+
+    def poll(self) -> list[dict]:
+        """Records published since the last poll, oldest first."""
+        if self.bridge is None:
+            try:
+                self.bridge = CountBridge.attach(self.name)
+            except FileNotFoundError:
+                return []
+            self.cursor = self.bridge.head
+        b    = self.bridge
+        head = b.head
+        if head - self.cursor > b.capacity:
+            self.lost  += head - self.cursor - b.capacity
+            self.cursor = head - b.capacity
+        out = []
+        for n in range(self.cursor, head):
+            rec = b.slots[n % b.capacity].copy()
+            if int(b.slots[n % b.capacity]["seq"]) != n + 1 or int(rec["seq"]) != n + 1:
+                self.lost += 1                                     # overwritten mid-read
+                continue
+            out.append({k: rec[k].item() for k in _FIELDS})
+        self.cursor = head
+        return out
@@ -0,0 +1,62 @@
+"""
+ai/count_sink.py — Streamed per-frame vehicle counts
+----------------------------------------------------
+Writes one record per processed frame to CSV or JSON Lines (chosen by
+file extension: .jsonl / .ndjson → JSON Lines, anything else → CSV), so a
+headless detector leaves a machine-readable trace instead of an
+annotated video.  Rows are flushed every FLUSH_EVERY records, keeping the
+file tail-able while a long run is in progress.
+
+Usage:
+    from ai.count_sink import CountSink
+    with CountSink("data/counts.csv") as sink:
+        sink.write({"frame": 0, "t": 0.0, "count": 4})
+"""
+
+import os
+import csv
+import json
+import threading
+
+
+class CountSink:
+    """Thread-safe CSV / JSONL writer for count records."""
+
+    FLUSH_EVERY = 100
+
+    def __init__(self, path: str):
+        self.path   = path
+        self.format = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file    = open(path, "w", newline="")
+        self._writer  = None
+        self._pending = 0
+        self._lock    = threading.Lock()
+        self.records  = 0
+
+    def write(self, record: dict):
+        with self._lock:
+            if self.format == "jsonl":
+                self._file.write(json.dumps(record) + "\n")
+            else:
+                if self._writer is None:
+                    self._writer = csv.DictWriter(self._file, fieldnames=list(record))
+                    self._writer.writeheader()
+                self._writer.writerow(record)
+            self.records  += 1
+            self._pending += 1
+            if self._pending >= self.FLUSH_EVERY:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
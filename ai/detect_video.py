@@ -8,22 +8,61 @@ Changes over original:
   • Overlays live vehicle count + signal recommendation on frame
   • Exposes run(video_path) so run.py CLI can call it directly
   • Press Q to quit early
+  • Threaded decode → inference → annotate/encode pipeline with bounded
+    queues and per-stage timing (see ai/video_pipeline.py)
+  • --batch N runs YOLO on N frames per call (--batch 0 auto-tunes the size
+    under --latency-cap-ms; see ai/batching.py)
+  • --sources a.mp4 b.mp4 0 … runs several cameras against one shared model
+    and prints per-stream counts (see ai/multi_stream.py)
+  • --headless skips the GUI; --no-video / --write-every k / --proxy-scale s
+    make the annotated video optional, sparse or downscaled, and
+    --counts-out streams per-frame counts to CSV or JSONL (ai/count_sink.py)
+  • --motion-gate runs YOLO only when a downscaled MOG2 mask shows motion
+    (or every --gate-max-interval frames); counts carry forward otherwise
+    (see ai/motion_gate.py)
+  • --sample-every S reads one frame per S seconds of footage via grab()/seek,
+    optionally adapting the interval to traffic (see ai/frame_sampler.py)
+  • --rois cam.json detects only inside per-approach lane polygons (their
+    crops packed into one mosaic per frame for the detector) and
+    reports NS/EW counts and queues (see ai/approach_roi.py); if the file
+    has "stop_lines", vehicles are tracked and counted once as they cross
+    them, with per-direction arrival rates (see ai/line_counter.py)
+  • --bridge NAME publishes every frame's counts to a shared-memory ring
+    that a live simulation polls (see ai/count_bridge.py)
+  • --cache DIR stores raw detections of a full run on disk and replays
+    them on later runs, without the model or decoding (see
+    ai/detection_cache.py); ROIs, stop lines and sampling apply on replay
+  • --backend torch | onnx | onnx-int8 | auto picks the detector runtime;
+    the ONNX Runtime paths export/cache the model under models/ and run
+    their own letterbox + NMS (see ai/detector_backend.py)
+  • Without a detector, the MOG2 fallback works on a grey pyramid-downscaled
+    frame (or the ROI crops) with morphological cleanup and a blob cutoff
+    relative to frame size; boxes are mapped back to full resolution
+    (see ai/fast_mog2.py)
 """
 
 import cv2
 import os
 import sys
+import json
 import argparse
+import numpy as np
 from datetime import datetime
 
-# ── Try importing ultralytics (YOLOv8) ──────────────────────────────────────
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
-    print("⚠️  ultralytics not installed. Falling back to OpenCV background subtraction.")
-    print("   Install with: pip install ultralytics")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.video_pipeline import run_pipeline, StampedCapture
+from ai.batching       import BatchSizer
+from ai.multi_stream   import MultiStreamDetector
+from ai.count_sink     import CountSink
+from ai.motion_gate    import MotionGate, gated
+from ai.fast_mog2      import FastMOG2
+from ai.frame_sampler  import StrideSampler
+from ai.approach_roi   import ApproachROIs, ApproachCounter, APPROACHES
+from ai.line_counter   import LineCrossingCounter
+from ai.detector_backend import load_backend, resolve_backend, parse_ultralytics, BACKENDS
+from ai.detection_cache import DetectionCache, model_tag
+from ai.count_bridge   import CountBridge
 
 # ── Constants ────────────────────────────────────────────────────────────────
 VEHICLE_CLASSES   = [2, 3, 5, 7]   # COCO: car, motorcycle, bus, truck
@@ -42,82 +81,222 @@ def _get_signal_recommendation(count: int) -> tuple[str, tuple]:
         return "HIGH TRAFFIC — Extended green (60s)", (0, 0, 220)
 
 
-def _detect_yolo(cap, out, model):
-    """Main detection loop using YOLOv8."""
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        results = model(frame, verbose=False)[0]
-        count   = 0
-
-        for box in results.boxes:
-            cls  = int(box.cls[0])
-            conf = float(box.conf[0])
-            if cls in VEHICLE_CLASSES and conf >= CONFIDENCE:
-                count += 1
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                label = f"{results.names[cls]} {conf:.2f}"
-                cv2.putText(frame, label, (x1, y1 - 6),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-
-        # Overlay HUD
-        sig_text, sig_color = _get_signal_recommendation(count)
-        cv2.rectangle(frame, (0, 0), (500, 60), (20, 20, 20), -1)
-        cv2.putText(frame, f"Vehicles: {count}", (10, 22),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        cv2.putText(frame, sig_text, (10, 48),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, sig_color, 2)
-
-        if out:
-            out.write(frame)
-        cv2.imshow("SmartTrafficSystem — Vehicle Detection", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            print("\n⏹  Detection stopped by user.")
-            break
-
-
-def _detect_background_subtraction(cap, out):
+def _parse_yolo(results) -> tuple:
+    """Vehicle boxes from one YOLO result: (xyxy int (N,4), classes (N,), confs (N,))."""
+    return parse_ultralytics(results, CONFIDENCE, VEHICLE_CLASSES)
+
+
+def _draw_hud(frame, label: str, count: int, width: int = 500):
+    sig_text, sig_color = _get_signal_recommendation(count)
+    cv2.rectangle(frame, (0, 0), (width, 60), (20, 20, 20), -1)
+    cv2.putText(frame, f"{label}: {count}", (10, 22),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    cv2.putText(frame, sig_text, (10, 48),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.55, sig_color, 2)
+
+
+def _annotate_yolo(frame, detections, names: dict):
+    xyxy, cls, conf = detections
+    for (x1, y1, x2, y2), c, p in zip(xyxy, cls, conf):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{names[c]} {p:.2f}", (x1, y1 - 6),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+    _draw_hud(frame, "Vehicles", len(cls))
+
+
+def _yolo_batch(model, frames: list) -> list:
+    """One detector call over several frames; parsed results in input order."""
+    if hasattr(model, "detect"):                    # ai.detector_backend backend
+        return model.detect(frames)
+    return [_parse_yolo(r) for r in model(frames, verbose=False)]
+
+
+def _detect_yolo(cap, out, model, window="SmartTrafficSystem — Vehicle Detection",
+                 batcher: BatchSizer | None = None, gate: MotionGate | None = None,
+                 rois: ApproachROIs | None = None, record=None, **pipeline_kw):
+    """
+    Main detection loop using YOLOv8, as a decode → infer → annotate/encode pipeline.
+    record(dets) receives every frame's raw full-frame detections, in
+    order; ROIs are then applied to full-frame boxes instead of crops.
+    """
+    names = model.names
+    if record is not None:
+        def detect(frames):
+            dets = _yolo_batch(model, frames)
+            for d in dets:
+                record(d)
+            return dets
+    else:
+        detect = lambda frames: _yolo_batch(model, frames)                      # noqa: E731
+    if rois is not None and (record is not None or rois.mosaic_size is None):
+        assign   = _roi_assign(rois)
+        infer    = lambda frames: [assign(d) for d in detect(frames)]           # noqa: E731
+        annotate = lambda frame, res: _annotate_roi(frame, res, rois)           # noqa: E731
+    elif rois is not None:
+        infer    = _roi_mosaic_infer(lambda mosaics: [d[0] for d in _yolo_batch(model, mosaics)], rois)
+        annotate = lambda frame, res: _annotate_roi(frame, res, rois)           # noqa: E731
+    else:
+        infer    = detect
+        annotate = lambda frame, dets: _annotate_yolo(frame, dets, names)       # noqa: E731
+    if gate is not None:
+        infer = gated(infer, gate)
+    return run_pipeline(
+        cap,
+        infer_batch=infer,
+        annotate=annotate,
+        out=out, window=window, batcher=batcher, **pipeline_kw,
+    )
+
+
+def _annotate_mog2(frame, boxes):
+    for x, y, w, h in boxes:
+        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+    _draw_hud(frame, "Vehicles (approx)", len(boxes), width=480)
+
+
+def _detect_background_subtraction(cap, out,
+                                   window="SmartTrafficSystem — Vehicle Detection (Fallback)",
+                                   rois: ApproachROIs | None = None, **pipeline_kw):
     """Fallback: simple MOG2 background subtraction if YOLO unavailable."""
-    fgbg = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=50)
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        fgmask  = fgbg.apply(frame)
-        _, thresh = cv2.threshold(fgmask, 200, 255, cv2.THRESH_BINARY)
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        count = 0
-        for c in contours:
-            if cv2.contourArea(c) > 1500:
-                count += 1
-                x, y, w, h = cv2.boundingRect(c)
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-
-        sig_text, sig_color = _get_signal_recommendation(count)
-        cv2.rectangle(frame, (0, 0), (480, 60), (20, 20, 20), -1)
-        cv2.putText(frame, f"Vehicles (approx): {count}", (10, 22),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        cv2.putText(frame, sig_text, (10, 48),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, sig_color, 2)
-
-        if out:
-            out.write(frame)
-        cv2.imshow("SmartTrafficSystem — Vehicle Detection (Fallback)", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            print("\n⏹  Detection stopped by user.")
-            break
-
-
-def run(video_path: str):
-    """Entry point called by run.py or directly."""
+    if rois is not None:
+        # One subtractor per crop; crops are fixed once rois is resolved,
+        # and each is scaled and thresholded relative to the full frame
+        bank = []
+
+        def detect_crops(crops):
+            if not bank:
+                bank.extend(FastMOG2(frame_size=rois.size) for _ in crops)
+            out = []
+            for i, crop in enumerate(crops):
+                b = bank[i % len(bank)](crop)
+                b[:, 2:] += b[:, :2]                     # xywh → xyxy
+                out.append(b)
+            return out
+
+        return run_pipeline(
+            cap,
+            infer_batch=_roi_infer(detect_crops, rois),
+            annotate=lambda frame, res: _annotate_roi(frame, res, rois),
+            out=out, window=window, **pipeline_kw,
+        )
+
+    return run_pipeline(
+        cap,
+        infer=FastMOG2(),
+        annotate=_annotate_mog2,
+        out=out, window=window, **pipeline_kw,
+    )
+
+
+# ── Per-approach ROIs ────────────────────────────────────────────────────────
+APPROACH_COLOURS = [(255, 160, 0), (0, 160, 255)]     # BGR for ns, ew
+
+
+def _roi_infer(detect_crops, rois: ApproachROIs, counter: ApproachCounter | None = None):
+    """
+    Build infer_batch(frames) → [(xyxy, approach_ids, counts)] that runs
+    detect_crops(crops) → [xyxy per crop] on the ROI crops of every frame
+    in one call and maps boxes back to frame coordinates and approaches.
+    """
+    counter = counter or ApproachCounter()
+
+    def infer_batch(frames: list) -> list:
+        per_frame = [rois.crop(f) for f in frames]
+        boxes     = iter(detect_crops([c for crops in per_frame for c in crops]))
+        results   = []
+        for crops in per_frame:
+            xyxy, labels = rois.merge_crop_detections([next(boxes) for _ in crops])
+            results.append((xyxy.astype(int), labels, counter.update(xyxy, labels)))
+        return results
+
+    return infer_batch
+
+
+def _roi_mosaic_infer(detect, rois: ApproachROIs, counter: ApproachCounter | None = None):
+    """
+    As _roi_infer, for letterboxing detectors: each frame's crops are packed
+    into one mosaic, so detect(mosaics) → [xyxy per mosaic] makes a single
+    forward pass per frame.
+    """
+    counter = counter or ApproachCounter()
+
+    def infer_batch(frames: list) -> list:
+        results = []
+        for dets in detect([rois.mosaic(f) for f in frames]):
+            xyxy, labels = rois.merge_mosaic_detections(dets)
+            results.append((xyxy.astype(int), labels, counter.update(xyxy, labels)))
+        return results
+
+    return infer_batch
+
+
+def _roi_assign(rois: ApproachROIs, counter: ApproachCounter | None = None):
+    """Full-frame (xyxy, …) detections → (xyxy, approach_ids, counts), as _roi_infer."""
+    counter = counter or ApproachCounter()
+
+    def assign(dets):
+        xyxy   = np.asarray(dets[0]).reshape(-1, 4)
+        labels = rois.assign(xyxy)
+        keep   = labels >= 0
+        return xyxy[keep].astype(int), labels[keep], counter.update(xyxy[keep], labels[keep])
+
+    return assign
+
+
+def _replay(cap, rois: ApproachROIs | None = None, **pipeline_kw):
+    """Run the pipeline over a CachedCapture: the "frames" are cached detections."""
+    if rois is not None:
+        assign = _roi_assign(rois)
+        infer  = lambda items: [assign(d) for d in items]                      # noqa: E731
+    else:
+        infer  = lambda items: [d[:3] for d in items]                           # noqa: E731
+    pipeline_kw.update(window=None, out=None)
+    return run_pipeline(cap, infer_batch=infer, annotate=None, **pipeline_kw)
+
+
+def _annotate_roi(frame, result, rois: ApproachROIs):
+    xyxy, labels, counts = result
+    for poly, name in zip(rois.polygons, rois.names):
+        cv2.polylines(frame, [poly.astype(np.int32)], True,
+                      APPROACH_COLOURS[APPROACHES.index(name)], 1)
+    for (x1, y1, x2, y2), lab in zip(xyxy, labels):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), APPROACH_COLOURS[lab], 2)
+    label = (f"NS {counts['ns_count']} (q{counts['ns_queue']})  "
+             f"EW {counts['ew_count']} (q{counts['ew_queue']})  Busiest")
+    _draw_hud(frame, label, max(counts["ns_count"], counts["ew_count"]), width=560)
+
+
+def _roi_fields(result) -> dict:
+    return {"count": len(result[1]), **result[2]}
+
+
+def run(video_path: str, batch_size: int = 1, latency_cap_ms: float = 250.0,
+        headless: bool = False, save_video: bool = True, write_every: int = 1,
+        proxy_scale: float = 1.0, counts_out: str | None = None,
+        output_path: str | None = None, motion_gate: bool = False,
+        gate_threshold: float = 0.002, gate_max_interval: int = 30,
+        sample_every_s: float | None = None, sample_mode: str = "auto",
+        adaptive_stride: bool = False, rois: str | None = None,
+        backend: str = "auto", bridge: str | None = None,
+        cache_dir: str | None = None, detector=None) -> dict:
+    """
+    Entry point called by run.py or directly.
+    batch_size > 1 batches YOLO inference; 0 auto-tunes it under latency_cap_ms.
+    headless drops the preview window; save_video / write_every / proxy_scale
+    control the annotated video; counts_out streams counts to CSV/JSONL.
+    motion_gate skips YOLO on still frames (YOLO path only — the MOG2
+    fallback must see every frame anyway).  sample_every_s processes one
+    frame per interval of footage (grab / seek / auto), adaptive_stride
+    shortening the interval as counts rise.  rois is a polygon JSON file
+    (see ai/approach_roi.py); counts are then per approach.  backend
+    selects the detector runtime (ai/detector_backend.py).  bridge names
+    a shared-memory ring that receives every frame's counts, stamped with
+    the frame's decode time (ai/count_bridge.py).  cache_dir stores raw
+    detections of full runs and replays them later (ai/detection_cache.py).
+    detector: an already loaded backend to use instead of loading one
+    (batch workers reuse one model across videos).
+    Returns {"frames", "wall_s", "fps", "output", "counts", "gate", "sampling"}.
+    """
     # ── Open video ───────────────────────────────────────────────────────────
     source = int(video_path) if video_path.isdigit() else video_path
     cap    = cv2.VideoCapture(source)
@@ -131,28 +310,233 @@ def run(video_path: str):
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     print(f"✅ Video opened — {width}x{height} @ {fps:.1f}fps")
 
+    cache, replaying = None, False
+    if cache_dir and not os.path.isfile(video_path):
+        print("⚠️  --cache ignored for live sources (webcams, streams); it needs a video file")
+    elif cache_dir:
+        resolved = resolve_backend(backend, MODEL_PATH)
+        if resolved is None:
+            print("⚠️  --cache needs a detector backend; MOG2 results are not cached")
+        else:
+            cache = DetectionCache(cache_dir, video_path, model_tag(*resolved, CONFIDENCE))
+            replaying = cache.exists()
+    if replaying:
+        cap.release()
+        cap = cache.load().capture()
+        print(f"♻️  Replaying cached detections ← {cache.path}")
+        if save_video or not headless:
+            print("   (no frames on replay: annotated video and preview are off)")
+        save_video, headless = False, True
+
+    roi_cfg, lines = None, None
+    if rois:
+        roi_cfg = ApproachROIs.load(rois).resolve(width, height)
+        print(f"🛣  {len(roi_cfg.polygons)} approach polygons from {rois} "
+              f"({len(roi_cfg.crops)} crops)")
+        with open(rois) as f:
+            cfg = json.load(f)
+        if cfg.get("stop_lines"):
+            lines = LineCrossingCounter.from_config(cfg, (width, height))
+            print(f"🚦 Counting crossings of {len(cfg['stop_lines'])} stop lines")
+
+    sampler = None
+    if sample_every_s:
+        sampler = StrideSampler(cap, sample_every_s, mode=sample_mode, adaptive=adaptive_stride)
+        cap     = sampler
+        print(f"⏩ Sampling one frame per {sample_every_s:g}s ({sample_mode}"
+              f"{', adaptive' if adaptive_stride else ''})")
+
+    stamped = None
+    if bridge:
+        stamped = cap = StampedCapture(cap)
+        bridge  = CountBridge.create(bridge)
+        print(f"🔗 Publishing counts to shared memory '{bridge.shm.name}'")
+
     # ── Output writer ────────────────────────────────────────────────────────
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    ts         = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = os.path.join(OUTPUT_DIR, f"output_{ts}.mp4")
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out    = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-    print(f"💾 Saving annotated output → {output_path}")
+    out = None
+    if save_video:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        ts          = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = output_path or os.path.join(OUTPUT_DIR, f"output_{ts}.mp4")
+        size    = (int(width * proxy_scale), int(height * proxy_scale))
+        fourcc  = cv2.VideoWriter_fourcc(*"mp4v")
+        out_fps = 1 / sample_every_s if sampler else fps
+        out     = cv2.VideoWriter(output_path, fourcc, out_fps / max(1, write_every), size)
+        print(f"💾 Saving annotated output → {output_path}")
+    else:
+        output_path = None
+
+    sink = CountSink(counts_out) if counts_out else None
+    if sink:
+        print(f"📝 Streaming counts → {counts_out}")
+
+    def emit_for(fields):
+        """fields(result) → {"count", …} for one frame's result."""
+        if sink is None and sampler is None and lines is None and stamped is None:
+            return None
+        if roi_cfg is not None:
+            fields = _roi_fields
+
+        def emit(idx, result):
+            rec = fields(result)
+            t   = sampler.times[idx] if sampler is not None else idx / fps
+            if lines is not None:
+                lines.update(result[0], round(t * fps), t)
+                rec.update(lines.fields())
+            if sampler is not None:
+                sampler.observe(rec["count"])
+            if sink is not None:
+                sink.write({"frame": round(t * fps), "t": round(t, 3), **rec})
+            if stamped is not None:
+                bridge.publish({"frame": round(t * fps), **rec}, stamped.stamp(idx))
+        return emit
+
+    pipeline_kw = {"write_every": write_every, "proxy_scale": proxy_scale}
+    if headless:
+        pipeline_kw["window"] = None
 
     # ── Load model ───────────────────────────────────────────────────────────
-    if YOLO_AVAILABLE:
+    writer, gate = None, None
+    if replaying:
+        model = None
+    elif detector is not None:
+        model = detector
+    else:
         os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-        print(f"🤖 Loading YOLOv8 model from: {MODEL_PATH}")
-        model = YOLO(MODEL_PATH)   # auto-downloads yolov8n.pt on first run
-        _detect_yolo(cap, out, model)
+        model = load_backend(backend, MODEL_PATH, conf=CONFIDENCE)   # torch auto-downloads yolov8n.pt
+
+    if replaying:
+        timer, frames, wall = _replay(cap, rois=roi_cfg,
+                                      emit=emit_for(lambda dets: {"count": len(dets[1])}),
+                                      **pipeline_kw)
+    elif model is not None:
+        print(f"🤖 Detector backend: {model.name} ({MODEL_PATH})")
+        batcher = BatchSizer(batch_size, latency_cap_ms=latency_cap_ms)
+        gate    = MotionGate(gate_threshold, gate_max_interval) if motion_gate else None
+        record  = None
+        if cache is not None and sampler is None and gate is None:
+            writer = cache.writer(fps, (width, height))
+            record = lambda dets: writer.add(len(writer.frames), dets)          # noqa: E731
+        elif cache is not None:
+            print("⚠️  Detections are only cached for full runs (no --sample-every / --motion-gate)")
+        if roi_cfg is not None and record is None and roi_cfg.mosaic_size is not None:
+            mw, mh = roi_cfg.mosaic_size
+            print(f"🧩 ROI crops packed into one {mw}x{mh} mosaic — 1 detector pass per frame "
+                  f"at {roi_cfg.mosaic_gain():.1f}× the full-frame scale")
+        elif roi_cfg is not None:
+            print("🧩 Detecting on full frames (1 detector pass per frame) and assigning boxes "
+                  "to approaches" + (" for the cache" if record is not None else
+                                     " — a crop mosaic would be larger than the frame"))
+        timer, frames, wall = _detect_yolo(cap, out, model, batcher=batcher, gate=gate, rois=roi_cfg,
+                                           record=record,
+                                           emit=emit_for(lambda dets: {"count": len(dets[1])}),
+                                           **pipeline_kw)
+        if batcher.auto:
+            print(f"📦 Auto-tuned batch size: {batcher.current}")
+        if gate is not None:
+            g = gate.summary()
+            print(f"🚥 Motion gate: {g['inferences']}/{g['frames']} frames inferred "
+                  f"({g['saved_fraction']:.0%} saved)")
     else:
-        _detect_background_subtraction(cap, out)
+        if roi_cfg is not None:
+            print(f"🛣  Background subtraction on {roi_cfg.crop_fraction():.0%} of each frame's pixels")
+        timer, frames, wall = _detect_background_subtraction(
+            cap, out, rois=roi_cfg, emit=emit_for(lambda boxes: {"count": len(boxes)}), **pipeline_kw)
+    timer.report(frames, wall)
+    if writer is not None:
+        if cap.read()[0]:
+            print("⚠️  Stopped before the end of the video; detections not cached")
+        else:
+            writer.save()
+            print(f"♻️  Cached {len(writer.frames)} frames of detections → {cache.path}")
+    if lines is not None:
+        f = lines.fields()
+        print("🚦 Arrivals: " + "  ".join(f"{k[9:]}={v}" for k, v in f.items() if k.startswith("arrivals_")))
+    if sampler is not None:
+        smp = sampler.summary()
+        print(f"⏩ {smp['samples']} samples over {smp['source_s']:.0f}s of footage "
+              f"({smp['source_s'] / max(wall, 1e-9):.0f}× real time)")
 
     # ── Cleanup ───────────────────────────────────────────────────────────────
     cap.release()
-    out.release()
-    cv2.destroyAllWindows()
-    print(f"\n✅ Done. Annotated video saved to: {output_path}")
+    if out is not None:
+        out.release()
+    if sink is not None:
+        sink.close()
+    if stamped is not None:
+        bridge.close()
+    if not headless:
+        cv2.destroyAllWindows()
+    if output_path:
+        print(f"\n✅ Done. Annotated video saved to: {output_path}")
+    else:
+        print("\n✅ Done.")
+    return {
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "fps":    round(frames / wall, 1) if wall > 0 else 0.0,
+        "output": output_path,
+        "counts": counts_out,
+        "gate":   gate.summary() if gate is not None else None,
+        "sampling": sampler.summary() if sampler is not None else None,
+        "arrivals": lines.fields() if lines is not None else None,
+    }
+
+
+def run_multi(sources: list, batch_size: int = 0, latency_cap_ms: float = 250.0,
+              realtime: bool = False, max_lag_ms: float | None = None, emit=None,
+              counts_out: str | None = None, backend: str = "auto"):
+    """
+    Detect on several sources with one model instance.  Emits
+    {"stream", "frame", "t", "count"} per processed frame — to counts_out
+    (CSV/JSONL) if given, else printed once per second of source time per
+    stream.
+    """
+    sources = [int(s) if str(s).isdigit() else s for s in sources]
+
+    model = load_backend(backend, MODEL_PATH, conf=CONFIDENCE)
+    if model is not None:
+        print(f"🤖 Detector backend: {model.name} ({MODEL_PATH})")
+        infer = lambda items: _yolo_batch(model, [f for _, f in items])          # noqa: E731
+        count = lambda dets: len(dets[1])                                       # noqa: E731
+    else:
+        # MOG2 is stateful, so the fallback keeps one subtractor per stream
+        bank = {}
+
+        def infer(items):
+            out = []
+            for sid, frame in items:
+                if sid not in bank:
+                    bank[sid] = FastMOG2()
+                out.append(bank[sid](frame))
+            return out
+        count = len
+
+    sink = CountSink(counts_out) if counts_out else None
+    if sink is not None:
+        emit = sink.write
+    elif emit is None:
+        last_second = {}
+        def emit(rec):
+            sec = int(rec["t"])
+            if last_second.get(rec["stream"]) != sec:
+                last_second[rec["stream"]] = sec
+                print(f"  [{rec['stream']}] t={rec['t']:>8.2f}s  vehicles={rec['count']}")
+
+    detector = MultiStreamDetector(
+        sources, infer, count=count, emit=emit,
+        batcher=BatchSizer(batch_size, max_batch=4 * len(sources), latency_cap_ms=latency_cap_ms),
+        realtime=realtime, max_lag_ms=max_lag_ms,
+    )
+    print(f"✅ {len(sources)} streams opened — one shared model")
+    t0 = datetime.now()
+    try:
+        detector.run()
+    finally:
+        if sink is not None:
+            sink.close()
+    detector.report((datetime.now() - t0).total_seconds())
+    return detector
 
 
 # ── CLI ───────────────────────────────────────────────────────────────────────
@@ -162,5 +546,58 @@ if __name__ == "__main__":
         "--video", default="0",
         help="Path to video file OR webcam index (default: 0 = webcam)"
     )
+    parser.add_argument("--batch", type=int, default=None,
+                        help="Frames per YOLO call (0 = auto-tune under --latency-cap-ms; "
+                             "default 1, or auto with --sources)")
+    parser.add_argument("--latency-cap-ms", type=float, default=250.0,
+                        help="Max inference latency per batch when auto-tuning")
+    parser.add_argument("--headless", action="store_true",
+                        help="No preview window (servers without a display)")
+    parser.add_argument("--no-video", action="store_true",
+                        help="Do not write an annotated video")
+    parser.add_argument("--write-every", type=int, default=1,
+                        help="Write only every k-th annotated frame")
+    parser.add_argument("--proxy-scale", type=float, default=1.0,
+                        help="Scale of the annotated video (e.g. 0.5 for a half-size proxy)")
+    parser.add_argument("--counts-out", default=None,
+                        help="Stream per-frame counts to this .csv or .jsonl file")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Run YOLO only on frames with motion; carry counts forward otherwise")
+    parser.add_argument("--gate-threshold", type=float, default=0.002,
+                        help="Foreground fraction that counts as motion")
+    parser.add_argument("--gate-max-interval", type=int, default=30,
+                        help="Force an inference at least every N frames")
+    parser.add_argument("--sample-every", type=float, default=None,
+                        help="Process one frame per this many seconds of footage")
+    parser.add_argument("--sample-mode", choices=("grab", "seek", "auto"), default="auto",
+                        help="How to skip frames between samples")
+    parser.add_argument("--adaptive-stride", action="store_true",
+                        help="Sample denser (0.25s) in heavy traffic, sparser (2s) when quiet")
+    parser.add_argument("--rois", default=None,
+                        help="Approach polygon JSON (e.g. data/rois/example.json) for NS/EW counts")
+    parser.add_argument("--bridge", default=None, metavar="NAME",
+                        help="Publish per-frame counts to this shared-memory ring (live simulation)")
+    parser.add_argument("--cache", default=None, metavar="DIR",
+                        help="Cache raw detections here and replay them on later runs")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto",
+                        help="Detector runtime (auto = ONNX Runtime when installed, else PyTorch)")
+    parser.add_argument("--sources", nargs="+", default=None,
+                        help="Several files / webcam indices sharing one model")
+    parser.add_argument("--realtime", action="store_true",
+                        help="With --sources: pace files at native fps and drop frames when behind")
+    parser.add_argument("--max-lag-ms", type=float, default=None,
+                        help="With --sources: skip frames older than this when scheduled")
     args = parser.parse_args()
-    run(args.video)
\ No newline at end of file
+    if args.sources:
+        run_multi(args.sources, batch_size=args.batch or 0, latency_cap_ms=args.latency_cap_ms,
+                  realtime=args.realtime, max_lag_ms=args.max_lag_ms, counts_out=args.counts_out,
+                  backend=args.backend)
+    else:
+        run(args.video, batch_size=1 if args.batch is None else args.batch,
+            latency_cap_ms=args.latency_cap_ms, headless=args.headless,
+            save_video=not args.no_video, write_every=args.write_every,
+            proxy_scale=args.proxy_scale, counts_out=args.counts_out,
+            motion_gate=args.motion_gate, gate_threshold=args.gate_threshold,
+            gate_max_interval=args.gate_max_interval, sample_every_s=args.sample_every,
+            sample_mode=args.sample_mode, adaptive_stride=args.adaptive_stride, rois=args.rois,
+            backend=args.backend, bridge=args.bridge, cache_dir=args.cache)
\ No newline at end of file
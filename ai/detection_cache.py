@@ -0,0 +1,171 @@
+"""
+ai/detection_cache.py — On-disk cache of raw detections for replay
+------------------------------------------------------------------
+Re-running analysis of the same recording with other ROIs, stop lines,
+count windows or sampling settings should not repeat inference.  The
+first full detection run stores every frame's raw full-frame detections.
+Later runs replay them from disk: no model, no decoding.
+
+    <cache_dir>/<video fingerprint>/<model tag>.npz
+
+  video fingerprint  sha1 of the file size plus three 1 MiB chunks
+                     (start, middle, end).  It is cheap on multi-GB
+                     files and changes whenever the content does.
+  model tag          backend name, model file stem, sha1 of the model
+                     file, and the confidence threshold
+
+Each .npz is columnar.  One row per frame: frames (source frame number)
+and offsets into the box columns.  One row per box: xyxy int32, cls
+int16, conf float16, track int32 (-1 = no tracker ID).  A JSON meta entry
+holds fps, frame count and size.  Files are written to a temp name and
+renamed, so a crashed run never leaves a truncated cache.
+
+CachedCapture is a cv2.VideoCapture stand-in whose read() returns
+(True, (xyxy, cls, conf, track)) instead of a frame.  grab(), seek and the
+FPS / FRAME_COUNT properties work too, so StrideSampler and run_pipeline
+replay a cache exactly as they process a video.
+"""
+
+import os
+import json
+import hashlib
+
+import cv2
+import numpy as np
+
+CHUNK = 1 << 20
+
+
+def video_fingerprint(path: str, chunk: int = CHUNK) -> str:
+    size = os.path.getsize(path)
+    h    = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        for pos in sorted({0, max(0, size // 2 - chunk // 2), max(0, size - chunk)}):
+            f.seek(pos)
+            h.update(f.read(chunk))
+    return h.hexdigest()[:16]
+
+
+def model_tag(backend: str, model_file: str, conf: float) -> str:
+    stem = os.path.splitext(os.path.basename(model_file))[0]
+    h    = hashlib.sha1()
+    if os.path.exists(model_file):
+        with open(model_file, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK), b""):
+                h.update(block)
+    return f"{backend}_{stem}_{h.hexdigest()[:10]}_c{conf:g}"
+
+
+class DetectionCache:
+    """Location of one (video, model) cache entry."""
+
+    def __init__(self, root: str, video_path: str, tag: str):
+        self.path = os.path.join(root, video_fingerprint(video_path), f"{tag}.npz")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def writer(self, fps: float, size: tuple[int, int]) -> "CacheWriter":
+        return CacheWriter(self.path, fps, size)
+
+    def load(self) -> "CachedDetections":
+        return CachedDetections(self.path)
+
+
+class CacheWriter:
+    """Collects per-frame detections in frame order; save() writes the .npz."""
+
+    def __init__(self, path: str, fps: float, size: tuple[int, int]):
+        self.path, self.fps, self.size = path, fps, size
+        self.frames: list[int] = []
+        self.cols:   list[tuple] = []
+
+    def add(self, frame: int, dets: tuple):
+        """dets: (xyxy (N,4), cls (N,), conf (N,)[, track ids (N,)])."""
+        xyxy, cls, conf = dets[:3]
+        track = dets[3] if len(dets) > 3 else np.full(len(cls), -1)
+        self.frames.append(frame)
+        self.cols.append((np.asarray(xyxy).reshape(-1, 4), cls, conf, track))
+
+    def save(self):
+        n       = np.array([len(c[1]) for c in self.cols], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(n)])
+
+        def cat(i, shape, dtype):
+            parts = [np.asarray(c[i], dtype).reshape(shape) for c in self.cols]
+            return np.concatenate(parts) if parts else np.zeros((0,) + shape[1:], dtype)
+
+        meta = {"fps": self.fps, "width": self.size[0], "height": self.size[1],
+                "frame_count": len(self.frames)}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            frames=np.array(self.frames, dtype=np.int32), offsets=offsets,
+            xyxy=cat(0, (-1, 4), np.int32), cls=cat(1, (-1,), np.int16),
+            conf=cat(2, (-1,), np.float16), track=cat(3, (-1,), np.int32),
+            meta=np.array(json.dumps(meta)),
+        )
+        os.replace(tmp, self.path)
+
+
+class CachedDetections:
+    """A loaded cache entry: columnar arrays plus per-frame slicing."""
+
+    def __init__(self, path: str):
+        with np.load(path) as z:
+            self.frames  = z["frames"]
+            self.offsets = z["offsets"]
+            self.xyxy    = z["xyxy"]
+            self.cls     = z["cls"].astype(int)
+            self.conf    = z["conf"].astype(np.float32)
+            self.track   = z["track"]
+            self.meta    = json.loads(str(z["meta"]))
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def get(self, i: int) -> tuple:
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return self.xyxy[a:b], self.cls[a:b], self.conf[a:b], self.track[a:b]
+
+    def capture(self) -> "CachedCapture":
+        return CachedCapture(self)
+
+
+class CachedCapture:
+    """Replays cached detections through the cv2.VideoCapture interface."""
+
+    def __init__(self, cache: CachedDetections):
+        self.cache = cache
+        self.pos   = 0
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        meta = self.cache.meta
+        return {cv2.CAP_PROP_FPS: meta["fps"], cv2.CAP_PROP_FRAME_COUNT: len(self.cache),
+                cv2.CAP_PROP_FRAME_WIDTH: meta["width"], cv2.CAP_PROP_FRAME_HEIGHT: meta["height"],
+                cv2.CAP_PROP_POS_FRAMES: self.pos}.get(prop, 0.0)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.pos = int(value)
+        return True
+
+    def grab(self):
+        if self.pos >= len(self.cache):
+            return False
+        self.pos += 1
+        return True
+
+    def read(self):
+        if self.pos >= len(self.cache):
+            return False, None
+        dets = self.cache.get(self.pos)
+        self.pos += 1
+        return True, dets
+
+    def release(self):
+        pass
@@ -0,0 +1,354 @@
+"""
+ai/detector_backend.py — Interchangeable vehicle detector backends
+------------------------------------------------------------------
+Detection boxes run on CPU, where PyTorch eager inference is the slowest
+way to execute YOLOv8.  Every backend here has the same interface:
+
+    backend.detect(frames) → [(xyxy int (N,4), classes (N,), confs (N,)), …]
+    backend.names          → {class_id: name}
+
+  torch       ultralytics YOLO(MODEL_PATH), as before
+  onnx        ONNX Runtime CPU session on an exported YOLOv8 graph
+  onnx-int8   the same graph statically quantized to INT8 (QDQ), calibrated
+              on real frames
+  auto        onnx if an exported model is cached (or ultralytics can
+              export one), else torch
+
+The ONNX path does its own pre/post-processing in NumPy, so deployment
+needs only onnxruntime + opencv:
+  • letterbox: aspect-preserving resize into an imgsz × imgsz grey canvas,
+    whole batch stacked into one NCHW float32 blob
+  • decode: (B, 4 + classes, anchors) → cxcywh boxes and best class,
+    filtered to VEHICLE_CLASSES and the confidence threshold before NMS
+  • NMS: class-aware greedy NMS with vectorised IoU rows, boxes offset by
+    class so different classes never suppress each other
+
+Exports are cached under models/ (yolov8n_<imgsz>.onnx,
+yolov8n_<imgsz>_int8.onnx) and rebuilt only when the .pt is newer.
+
+INT8 is static, not dynamic.  quantize_dynamic turns every Conv into a
+ConvInteger that computes its activation scale at run time; on this
+conv-only graph that was slower than fp32 (0.78× torch vs 1.16×, 1 CPU).
+quantize_static fixes the activation ranges from CALIB_FRAMES letterboxed
+frames (a video of the real camera when given, else a synthetic clip from
+scripts/synth_video.py) and runs 1.4–1.9× faster than fp32.  The Detect
+head's decode tail (DFL, box/score concat, stride scaling) stays fp32:
+pixel coordinates and class scores share one output tensor, and a single
+INT8 range for both wipes out the scores.
+"""
+
+import os
+import ast
+
+import cv2
+import numpy as np
+
+MODELS_DIR      = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+DEFAULT_WEIGHTS = os.path.join(MODELS_DIR, "yolov8n.pt")
+VEHICLE_CLASSES = (2, 3, 5, 7)        # COCO: car, motorcycle, bus, truck
+BACKENDS        = ("auto", "torch", "onnx", "onnx-int8")
+PAD_VALUE       = 114
+CALIB_FRAMES    = 64
+QUANT_TAG       = "static-qdq"          # metadata marking our INT8 exports
+
+
+# ── Pre / post-processing ─────────────────────────────────────────────────────
+
+def letterbox(frames: list, size: int = 640) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Resize each BGR frame to fit size × size (aspect kept, grey padding)
+    and stack into one RGB float32 NCHW blob in [0, 1].
+    Returns (blob, scales (B,), pads (B, 2) as x, y).
+    """
+    blob   = np.full((len(frames), size, size, 3), PAD_VALUE, dtype=np.uint8)
+    scales = np.empty(len(frames))
+    pads   = np.empty((len(frames), 2))
+    for i, frame in enumerate(frames):
+        h, w  = frame.shape[:2]
+        s     = min(size / h, size / w)
+        nh, nw = round(h * s), round(w * s)
+        top, left = (size - nh) // 2, (size - nw) // 2
+        blob[i, top:top + nh, left:left + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        scales[i], pads[i] = s, (left, top)
+    blob = blob[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob), scales, pads
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thr: float = 0.45,
+        classes: np.ndarray | None = None) -> np.ndarray:
+    """Greedy NMS over xyxy boxes; class-aware when classes is given. Returns kept indices."""
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=int)
+    if classes is not None:
+        boxes = boxes + (classes[:, None] * (boxes.max() + 1))      # separate classes in space
+    x1, y1, x2, y2 = boxes.T
+    area  = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+    keep  = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou   = inter / np.maximum(area[i] + area[rest] - inter, 1e-9)
+        order = rest[iou <= iou_thr]
+    return np.array(keep, dtype=int)
+
+
+def postprocess(output: np.ndarray, scales: np.ndarray, pads: np.ndarray,
+                shapes: list, conf: float = 0.4, iou_thr: float = 0.45,
+                classes=VEHICLE_CLASSES) -> list:
+    """
+    Decode raw YOLOv8 output (B, 4 + n_classes, anchors) into per-frame
+    (xyxy, cls, conf) in original frame coordinates.
+    """
+    results  = []
+    cls_keep = np.asarray(classes)
+    for b in range(output.shape[0]):
+        pred   = output[b].T                                   # (anchors, 4 + C)
+        scores = pred[:, 4:]
+        cls    = scores.argmax(axis=1)
+        best   = scores[np.arange(len(cls)), cls]
+        keep   = (best >= conf) & np.isin(cls, cls_keep)
+        pred, cls, best = pred[keep], cls[keep], best[keep]
+
+        cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        idx  = nms(xyxy, best, iou_thr, cls)
+        xyxy, cls, best = xyxy[idx], cls[idx], best[idx]
+
+        xyxy = (xyxy - np.tile(pads[b], 2)) / scales[b]        # undo letterbox
+        fh, fw = shapes[b][:2]
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, fw)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, fh)
+        results.append((xyxy.astype(int), cls.astype(int), best.astype(float)))
+    return results
+
+
+def parse_ultralytics(result, conf: float = 0.4, classes=VEHICLE_CLASSES) -> tuple:
+    """Vehicle boxes from one ultralytics result: (xyxy int (N,4), classes (N,), confs (N,))."""
+    boxes = result.boxes
+    cls   = boxes.cls.cpu().numpy().astype(int)
+    score = boxes.conf.cpu().numpy()
+    xyxy  = boxes.xyxy.cpu().numpy().astype(int)
+    keep  = np.isin(cls, classes) & (score >= conf)
+    return xyxy[keep], cls[keep], score[keep]
+
+
+# ── Backends ─────────────────────────────────────────────────────────────────
+
+class TorchBackend:
+    """ultralytics YOLO in PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, weights: str = DEFAULT_WEIGHTS, conf: float = 0.4, classes=VEHICLE_CLASSES):
+        from ultralytics import YOLO
+        self.model   = YOLO(weights)
+        self.weights = weights
+        self.names   = self.model.names
+        self.conf    = conf
+        self.classes = classes
+
+    def detect(self, frames: list) -> list:
+        return [parse_ultralytics(r, self.conf, self.classes)
+                for r in self.model(frames, verbose=False)]
+
+
+class OnnxBackend:
+    """YOLOv8 ONNX graph on the ONNX Runtime CPU provider."""
+
+    def __init__(self, onnx_path: str, conf: float = 0.4, iou_thr: float = 0.45,
+                 classes=VEHICLE_CLASSES, threads: int | None = None, imgsz: int | None = None):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, opts, providers=["CPUExecutionProvider"])
+        self.weights = onnx_path
+        inp          = self.session.get_inputs()[0]
+        self.input   = inp.name
+        self.imgsz   = inp.shape[2] if isinstance(inp.shape[2], int) else (imgsz or 640)
+        self.batched = not isinstance(inp.shape[0], int)         # dynamic batch axis
+        meta         = self.session.get_modelmeta().custom_metadata_map
+        self.names   = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        self.conf, self.iou_thr, self.classes = conf, iou_thr, classes
+        self.name    = "onnx-int8" if onnx_path.endswith("_int8.onnx") else "onnx"
+
+    def detect(self, frames: list) -> list:
+        blob, scales, pads = letterbox(frames, self.imgsz)
+        if self.batched:
+            output = self.session.run(None, {self.input: blob})[0]
+        else:
+            output = np.concatenate([self.session.run(None, {self.input: blob[i:i + 1]})[0]
+                                     for i in range(len(blob))])
+        return postprocess(output, scales, pads, [f.shape for f in frames],
+                           self.conf, self.iou_thr, self.classes)
+
+
+# ── Export / cache ───────────────────────────────────────────────────────────
+
+def onnx_path_for(weights: str = DEFAULT_WEIGHTS, imgsz: int = 640, int8: bool = False) -> str:
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(MODELS_DIR, f"{stem}_{imgsz}{'_int8' if int8 else ''}.onnx")
+
+
+def _fresh(path: str, source: str) -> bool:
+    return os.path.exists(path) and (not os.path.exists(source)
+                                     or os.path.getmtime(path) >= os.path.getmtime(source))
+
+
+def calibration_frames(source: str | None = None, n: int = CALIB_FRAMES) -> list:
+    """
+    n BGR frames spread evenly over the video `source`; without one, a
+    short synthetic junction clip is rendered (seeded, nothing downloaded).
+    """
+    if source is None:
+        import tempfile
+        from scripts.synth_video import render_clip
+        with tempfile.TemporaryDirectory() as tmp:
+            clip = render_clip(os.path.join(tmp, "calib.avi"), frames=n)["video"]
+            return calibration_frames(clip, n)
+    cap    = cv2.VideoCapture(source)
+    total  = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    every  = max(1, total // n) if total > 0 else 1
+    frames = []
+    i = 0
+    while len(frames) < n:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if i % every == 0:
+            frames.append(frame)
+        i += 1
+    cap.release()
+    if not frames:
+        raise ValueError(f"No calibration frames could be read from {source}")
+    return frames
+
+
+def _head_tail(model) -> list[str]:
+    """Non-Conv nodes of the Detect head (the last /model.N/ block): kept fp32."""
+    import re
+    blocks = {int(m.group(1)) for m in (re.match(r"/model\.(\d+)/", n.name) for n in model.graph.node) if m}
+    prefix = f"/model.{max(blocks)}/" if blocks else None
+    return [n.name for n in model.graph.node
+            if prefix and n.name.startswith(prefix) and n.op_type != "Conv"]
+
+
+def _is_static_int8(path: str) -> bool:
+    import onnx
+    model = onnx.load(path, load_external_data=False)
+    return any(p.key == "quantization" and p.value == QUANT_TAG for p in model.metadata_props)
+
+
+def quantize_int8(fp32: str, q8: str, calib: str | None = None, imgsz: int = 640) -> str:
+    """Static QDQ INT8 copy of an fp32 export, calibrated on `calib` frames (see module doc)."""
+    import tempfile
+    import onnx
+    from onnxruntime.quantization import (quantize_static, CalibrationDataReader,
+                                          QuantFormat, QuantType)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class Frames(CalibrationDataReader):
+        def __init__(self, frames, name):
+            self.frames, self.name = iter(frames), name
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            return None if frame is None else {self.name: letterbox([frame], imgsz)[0]}
+
+    model = onnx.load(fp32)
+    with tempfile.TemporaryDirectory() as tmp:
+        pre = os.path.join(tmp, "pre.onnx")
+        quant_pre_process(fp32, pre, skip_symbolic_shape=True)     # fold + infer shapes
+        quantize_static(pre, q8, Frames(calibration_frames(calib), model.graph.input[0].name),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        nodes_to_exclude=_head_tail(model))
+    out = onnx.load(q8)
+    out.metadata_props.add(key="quantization", value=QUANT_TAG)
+    onnx.save(out, q8)
+    return q8
+
+
+def export_onnx(weights: str = DEFAULT_WEIGHTS, imgsz: int = 640, int8: bool = False,
+                calib: str | None = None) -> str:
+    """
+    Export (and optionally INT8-quantize) YOLOv8 to models/, reusing a fresh
+    cache.  calib is the video INT8 calibration frames come from.
+    """
+    fp32 = onnx_path_for(weights, imgsz)
+    if not _fresh(fp32, weights):
+        from ultralytics import YOLO
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        print(f"📦 Exporting {os.path.basename(weights)} → {fp32}")
+        exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=False)
+        os.replace(exported, fp32)
+    if not int8:
+        return fp32
+
+    q8 = onnx_path_for(weights, imgsz, int8=True)
+    if not (_fresh(q8, fp32) and _is_static_int8(q8)):     # also replaces old dynamic exports
+        print(f"📦 Quantizing (static INT8, calibrated on {calib or 'a synthetic clip'}) → {q8}")
+        quantize_int8(fp32, q8, calib, imgsz)
+    return q8
+
+
+def resolve_backend(kind: str = "auto", weights: str = DEFAULT_WEIGHTS,
+                    imgsz: int = 640) -> tuple[str, str] | None:
+    """
+    (backend name, model file) that load_backend(kind) would use, without
+    loading or exporting anything.  None when nothing usable is installed.
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, not {kind!r}")
+    try:
+        import onnxruntime  # noqa: F401
+        has_ort = True
+    except ImportError:
+        has_ort = False
+    try:
+        import ultralytics  # noqa: F401
+        has_torch = True
+    except ImportError:
+        has_torch = False
+
+    if kind == "torch" or (kind == "auto" and not has_ort):
+        return ("torch", weights) if has_torch else None
+    if not has_ort:
+        raise ImportError("onnxruntime is required for the ONNX backends (pip install onnxruntime)")
+
+    int8 = kind == "onnx-int8"
+    path = onnx_path_for(weights, imgsz, int8)
+    if not has_torch and not os.path.exists(path):
+        if int8 and os.path.exists(onnx_path_for(weights, imgsz)):
+            pass                                        # quantizing needs onnxruntime only
+        elif kind == "auto":
+            return None
+        else:
+            raise FileNotFoundError(f"{path} not found and ultralytics is not installed to export it")
+    return ("onnx-int8" if int8 else "onnx"), path
+
+
+def load_backend(kind: str = "auto", weights: str = DEFAULT_WEIGHTS, imgsz: int = 640,
+                 conf: float = 0.4, threads: int | None = None, calib: str | None = None):
+    """
+    Build a backend by name; returns None when nothing usable is installed.
+    calib: video to calibrate a new INT8 export on (default: synthetic clip).
+    """
+    resolved = resolve_backend(kind, weights, imgsz)
+    if resolved is None:
+        return None
+    name, path = resolved
+    if name == "torch":
+        return TorchBackend(weights, conf)
+    try:
+        path = export_onnx(weights, imgsz, name == "onnx-int8", calib)   # no-op while the cache is fresh
+    except ImportError:
+        if not os.path.exists(path):                              # stale cache beats none
+            raise
+    return OnnxBackend(path, conf, threads=threads, imgsz=imgsz)
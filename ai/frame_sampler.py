@@ -0,0 +1,100 @@
+"""
+ai/frame_sampler.py — Sparse sampling of long recordings
+--------------------------------------------------------
+Offline analysis of hours-long footage needs a count every second or so,
+not every frame.  StrideSampler wraps a cv2.VideoCapture and hands out
+one frame per sampling interval:
+
+  grab  cap.grab() the frames in between. They are demuxed and decoded
+        but never converted to BGR or copied to Python.
+  seek  cap.set(CAP_PROP_POS_FRAMES, …) straight to the next sample. It
+        skips decoding altogether and pays for it with a keyframe seek,
+        which wins once the stride is long.
+  auto  seek when the stride is at least SEEK_MIN_STRIDE frames, else grab.
+
+With adaptive=True the interval follows traffic.  observe(count) moves it
+linearly from max_interval_s (count ≤ low) down to min_interval_s (count
+≥ high), so busy periods are sampled densely and empty roads sparsely.
+
+The sampler is a drop-in `cap` for run_pipeline: read() returns the next
+sample, and times[i] is the source timestamp of the i-th sample.
+"""
+
+import cv2
+
+SEEK_MIN_STRIDE = 50      # frames; below this grab() beats a keyframe seek
+
+
+class StrideSampler:
+    """cv2.VideoCapture wrapper that returns one frame per interval."""
+
+    def __init__(self, cap, interval_s: float = 1.0, mode: str = "auto",
+                 adaptive: bool = False, min_interval_s: float = 0.25,
+                 max_interval_s: float = 2.0, low: int = 2, high: int = 15):
+        if mode not in ("grab", "seek", "auto"):
+            raise ValueError(f"mode must be grab, seek or auto, not {mode!r}")
+        self.cap      = cap
+        self.fps      = cap.get(cv2.CAP_PROP_FPS) or 25
+        self.total    = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.mode     = mode
+        self.adaptive = adaptive
+        self.min_interval_s, self.max_interval_s = min_interval_s, max_interval_s
+        self.low, self.high = low, high
+        self.interval_s = interval_s
+        self.pos      = 0                 # index of the next source frame
+        self.times: list[float] = []
+        self.decoded  = 0                 # frames fully read
+        self.skipped  = 0                 # frames grabbed or seeked past
+
+    @property
+    def stride(self) -> int:
+        return max(1, round(self.interval_s * self.fps))
+
+    def observe(self, count: int):
+        """Feed back the latest vehicle count (adaptive mode only)."""
+        if not self.adaptive:
+            return
+        frac = min(max((count - self.low) / max(self.high - self.low, 1), 0.0), 1.0)
+        self.interval_s = self.max_interval_s - frac * (self.max_interval_s - self.min_interval_s)
+
+    def _use_seek(self, skip: int) -> bool:
+        return self.mode == "seek" or (self.mode == "auto" and skip + 1 >= SEEK_MIN_STRIDE)
+
+    def read(self):
+        if self.times:
+            skip = self.stride - 1
+            if skip > 0:
+                if self._use_seek(skip):
+                    if self.total and self.pos + skip >= self.total:
+                        return False, None
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.pos + skip)
+                else:
+                    for _ in range(skip):
+                        if not self.cap.grab():
+                            return False, None
+                self.pos     += skip
+                self.skipped += skip
+        ok, frame = self.cap.read()
+        if not ok:
+            return False, None
+        self.times.append(self.pos / self.fps)
+        self.pos     += 1
+        self.decoded += 1
+        return True, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+    def summary(self) -> dict:
+        return {
+            "samples":     self.decoded,
+            "skipped":     self.skipped,
+            "source_s":    round(self.pos / self.fps, 1),
+            "interval_s":  round(self.interval_s, 3),
+        }
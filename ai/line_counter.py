@@ -0,0 +1,231 @@
+"""
+ai/line_counter.py — Unique vehicles crossing stop lines
+--------------------------------------------------------
+Per-frame box counts see the same car on every frame it is visible.
+LineCrossingCounter follows boxes from frame to frame. It matches them
+greedily by IoU, then by centre distance (within max_jump box diagonals)
+for fast or sparsely sampled vehicles. It can also take track IDs from an
+external tracker such as YOLO's model.track. Each vehicle is counted once,
+when its bottom-centre point crosses a virtual stop line.
+
+Lines live in the camera's ROI JSON next to the approach polygons:
+
+    "stop_lines": [
+      {"direction": "N→S", "line": [[0.42, 0.35], [0.58, 0.35]]},
+      …
+    ]
+
+A crossing counts when the point moves from the left to the right of the
+line, seen walking from its first point to the second (in image
+coordinates).  Put lines inside the approach polygons: boxes outside
+every polygon are dropped before they reach the counter.  Directions are the simulation's spawn directions, so
+spawn_rates() feeds Intersection.set_arrival_rates() directly.
+
+Track state is a handful of parallel NumPy arrays (ids, boxes, anchors,
+last-seen frame, per-line counted flags) that grow by doubling. Tracks
+unseen for max_age frames are evicted by compacting the arrays.
+"""
+
+from collections import deque
+
+import numpy as np
+
+DIRECTIONS = ("N→S", "S→N", "E→W", "W→E")
+DIRECTION_KEYS = {"N→S": "sb", "S→N": "nb", "E→W": "wb", "W→E": "eb"}   # bound, as in traffic counts
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, 4) × (M, 4) xyxy → (N, M) IoU."""
+    a, b = a[:, None, :], b[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter  = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def centre_similarity(a: np.ndarray, b: np.ndarray, max_jump: float) -> np.ndarray:
+    """(N, M) 1 − distance / (max_jump × diagonal of b); ≤ 0 means too far apart."""
+    ca   = (a[:, None, :2] + a[:, None, 2:]) / 2
+    cb   = (b[None, :, :2] + b[None, :, 2:]) / 2
+    diag = np.hypot(b[:, 2] - b[:, 0], b[:, 3] - b[:, 1])[None]
+    return 1 - np.linalg.norm(ca - cb, axis=2) / np.maximum(max_jump * diag, 1e-9)
+
+
+def greedy_match(score: np.ndarray, min_score: float, match: np.ndarray | None = None) -> np.ndarray:
+    """
+    Row → column assignment (-1 = unmatched), best pairs first.  An
+    existing partial `match` is extended: its rows and columns stay taken.
+    """
+    match = np.full(score.shape[0], -1, dtype=int) if match is None else match.copy()
+    if score.size == 0:
+        return match
+    used = np.zeros(score.shape[1], dtype=bool)
+    used[match[match >= 0]] = True
+    rows, cols = np.nonzero(score >= min_score)
+    order = np.argsort(-score[rows, cols], kind="stable")
+    for r, c in zip(rows[order], cols[order]):
+        if match[r] < 0 and not used[c]:
+            match[r], used[c] = c, True
+    return match
+
+
+class LineCrossingCounter:
+    """Tracks boxes and counts each vehicle once per stop line it crosses."""
+
+    def __init__(self, lines: list[dict], size: tuple[int, int], iou_min: float = 0.2,
+                 max_jump: float = 1.5, max_age: int = 15, window_s: float = 60.0,
+                 capacity: int = 64):
+        w, h = size
+        self.directions = [ln["direction"] for ln in lines]
+        unknown = set(self.directions) - set(DIRECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown stop-line directions {sorted(unknown)}")
+        seg = np.array([ln["line"] for ln in lines], dtype=float).reshape(-1, 2, 2) * [w, h]
+        self.p1, self.d = seg[:, 0], seg[:, 1] - seg[:, 0]        # (L, 2)
+        self.iou_min  = iou_min
+        self.max_jump = max_jump
+        self.max_age  = max_age
+        self.window_s = window_s
+
+        n_lines       = len(lines)
+        self.n        = 0                                          # live tracks
+        self.ids      = np.zeros(capacity, dtype=np.int64)
+        self.boxes    = np.zeros((capacity, 4))
+        self.anchor   = np.zeros((capacity, 2))
+        self.last     = np.zeros(capacity, dtype=np.int64)
+        self.counted  = np.zeros((capacity, n_lines), dtype=bool)
+        self._next_id = 1
+
+        self.arrivals = np.zeros(n_lines, dtype=np.int64)
+        self._recent: list[deque] = [deque() for _ in range(n_lines)]
+        self._t0      = None
+        self._t       = 0.0
+
+    @classmethod
+    def from_config(cls, cfg: dict, size: tuple[int, int], **kw) -> "LineCrossingCounter":
+        return cls(cfg["stop_lines"], size, **kw)
+
+    # ── Geometry ─────────────────────────────────────────────────────────────
+
+    def _side(self, pts: np.ndarray) -> np.ndarray:
+        """(N, 2) points → (N, L) signed side of every line (>0 = right)."""
+        rel = pts[:, None, :] - self.p1[None]
+        return self.d[None, :, 0] * rel[..., 1] - self.d[None, :, 1] * rel[..., 0]
+
+    def _within(self, pts: np.ndarray) -> np.ndarray:
+        """(N, L) whether each point projects onto the segment (not its extension)."""
+        rel = pts[:, None, :] - self.p1[None]
+        t   = (rel * self.d[None]).sum(axis=2) / (self.d ** 2).sum(axis=1)[None]
+        return (t >= 0) & (t <= 1)
+
+    # ── State ────────────────────────────────────────────────────────────────
+
+    def _grow(self, need: int):
+        cap = len(self.ids)
+        if need <= cap:
+            return
+        new = max(need, 2 * cap)
+        for name in ("ids", "boxes", "anchor", "last", "counted"):
+            arr = getattr(self, name)
+            out = np.zeros((new,) + arr.shape[1:], dtype=arr.dtype)
+            out[:cap] = arr
+            setattr(self, name, out)
+
+    def _evict(self, frame: int):
+        live = self.last[:self.n] >= frame - self.max_age
+        if live.all():
+            return
+        k = int(live.sum())
+        for name in ("ids", "boxes", "anchor", "last", "counted"):
+            arr = getattr(self, name)
+            arr[:k] = arr[:self.n][live]
+        self.n = k
+
+    def update(self, xyxy: np.ndarray, frame: int, t: float, ids: np.ndarray | None = None) -> int:
+        """
+        Feed one frame of boxes (frame index and source time in seconds).
+        ids: optional external track IDs, one per box.  Returns the number
+        of new line crossings.
+        """
+        xyxy = np.asarray(xyxy, dtype=float).reshape(-1, 4)
+        pts  = np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2, xyxy[:, 3]], axis=1)
+        if self._t0 is None:
+            self._t0 = t
+        self._t = t
+
+        # Match detections to live tracks
+        if ids is not None:
+            ids   = np.asarray(ids, dtype=np.int64).reshape(-1)
+            order = np.argsort(self.ids[:self.n])
+            pos   = np.searchsorted(self.ids[:self.n], ids, sorter=order)
+            pos   = np.clip(pos, 0, max(self.n - 1, 0))
+            slot  = order[pos] if self.n else np.zeros(len(ids), dtype=int)
+            match = np.where(self.n > 0, np.where(self.ids[slot] == ids, slot, -1), -1)
+        else:
+            live  = self.boxes[:self.n]
+            match = greedy_match(iou_matrix(xyxy, live), self.iou_min)
+            match = greedy_match(centre_similarity(xyxy, live, self.max_jump), 1e-9, match)
+
+        # Crossings for matched tracks: left of a line before, right of it now
+        seen = match >= 0
+        new_crossings = 0
+        if seen.any():
+            slots  = match[seen]
+            before = self._side(self.anchor[slots]) < 0
+            after  = self._side(pts[seen]) >= 0
+            cross  = before & after & self._within(pts[seen]) & ~self.counted[slots]
+            if cross.any():
+                self.counted[slots] |= cross
+                per_line = cross.sum(axis=0)
+                self.arrivals += per_line
+                for li in np.nonzero(per_line)[0]:
+                    self._recent[li].extend([t] * int(per_line[li]))
+                new_crossings = int(per_line.sum())
+            self.boxes[slots]  = xyxy[seen]
+            self.anchor[slots] = pts[seen]
+            self.last[slots]   = frame
+
+        # New tracks
+        fresh = np.nonzero(~seen)[0]
+        if len(fresh):
+            self._grow(self.n + len(fresh))
+            sl = slice(self.n, self.n + len(fresh))
+            if ids is not None:
+                self.ids[sl] = ids[fresh]
+            else:
+                self.ids[sl] = np.arange(self._next_id, self._next_id + len(fresh))
+                self._next_id += len(fresh)
+            self.boxes[sl], self.anchor[sl] = xyxy[fresh], pts[fresh]
+            self.last[sl], self.counted[sl] = frame, False
+            self.n += len(fresh)
+
+        self._evict(frame)
+        return new_crossings
+
+    # ── Output ───────────────────────────────────────────────────────────────
+
+    def rates_per_min(self) -> np.ndarray:
+        """Arrivals per minute on each line over the trailing window."""
+        span = min(self.window_s, max(self._t - (self._t0 or 0.0), 1e-9))
+        for q in self._recent:
+            while q and q[0] < self._t - self.window_s:
+                q.popleft()
+        return np.array([len(q) for q in self._recent]) / span * 60
+
+    def spawn_rates(self) -> dict:
+        """{spawn direction: vehicles/min} for Intersection.set_arrival_rates()."""
+        out = dict.fromkeys(DIRECTIONS, 0.0)
+        for d, r in zip(self.directions, self.rates_per_min()):
+            out[d] += float(r)
+        return out
+
+    def fields(self) -> dict:
+        """Flat record fields: arrivals_<sb|nb|wb|eb> and rate_<…> (veh/min)."""
+        out = {}
+        for d, r in self.spawn_rates().items():
+            key = DIRECTION_KEYS[d]
+            out[f"arrivals_{key}"] = int(self.arrivals[[x == d for x in self.directions]].sum())
+            out[f"rate_{key}"]     = round(r, 2)
+        return out
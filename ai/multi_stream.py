@@ -0,0 +1,210 @@
+"""
+ai/multi_stream.py — Several cameras, one shared detector
+---------------------------------------------------------
+One camera per approach used to mean one process per camera, each loading
+its own copy of the model.  MultiStreamDetector decodes every source on
+its own thread and funnels the frames through a single batched inference
+call on the caller's thread:
+
+    reader[0] ─┐
+    reader[1] ─┼─▶ round-robin scheduler ──▶ infer_batch([(stream, frame), …])
+    reader[n] ─┘                               └─▶ emit({"stream", "frame", "t", "count"})
+
+Fairness: each scheduling pass takes at most one frame per stream before
+taking a second from any, and the starting stream rotates, so a fast or
+high-fps camera cannot starve the others of batch slots.
+
+Falling behind real time: each reader keeps a small buffer.  With
+realtime=True (live cameras, or files paced at their native fps) a full
+buffer drops its oldest frame, and frames older than max_lag_ms when
+scheduled are skipped, so counts always describe the recent past rather
+than a growing backlog.  With realtime=False (offline files) readers block
+instead and every frame is processed.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+
+import cv2
+
+
+@dataclass
+class StreamStats:
+    name:      str
+    decoded:   int = 0
+    processed: int = 0
+    dropped:   int = 0            # overwritten in a full buffer
+    stale:     int = 0            # skipped for exceeding max_lag_ms
+    last:      dict = field(default_factory=dict)
+
+
+def stream_name(source) -> str:
+    return f"cam{source}" if isinstance(source, int) else os.path.splitext(os.path.basename(str(source)))[0]
+
+
+class StreamReader(threading.Thread):
+    """Decoder for one source, feeding a bounded buffer shared under `cond`."""
+
+    def __init__(self, sid: int, cap, cond: threading.Condition, stats: StreamStats,
+                 buffer: int = 4, realtime: bool = False, live: bool = False):
+        super().__init__(name=f"stream-{stats.name}", daemon=True)
+        self.sid, self.cap, self.cond, self.stats = sid, cap, cond, stats
+        self.buffer   = buffer
+        self.realtime = realtime
+        self.live     = live
+        self.frames: deque = deque()
+        self.finished = False
+        self.stop     = threading.Event()
+
+    def _timestamp(self, t0: float) -> float:
+        if self.live:
+            return time.monotonic() - t0
+        return self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+    def run(self):
+        t0 = time.monotonic()
+        idx = 0
+        while not self.stop.is_set():
+            ok, frame = self.cap.read()
+            if not ok:
+                break
+            ts = self._timestamp(t0)
+            if self.realtime and not self.live:
+                # Pace a file like the camera it stands in for
+                delay = t0 + ts - time.monotonic()
+                if delay > 0:
+                    self.stop.wait(delay)
+            with self.cond:
+                if len(self.frames) >= self.buffer:
+                    if self.realtime:
+                        self.frames.popleft()
+                        self.stats.dropped += 1
+                    else:
+                        while len(self.frames) >= self.buffer and not self.stop.is_set():
+                            self.cond.wait(0.1)
+                self.frames.append((idx, ts, time.monotonic(), frame))
+                self.stats.decoded += 1
+                self.cond.notify_all()
+            idx += 1
+        with self.cond:
+            self.finished = True
+            self.cond.notify_all()
+
+
+class MultiStreamDetector:
+    """
+    Shared-model scheduler over several video sources.
+
+    infer_batch(items) receives [(stream_id, frame), …] and returns one
+    result per item; count(result) turns a result into a vehicle count.
+    emit(record) is called for every processed frame with
+    {"stream", "frame", "t", "count"}.
+    """
+
+    def __init__(self, sources: list, infer_batch, count=len, emit=None,
+                 max_batch: int = 8, batcher=None, buffer: int = 4,
+                 realtime: bool = False, max_lag_ms: float | None = None,
+                 open_capture=cv2.VideoCapture):
+        self.infer_batch = infer_batch
+        self.count       = count
+        self.emit        = emit
+        self.max_batch   = max_batch
+        self.batcher     = batcher
+        self.max_lag_s   = max_lag_ms / 1000 if max_lag_ms is not None else None
+        self.cond        = threading.Condition()
+        self.stats: list[StreamStats] = []
+        self.readers: list[StreamReader] = []
+        self.batches     = 0
+        self._rr         = 0
+
+        for sid, source in enumerate(sources):
+            cap = open_capture(source) if isinstance(source, (int, str)) else source
+            if hasattr(cap, "isOpened") and not cap.isOpened():
+                cap.release()
+                self.stop()                   # release the sources opened so far
+                raise ValueError(f"Cannot open video source: {source}")
+            stats = StreamStats(stream_name(source) if isinstance(source, (int, str)) else f"stream{sid}")
+            self.stats.append(stats)
+            self.readers.append(StreamReader(sid, cap, self.cond, stats, buffer=buffer,
+                                             realtime=realtime, live=isinstance(source, int)))
+
+    def _batch_limit(self) -> int:
+        return self.batcher.current if self.batcher is not None else self.max_batch
+
+    def _take_batch(self) -> list | None:
+        """Round-robin pick under the lock; None once every stream is drained."""
+        with self.cond:
+            while not any(r.frames for r in self.readers):
+                if all(r.finished for r in self.readers):
+                    return None
+                self.cond.wait(0.1)
+
+            limit, n = self._batch_limit(), len(self.readers)
+            order    = [self.readers[(self._rr + k) % n] for k in range(n)]
+            self._rr = (self._rr + 1) % n
+            batch: list = []
+            while len(batch) < limit and any(r.frames for r in order):
+                for r in order:
+                    if r.frames and len(batch) < limit:
+                        batch.append((r.sid, r.frames.popleft()))
+            self.cond.notify_all()            # wake blocked readers
+        return batch
+
+    def _drop_stale(self, batch: list) -> list:
+        if self.max_lag_s is None:
+            return batch
+        now, fresh = time.monotonic(), []
+        for sid, item in batch:
+            if now - item[2] > self.max_lag_s:
+                self.stats[sid].stale += 1
+            else:
+                fresh.append((sid, item))
+        return fresh
+
+    def run(self) -> list[StreamStats]:
+        """Process until every source ends (or stop() is called)."""
+        for r in self.readers:
+            r.start()
+        try:
+            while (batch := self._take_batch()) is not None:
+                batch = self._drop_stale(batch)
+                if not batch:
+                    continue
+                t0 = time.perf_counter()
+                results = self.infer_batch([(sid, item[3]) for sid, item in batch])
+                if self.batcher is not None:
+                    self.batcher.observe(len(batch), time.perf_counter() - t0)
+                self.batches += 1
+                for (sid, (idx, ts, _, _)), result in zip(batch, results):
+                    stats  = self.stats[sid]
+                    record = {"stream": stats.name, "frame": idx,
+                              "t": round(ts, 3), "count": int(self.count(result))}
+                    stats.processed += 1
+                    stats.last = record
+                    if self.emit is not None:
+                        self.emit(record)
+        finally:
+            self.stop()
+        return self.stats
+
+    def stop(self):
+        """Stop the readers and release their captures (safe to call twice)."""
+        for r in self.readers:
+            r.stop.set()
+        for r in self.readers:
+            if r.is_alive():
+                r.join()
+            r.cap.release()
+
+    def latest(self) -> dict:
+        """Most recent count per stream name."""
+        return {s.name: s.last.get("count", 0) for s in self.stats}
+
+    def report(self, wall_s: float):
+        print(f"\n📹 Multi-stream summary ({len(self.stats)} streams, {self.batches} batches, {wall_s:.1f}s)")
+        for s in self.stats:
+            print(f"   {s.name:<16} processed {s.processed:>6}  dropped {s.dropped:>5}  "
+                  f"stale {s.stale:>5}  ({s.processed / max(wall_s, 1e-9):.1f} fps)")
@@ -0,0 +1,417 @@
+"""
+ai/prediction_server.py — Local low-latency prediction service
+--------------------------------------------------------------
+Holds the offline predictor (models/traffic_predictor.pkl, from
+ai/traffic_predictor.py) and the live MLPredictor in memory, so
+simulators, detection workers and CLIs stop loading their own copies.
+
+The live model is the newest models/ml_predictor*.pkl bundle (written by
+MLPredictor.save() or `python ai/traffic_predictor.py --live`), or the
+file given with --live-bundle; without one it falls back to an
+MLPredictor trained on its synthetic warm-up data.  A ModelWatcher
+hot-reloads new bundles the way the simulation does, swapping them in
+between batches.
+
+Protocol: newline-delimited JSON over a Unix socket (or localhost TCP).
+  → {"id": 1, "model": "live",    "features": [12 floats]}
+  ← {"id": 1, "horizons": [...], "predicted_ns": [...], "lower_ns": [...], ...}
+  → {"id": 2, "model": "offline", "features": [hour, day_of_week, ...]}
+  ← {"id": 2, "prediction": 42.0}          (or "forecast": {h: v} for
+                                            multi-horizon models)
+
+Concurrent requests are coalesced by MicroBatcher: the first request opens
+a batch, which is flushed when it holds max_batch rows or when
+max_delay_ms has elapsed, whichever comes first.  Each batch is one model
+call per model kind; results are scattered back to the waiting requests.
+Each request's features are checked when it is submitted, so a malformed
+one is rejected on its own and never joins a batch.  If a batched call
+still fails, its requests are retried one by one, so only the failing
+request gets the error.
+
+Usage:
+    python ai/prediction_server.py --socket /tmp/smart_traffic_predict.sock
+    python ai/prediction_server.py --tcp 8765 --max-delay-ms 2 --max-batch 64
+    python ai/prediction_server.py --live-bundle models/ml_predictor_tuned.pkl
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import socket
+import glob
+import asyncio
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation.ml_predictor import MLPredictor, prepare_bundle
+from simulation.model_watcher import ModelWatcher, MODEL_DIR
+
+# ── Defaults ─────────────────────────────────────────────────────────────────
+DEFAULT_SOCKET   = "/tmp/smart_traffic_predict.sock"
+DEFAULT_PORT     = 8765
+OFFLINE_MODEL    = os.path.join(os.path.dirname(__file__), "..", "models", "traffic_predictor.pkl")
+MAX_BATCH        = 64
+MAX_DELAY_MS     = 2.0
+LIVE_PATTERN     = "ml_predictor*.pkl"
+
+
+def default_address():
+    """Unix socket where supported, localhost TCP otherwise (Windows)."""
+    if hasattr(socket, "AF_UNIX"):
+        return DEFAULT_SOCKET
+    return ("127.0.0.1", DEFAULT_PORT)
+
+
+def newest_live_bundle(model_dir: str = MODEL_DIR) -> str | None:
+    """The most recently written MLPredictor bundle in model_dir, if any."""
+    paths = glob.glob(os.path.join(model_dir, LIVE_PATTERN))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+class _ConsoleLog:
+    """ModelWatcher logger for the server: prints reloads and rejections."""
+
+    def event(self, event_type: str, tick: int = 0, **kwargs):
+        print(f"[Server] {event_type}: " + ", ".join(f"{k}={v}" for k, v in kwargs.items()))
+
+
+# ── Model registry ───────────────────────────────────────────────────────────
+
+class ModelRegistry:
+    """The in-memory models served, with one batched entry point per kind."""
+
+    def __init__(self, offline_path: str = OFFLINE_MODEL, live: MLPredictor | None = None,
+                 live_bundle: str | None = None, watcher: ModelWatcher | None = None):
+        self.live    = live if live is not None else MLPredictor()
+        self.watcher = watcher
+        if live_bundle:
+            with open(live_bundle, "rb") as f:
+                self.live.install(prepare_bundle(pickle.load(f)), external=True)
+            print(f"[Server] Live model {self.live.model_version} loaded ← {live_bundle}")
+        else:
+            print("[Server] No live bundle — serving the warm-up MLPredictor.")
+        self.offline = None
+        if offline_path and os.path.exists(offline_path):
+            with open(offline_path, "rb") as f:
+                self.offline = pickle.load(f)
+            print(f"[Server] Offline model loaded ← {offline_path}")
+        else:
+            print("[Server] No offline model found — serving live predictor only.")
+
+    def refresh(self) -> bool:
+        """Install a hot-reloaded live bundle, if one is ready.  Call between batches."""
+        return self.watcher is not None and self.watcher.apply(self.live, _ConsoleLog())
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+
+    def predict_live(self, X: np.ndarray) -> list[dict]:
+        out  = self.live.predict_batch(X)
+        keys = [k for k, v in out.items() if isinstance(v, np.ndarray)]
+        return [
+            {"horizons": list(out["horizons"]), "model_type": out["model_type"],
+             **{k: out[k][i].tolist() for k in keys}}
+            for i in range(len(X))
+        ]
+
+    def predict_offline(self, X: np.ndarray) -> list[dict]:
+        if self.offline is None:
+            return [{"error": "offline model not loaded"}] * len(X)
+        pred     = np.asarray(self.offline.predict(X)).reshape(len(X), -1)
+        horizons = getattr(self.offline, "horizons_", None)
+        if horizons is None:
+            return [{"prediction": float(row[0])} for row in pred]
+        return [{"forecast": {str(h): float(v) for h, v in zip(horizons, row)}} for row in pred]
+
+    def n_features(self, kind: str) -> int | None:
+        if kind == "live":
+            return MLPredictor.N_FEATURES
+        if kind == "offline" and self.offline is not None:
+            return getattr(self.offline, "n_features_in_", None)
+        return None
+
+    def check(self, kind: str, features) -> list:
+        """Validate one request's features; raises ValueError before it joins a batch."""
+        if kind not in ("live", "offline"):
+            raise ValueError(f"unknown model {kind!r}")
+        row = np.asarray(features, dtype=float)
+        if row.ndim != 1:
+            raise ValueError("features must be a flat list of numbers")
+        expected = self.n_features(kind)
+        if expected is not None and len(row) != expected:
+            raise ValueError(f"{kind} model expects {expected} features, got {len(row)}")
+        return features
+
+    def predict(self, kind: str, rows: list) -> list[dict]:
+        X = np.asarray(rows, dtype=float)
+        if kind == "live":
+            return self.predict_live(X)
+        if kind == "offline":
+            return self.predict_offline(X)
+        return [{"error": f"unknown model {kind!r}"}] * len(rows)
+
+
+# ── Micro-batching ───────────────────────────────────────────────────────────
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submit() calls into batches bounded by max_batch
+    rows and max_delay_ms of added latency.
+    """
+
+    def __init__(self, registry: ModelRegistry, max_batch: int = MAX_BATCH,
+                 max_delay_ms: float = MAX_DELAY_MS):
+        self.registry  = registry
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.batches   = 0
+        self.rows      = 0
+
+    async def submit(self, kind: str, features: list) -> dict:
+        """Raises ValueError for a malformed request, which is never batched."""
+        self.registry.check(kind, features)
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((kind, features, fut))
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch    = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Off the event loop so sockets keep accepting while the model runs
+            await loop.run_in_executor(None, self._dispatch, batch)
+
+    def _dispatch(self, batch: list):
+        self.registry.refresh()
+        self.batches += 1
+        self.rows    += len(batch)
+        by_kind: dict[str, list] = {}
+        for item in batch:
+            by_kind.setdefault(item[0], []).append(item)
+        for kind, items in by_kind.items():
+            try:
+                results = self.registry.predict(kind, [it[1] for it in items])
+            except Exception:
+                results = [self._predict_one(kind, it[1]) for it in items]
+            for (_, _, fut), res in zip(items, results):
+                fut.get_loop().call_soon_threadsafe(_resolve, fut, res)
+
+    def _predict_one(self, kind: str, features: list) -> dict:
+        try:
+            return self.registry.predict(kind, [features])[0]
+        except Exception as exc:
+            return {"error": str(exc)}
+
+
+def _resolve(fut: asyncio.Future, result: dict):
+    if not fut.done():
+        fut.set_result(result)
+
+
+# ── Server ───────────────────────────────────────────────────────────────────
+
+class PredictionServer:
+    """asyncio server speaking newline-delimited JSON."""
+
+    def __init__(self, address=None, registry: ModelRegistry | None = None,
+                 max_batch: int = MAX_BATCH, max_delay_ms: float = MAX_DELAY_MS):
+        self.address  = address if address is not None else default_address()
+        self.registry = registry if registry is not None else ModelRegistry()
+        self.batcher  = MicroBatcher(self.registry, max_batch, max_delay_ms)
+        self._server  = None
+        self._batch_task = None
+
+    async def start(self):
+        self._batch_task = asyncio.create_task(self.batcher.run())
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = await asyncio.start_unix_server(self._handle, path=self.address)
+        else:
+            host, port   = self.address
+            self._server = await asyncio.start_server(self._handle, host, port)
+        print(f"[Server] Listening on {self.address}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    async def _handle(self, reader, writer):
+        pending = set()
+        lock    = asyncio.Lock()
+        try:
+            while line := await reader.readline():
+                # Requests on one connection are answered as they complete,
+                # so a client may pipeline many in flight (matched by "id").
+                task = asyncio.create_task(self._answer(line, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, line: bytes, writer, lock: asyncio.Lock):
+        req = {}
+        try:
+            req    = json.loads(line)
+            result = await self.batcher.submit(req.get("model", "live"), req["features"])
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            req    = req if isinstance(req, dict) else {}
+            result = {"error": f"bad request: {exc}"}
+        result = {"id": req.get("id"), **result}
+        async with lock:
+            writer.write((json.dumps(result) + "\n").encode())
+            await writer.drain()
+
+
+# ── Clients ──────────────────────────────────────────────────────────────────
+
+class PredictionClient:
+    """Blocking client — one request in flight at a time."""
+
+    def __init__(self, address=None, timeout: float = 5.0):
+        address = address if address is not None else default_address()
+        if isinstance(address, str):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(address)
+        self._file = self._sock.makefile("rb")
+        self._next_id = 0
+
+    def predict(self, features, model: str = "live") -> dict:
+        self._next_id += 1
+        req = {"id": self._next_id, "model": model, "features": list(map(float, features))}
+        self._sock.sendall((json.dumps(req) + "\n").encode())
+        return json.loads(self._file.readline())
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncPredictionClient:
+    """asyncio client; concurrent predict() calls share one pipelined connection."""
+
+    def __init__(self, address=None):
+        self.address  = address if address is not None else default_address()
+        self._reader  = None
+        self._writer  = None
+        self._waiters: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._reader_task = None
+
+    async def connect(self):
+        if isinstance(self.address, str):
+            self._reader, self._writer = await asyncio.open_unix_connection(self.address)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(*self.address)
+        self._reader_task = asyncio.create_task(self._read_loop())
+        return self
+
+    async def _read_loop(self):
+        while line := await self._reader.readline():
+            resp = json.loads(line)
+            fut  = self._waiters.pop(resp.get("id"), None)
+            if fut is not None and not fut.done():
+                fut.set_result(resp)
+
+    async def predict(self, features, model: str = "live") -> dict:
+        self._next_id += 1
+        rid = self._next_id
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[rid] = fut
+        req = {"id": rid, "model": model, "features": list(map(float, features))}
+        self._writer.write((json.dumps(req) + "\n").encode())
+        await self._writer.drain()
+        return await fut
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def run(address=None, max_batch: int = MAX_BATCH, max_delay_ms: float = MAX_DELAY_MS,
+        live_bundle: str | None = None, reload: bool = True):
+    """
+    Entry point called by run.py or directly.  live_bundle defaults to the
+    newest models/ml_predictor*.pkl; with reload, new bundles (or new
+    versions of an explicit live_bundle) are hot-swapped in.
+    """
+    if live_bundle is not None:
+        watch_dir, pattern = os.path.dirname(os.path.abspath(live_bundle)), os.path.basename(live_bundle)
+    else:
+        watch_dir, pattern = MODEL_DIR, LIVE_PATTERN
+        live_bundle = newest_live_bundle()
+    watcher = ModelWatcher(watch_dir, pattern) if reload else None
+    if watcher is not None:
+        watcher.start()
+        print(f"[Server] Watching {os.path.join(watch_dir, pattern)} for new live models")
+    registry = ModelRegistry(live_bundle=live_bundle, watcher=watcher)
+    server   = PredictionServer(address, registry, max_batch=max_batch, max_delay_ms=max_delay_ms)
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        b = server.batcher
+        print(f"\n⏹  Server stopped after {time.perf_counter() - t0:.0f}s — "
+              f"{b.rows} requests in {b.batches} batches "
+              f"(avg {b.rows / max(b.batches, 1):.1f}/batch)")
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SmartTrafficSystem — Prediction server")
+    parser.add_argument("--socket", default=None, help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--tcp", type=int, default=None, help="Serve on 127.0.0.1:<port> instead")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=MAX_DELAY_MS,
+                        help="Latency budget for filling a batch")
+    parser.add_argument("--live-bundle", default=None,
+                        help=f"MLPredictor bundle to serve (default: newest models/{LIVE_PATTERN})")
+    parser.add_argument("--no-reload", action="store_true",
+                        help="Do not hot-reload new live bundles")
+    args = parser.parse_args()
+    addr = ("127.0.0.1", args.tcp) if args.tcp else args.socket
+    run(addr, args.max_batch, args.max_delay_ms, args.live_bundle, reload=not args.no_reload)
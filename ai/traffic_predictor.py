@@ -7,11 +7,17 @@ Changes over original:
   • Prints model accuracy metrics (MAE, R²)
   • Exposes run() so CLI can call it directly
   • Gracefully handles missing CSV with a helpful message
+  • --live: trains an MLPredictor bundle on the CSV's per-tick counts and
+    writes models/ml_predictor.pkl, which a running simulation hot-reloads
+  • Multi-horizon forecasting: train_multi_horizon() fits one multi-output
+    forest whose outputs are the target FORECAST_HORIZONS rows ahead, and
+    forecast() evaluates a whole batch of rows in a single call
 """
 
 import os
 import sys
 import pickle
+import argparse
 import numpy  as np
 import pandas as pd
 
@@ -25,6 +31,11 @@ BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH   = os.path.join(BASE_DIR, "..", "data", "traffic_history.csv")
 MODEL_DIR   = os.path.join(BASE_DIR, "..", "models")
 MODEL_PATH  = os.path.join(MODEL_DIR, "traffic_predictor.pkl")
+LIVE_BUNDLE_PATH = os.path.join(MODEL_DIR, "ml_predictor.pkl")
+
+sys.path.insert(0, os.path.join(BASE_DIR, ".."))
+
+FORECAST_HORIZONS = [1, 6, 12, 36, 72]   # rows ahead (1 row = 1 tick of the CSV)
 
 
 def load_data() -> pd.DataFrame:
@@ -41,6 +52,15 @@ def load_data() -> pd.DataFrame:
 
 def preprocess(df: pd.DataFrame):
     """Auto-detect feature columns and encode categoricals."""
+    # Columns missing in some rows (signal fields of camera-derived history,
+    # left empty by scripts/batch_detect.py) would only mark where a row
+    # came from, and constant columns carry nothing: leave both out
+    unobserved = [c for c in df.columns
+                  if df[c].isna().any() or (len(df) > 1 and df[c].nunique() <= 1)]
+    if unobserved:
+        print(f"⚠️  Ignoring columns that are missing or constant: {unobserved}")
+        df = df.drop(columns=unobserved)
+
     # Encode string columns
     le = LabelEncoder()
     for col in df.select_dtypes(include="object").columns:
@@ -78,6 +98,84 @@ def train(X, y) -> RandomForestRegressor:
     return model
 
 
+def make_horizon_targets(y, horizons: list) -> np.ndarray:
+    """
+    Stack future values of y into an (n - max(horizons), len(horizons))
+    target matrix: row i holds y[i + h] for each horizon h.
+    """
+    y     = np.asarray(y)
+    max_h = max(horizons)
+    n     = len(y) - max_h
+    return np.column_stack([y[h:n + h] for h in horizons])
+
+
+def train_multi_horizon(X, y, horizons: list = FORECAST_HORIZONS) -> RandomForestRegressor:
+    """
+    Direct multi-output forecaster: one forest predicts the target at every
+    horizon from one feature pass.  Rows must be in time order; the split
+    is chronological so the evaluation never peeks into the future.
+    """
+    horizons = sorted(horizons)
+    Y        = make_horizon_targets(y, horizons)
+    X        = np.asarray(X)[:len(Y)]
+    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.2, shuffle=False)
+
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model.fit(X_train, Y_train)
+    model.horizons_ = horizons
+
+    Y_pred = model.predict(X_test).reshape(len(X_test), -1)
+    print(f"\n📈 Multi-horizon model trained ({len(horizons)} horizons)")
+    for k, h in enumerate(horizons):
+        mae = mean_absolute_error(Y_test[:, k], Y_pred[:, k])
+        print(f"   +{h:<4} MAE : {mae:.2f}")
+    return model
+
+
+def forecast(model, X) -> dict:
+    """
+    Batch inference over many rows (timestamps or intersections) at once.
+    Returns {horizon: ndarray of predictions, one per input row}.
+    """
+    X    = np.atleast_2d(np.asarray(X, dtype=float))
+    pred = model.predict(X).reshape(len(X), -1)
+    horizons = getattr(model, "horizons_", [0])
+    return {h: pred[:, k] for k, h in enumerate(horizons)}
+
+
+def train_live_bundle(df: pd.DataFrame) -> dict:
+    """
+    Fit a bundle for the simulation's MLPredictor from per-tick history
+    (the scripts/generate_data.py / headless-run schema).
+    """
+    from simulation.config       import PRED_HORIZON, PRED_HORIZONS
+    from simulation.ml_predictor import fit_bundle
+
+    required = ["tick", "ns_count", "ew_count", "ns_queue", "ew_queue"]
+    missing  = [c for c in required if c not in df.columns]
+    if missing:
+        print(f"❌ Live bundle needs per-tick columns, missing: {missing}")
+        sys.exit(1)
+
+    bundle = fit_bundle(df["ns_count"].values, df["ew_count"].values,
+                        df["ns_queue"].values, df["ew_queue"].values,
+                        df["tick"].values, sorted(set(PRED_HORIZONS) | {PRED_HORIZON}))
+    if bundle is None:
+        print("❌ Not enough rows to build live training windows.")
+        sys.exit(1)
+    print(f"📈 Live bundle trained on {bundle['samples']} windows (v{bundle['version']})")
+    return bundle
+
+
+def save_live_bundle(bundle: dict, path: str = LIVE_BUNDLE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(bundle, f)
+    os.replace(tmp, path)    # atomic: a running simulation may be watching
+    print(f"💾 Live bundle saved → {path}")
+
+
 def save_model(model):
     os.makedirs(MODEL_DIR, exist_ok=True)
     with open(MODEL_PATH, "wb") as f:
@@ -133,4 +231,11 @@ def run():
 
 # ── CLI ───────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SmartTrafficSystem — Traffic predictor")
+    parser.add_argument("--live", action="store_true",
+                        help="Train a simulation MLPredictor bundle → models/ml_predictor.pkl")
+    args = parser.parse_args()
+    if args.live:
+        save_live_bundle(train_live_bundle(load_data()))
+    else:
+        run()
\ No newline at end of file
@@ -3,39 +3,104 @@
 Safe wrapper for vehicle detection. If ultralytics YOLO is available and the model
 loads, detect_vehicles(frame) runs inference. Otherwise it returns 0, so the simulation
 can continue without a heavy ML dependency.
+
+Nothing is loaded at import time. The model is built on the first
+detect_vehicles() call, under a lock so concurrent callers share a single
+load.  A failed load is remembered, so frames are not retried against a
+missing model.
+
+    preload(pool_size=4)   build 4 warm instances up front (one per worker thread)
+    unload()               drop every instance and forget a failed load
+
+Each call borrows an instance from the process-wide pool and returns it
+afterwards, so pool_size threads can run inference at once without
+sharing a model.
 """
 
-try:
+import queue
+import threading
+import importlib.util
+
+import numpy as np
+
+# Only checks that the package is installed; ultralytics (and torch) are
+# imported by the first model build.
+_YOLO_AVAILABLE = importlib.util.find_spec("ultralytics") is not None
+
+MODEL_NAME = "yolov8n.pt"       # common small model name (downloads if needed)
+# COCO class ids we treat as vehicles: bicycle=1, car=2, motorcycle=3, bus=5, truck=7
+VEHICLE_IDS = np.array([1, 2, 3, 5, 7])
+
+_lock        = threading.Lock()
+_pool        = queue.Queue()     # idle model instances
+_pool_size   = 0                 # instances built (idle + borrowed)
+_load_failed = False
+
+
+def _build_model(weights: str):
     from ultralytics import YOLO
-    _YOLO_AVAILABLE = True
-except Exception:
-    _YOLO_AVAILABLE = False
+    return YOLO(weights)
+
+
+def preload(pool_size: int = 1, weights: str = MODEL_NAME) -> bool:
+    """Grow the warm pool to pool_size instances. Returns False if YOLO cannot load."""
+    global _pool_size, _load_failed
+    with _lock:
+        if not _YOLO_AVAILABLE or _load_failed:
+            return False
+        while _pool_size < pool_size:
+            try:
+                model = _build_model(weights)
+            except Exception:
+                _load_failed = True
+                return _pool_size > 0
+            _pool.put(model)
+            _pool_size += 1
+        return True
+
+
+def unload():
+    """Release all idle instances; borrowed ones are dropped when returned."""
+    global _pool_size, _load_failed, _pool
+    with _lock:
+        _pool        = queue.Queue()
+        _pool_size   = 0
+        _load_failed = False
+
+
+def is_loaded() -> bool:
+    return _pool_size > 0
+
+
+def count_vehicles(results) -> int:
+    """Vehicle boxes in one ultralytics result, filtered on the class tensor."""
+    boxes = getattr(results, "boxes", None)
+    cls   = getattr(boxes, "cls", None)
+    if cls is None:
+        return 0
+    if hasattr(cls, "cpu"):
+        cls = cls.cpu().numpy()
+    return int(np.isin(np.asarray(cls).astype(int).ravel(), VEHICLE_IDS).sum())
 
-_model = None
-if _YOLO_AVAILABLE:
-    try:
-        _model = YOLO("yolov8n.pt")  # common small model name (downloads if needed)
-    except Exception:
-        _model = None
-        _YOLO_AVAILABLE = False
 
 def detect_vehicles(frame=None):
     """
     If model is available and frame provided, returns number of vehicle detections.
     Otherwise returns 0.
     """
-    if _YOLO_AVAILABLE and _model is not None and frame is not None:
-        results = _model(frame)[0]
-        # COCO class ids we treat as vehicles: car=2, motorcycle=3, bus=5, truck=7, bicycle=1
-        vehicle_ids = {1,2,3,5,7}
-        boxes = getattr(results, "boxes", [])
-        count = 0
-        for b in boxes:
-            try:
-                cls = int(b.cls)
-                if cls in vehicle_ids:
-                    count += 1
-            except Exception:
-                continue
-        return count
-    return 0
+    if frame is None or not _YOLO_AVAILABLE:
+        return 0
+    while True:
+        if _pool_size == 0 and not preload(1):
+            return 0
+        pool = _pool
+        try:
+            model = pool.get(timeout=1.0)
+            break
+        except queue.Empty:         # all instances busy, or unloaded meanwhile
+            continue
+    try:
+        return count_vehicles(model(frame, verbose=False)[0])
+    finally:
+        if pool is _pool:           # not unloaded meanwhile
+            pool.put(model)
@@ -0,0 +1,290 @@
+"""
+ai/video_pipeline.py — Staged, threaded video processing
+--------------------------------------------------------
+Splits a detection loop into three stages connected by bounded queues:
+
+    decoder thread ──▶ inference (caller's thread) ──▶ annotate/encode thread
+       cap.read()         infer(frame)                   annotate, out.write,
+                                                         cv2.imshow
+
+Decode and encode overlap with inference instead of adding to it, so the
+end-to-end rate approaches the inference-only rate.  Bounded queues give
+backpressure: a slow stage blocks its producer rather than letting frames
+pile up in memory.  Every stage reports its time to a StageTimer.
+
+With a BatchSizer the inference stage gathers several decoded frames and
+runs them through infer_batch() in one call, then scatters the results
+back to the writer in frame order.
+
+The writer stage only annotates frames that are actually shown or
+written: with no window and no VideoWriter (headless, counts only) the
+annotate/encode work disappears.  write_every=k keeps every k-th frame
+and proxy_scale < 1 writes a downscaled proxy video.
+
+If the decoder or writer thread raises (a failing read, or an emit /
+annotate / write hitting an OSError), it sets stop so the other stages
+unwind, and run_pipeline re-raises the error once the threads are joined.
+
+Note: on macOS OpenCV windows must be driven from the main thread; run
+with display disabled there.
+"""
+
+import time
+import queue
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+QUEUE_SIZE = 8          # frames buffered between stages
+_END       = object()   # end-of-stream sentinel
+
+
+def put_or_stop(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up when stop is set. Returns False if it did."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def get_or_stop(q: queue.Queue, stop: threading.Event):
+    """Blocking get that returns the end sentinel once stop is set."""
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return _END
+
+
+class StageTimer:
+    """Thread-safe accumulator of wall time and item counts per stage."""
+
+    def __init__(self):
+        self.totals: dict[str, float] = defaultdict(float)
+        self.counts: dict[str, int]   = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, n: int = 1):
+        with self._lock:
+            self.totals[stage] += seconds
+            self.counts[stage] += n
+
+    @contextmanager
+    def time(self, stage: str, n: int = 1):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - t0, n)
+
+    def summary(self) -> dict:
+        """{stage: {"total_s", "ms_per_item", "items"}}"""
+        with self._lock:
+            return {
+                stage: {
+                    "total_s":     round(total, 3),
+                    "ms_per_item": round(total / max(self.counts[stage], 1) * 1000, 3),
+                    "items":       self.counts[stage],
+                }
+                for stage, total in self.totals.items()
+            }
+
+    def report(self, frames: int, wall_s: float):
+        print(f"\n⏱  Stage timing ({frames} frames, {wall_s:.1f}s wall)")
+        for stage, s in self.summary().items():
+            print(f"   {stage:<10} {s['ms_per_item']:>8.2f} ms/item  ({s['total_s']:.1f}s total)")
+        infer = self.summary().get("infer")
+        e2e   = frames / wall_s if wall_s > 0 else 0.0
+        line  = f"   end-to-end {e2e:.1f} fps"
+        if infer and infer["ms_per_item"] > 0:
+            line += f"  |  inference-only {1000 / infer['ms_per_item']:.1f} fps"
+        print(line)
+
+
+class StampedCapture:
+    """
+    Capture wrapper that remembers time.monotonic() of each successful
+    read, for latency measured from the frame leaving the decoder.  Keeps
+    the last `keep` stamps, far more than the frames in flight.
+    """
+
+    def __init__(self, cap, keep: int = 1024):
+        self.cap    = cap
+        self.stamps = np.zeros(keep)
+        self.reads  = 0
+
+    def read(self):
+        ok, frame = self.cap.read()
+        if ok:
+            self.stamps[self.reads % len(self.stamps)] = time.monotonic()
+            self.reads += 1
+        return ok, frame
+
+    def stamp(self, idx: int) -> float:
+        return float(self.stamps[idx % len(self.stamps)])
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class FrameReader(threading.Thread):
+    """Decoder stage: pushes (index, frame) into out_q, then the end sentinel."""
+
+    def __init__(self, cap, out_q: queue.Queue, stop: threading.Event, timer: StageTimer):
+        super().__init__(name="frame-reader", daemon=True)
+        self.cap, self.out_q, self.stop, self.timer = cap, out_q, stop, timer
+        self.frames = 0
+        self.error: BaseException | None = None
+
+    def run(self):
+        try:
+            self._read()
+        except BaseException as e:        # surfaced by run_pipeline
+            self.error = e
+            self.stop.set()
+
+    def _read(self):
+        while not self.stop.is_set():
+            t0 = time.perf_counter()
+            ok, frame = self.cap.read()
+            if not ok:
+                break
+            self.timer.add("decode", time.perf_counter() - t0)
+            if not put_or_stop(self.out_q, (self.frames, frame), self.stop):
+                return
+            self.frames += 1
+        put_or_stop(self.out_q, _END, self.stop)
+
+
+class FrameWriter(threading.Thread):
+    """
+    Annotate/encode stage: draws results onto frames, writes them to the
+    VideoWriter and optionally shows them.  Pressing Q sets stop.
+    emit(index, result) sees every frame, written or not.
+    """
+
+    def __init__(self, in_q: queue.Queue, stop: threading.Event, timer: StageTimer,
+                 annotate, out=None, window: str | None = None, emit=None,
+                 write_every: int = 1, proxy_scale: float = 1.0):
+        super().__init__(name="frame-writer", daemon=True)
+        self.in_q, self.stop, self.timer = in_q, stop, timer
+        self.annotate, self.out, self.window = annotate, out, window
+        self.emit        = emit
+        self.write_every = max(1, write_every)
+        self.proxy_scale = proxy_scale
+        self.frames = 0
+        self.error: BaseException | None = None
+
+    def run(self):
+        try:
+            self._write()
+        except BaseException as e:        # surfaced by run_pipeline
+            self.error = e
+        finally:
+            self.stop.set()
+
+    def _write(self):
+        while (item := get_or_stop(self.in_q, self.stop)) is not _END:
+            idx, frame, result = item
+            if self.emit is not None:
+                self.emit(idx, result)
+            write = self.out is not None and idx % self.write_every == 0
+            if (write or self.window) and self.annotate is not None:
+                with self.timer.time("annotate"):
+                    self.annotate(frame, result)
+            if write:
+                with self.timer.time("encode"):
+                    if self.proxy_scale != 1.0:
+                        frame_out = cv2.resize(frame, None, fx=self.proxy_scale, fy=self.proxy_scale,
+                                               interpolation=cv2.INTER_AREA)
+                    else:
+                        frame_out = frame
+                    self.out.write(frame_out)
+            if self.window:
+                with self.timer.time("display"):
+                    cv2.imshow(self.window, frame)
+                    key = cv2.waitKey(1) & 0xFF
+                if key == ord("q"):
+                    print("\n⏹  Detection stopped by user.")
+                    self.stop.set()
+            self.frames += 1
+
+
+def _gather(frames_q: queue.Queue, stop: threading.Event, size: int) -> tuple[list, bool]:
+    """Collect up to `size` items; returns (items, reached_end)."""
+    items = []
+    while len(items) < size:
+        item = get_or_stop(frames_q, stop)
+        if item is _END:
+            return items, True
+        items.append(item)
+    return items, False
+
+
+def run_pipeline(cap, infer=None, annotate=None, out=None, window: str | None = None,
+                 queue_size: int = QUEUE_SIZE, infer_batch=None,
+                 batcher=None, emit=None, write_every: int = 1,
+                 proxy_scale: float = 1.0) -> tuple[StageTimer, int, float]:
+    """
+    Run decode → infer → annotate/encode until the source ends or the user
+    quits.  infer(frame) — or infer_batch(frames) → results, sized by
+    `batcher` (ai.batching.BatchSizer) — runs on the calling thread, which
+    usually owns the model; annotate(frame, result) and emit(index, result)
+    run on the writer thread.  An exception in either thread stops the
+    pipeline and is re-raised here.
+    Returns (timer, frames_processed, wall_seconds).
+    """
+    if infer_batch is None:
+        infer_batch = lambda frames: [infer(f) for f in frames]     # noqa: E731
+    batch_size = (lambda: batcher.current) if batcher is not None else (lambda: 1)
+
+    timer     = StageTimer()
+    stop      = threading.Event()
+    frames_q  = queue.Queue(maxsize=max(queue_size, 2 * (batcher.max_batch if batcher else 1)))
+    results_q = queue.Queue(maxsize=queue_size)
+
+    reader = FrameReader(cap, frames_q, stop, timer)
+    writer = FrameWriter(results_q, stop, timer, annotate, out, window,
+                         emit=emit, write_every=write_every, proxy_scale=proxy_scale)
+
+    t0 = time.perf_counter()
+    reader.start()
+    writer.start()
+    try:
+        done = False
+        while not done:
+            batch, done = _gather(frames_q, stop, batch_size())
+            if not batch:
+                break
+            t_inf = time.perf_counter()
+            results = infer_batch([frame for _, frame in batch])
+            elapsed = time.perf_counter() - t_inf
+            timer.add("infer", elapsed, len(batch))
+            if batcher is not None:
+                batcher.observe(len(batch), elapsed)
+            if not all(put_or_stop(results_q, (idx, frame, res), stop)
+                       for (idx, frame), res in zip(batch, results)):
+                break
+        put_or_stop(results_q, _END, stop)
+        writer.join()
+    finally:
+        stop.set()
+        reader.join()
+        writer.join()
+    for stage in (reader, writer):
+        if stage.error is not None:
+            raise stage.error
+    return timer, writer.frames, time.perf_counter() - t0
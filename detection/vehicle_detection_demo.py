@@ -6,16 +6,19 @@ from ultralytics import YOLO
 from collections import Counter
 
 
-def run_detection(video_name="traffic.mp4"):
+def run_detection(video_name="traffic.mp4", bridge=None):
     """
     Run vehicle detection on a recorded video.
     Looks for video inside detection/videos/ folder.
+    bridge: optional shared-memory ring name (ai/count_bridge.py) that a
+    live simulation reads counts from instead of latest_counts.json.
     """
 
     video_path = os.path.join(os.path.dirname(__file__), "videos", video_name)
 
     if not os.path.exists(video_path):
-        raise FileNotFoundError(f"Video file not found: {video_path}")
+        raise FileNotFoundError(f"Video file not found: {video_path} "
+                                f"(render one offline: python scripts/synth_video.py {video_path})")
 
     # Load YOLOv8 nano (lightweight and fast)
     model = YOLO("yolov8n.pt")
@@ -23,6 +26,16 @@ def run_detection(video_name="traffic.mp4"):
     # Map COCO class IDs to vehicle names
     vehicle_classes = {2: "car", 3: "motorbike", 5: "bus", 7: "truck"}
 
+    # Track IDs persist across frames, so each vehicle is only counted once
+    seen_ids = set()
+
+    ring = None
+    if bridge:
+        import sys
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from ai.count_bridge import CountBridge
+        ring = CountBridge.create(bridge)
+
     # Process video frame by frame
     for result in model.track(source=video_path, show=True, stream=True, classes=list(vehicle_classes.keys())):
         counts = Counter()
@@ -33,20 +46,31 @@ def run_detection(video_name="traffic.mp4"):
             if cls in vehicle_classes:
                 counts[vehicle_classes[cls]] += 1
 
+        if result.boxes.id is not None:
+            seen_ids.update(result.boxes.id.int().tolist())
+
         # Save counts into JSON file
         data = {
             "cars": counts["car"],
             "motorbikes": counts["motorbike"],
             "buses": counts["bus"],
             "trucks": counts["truck"],
-            "total": sum(counts.values())
+            "total": sum(counts.values()),
+            "unique_vehicles": len(seen_ids)
         }
 
-        with open("latest_counts.json", "w") as jf:
+        # Write-then-rename, so readers never see a half-written file
+        with open("latest_counts.json.tmp", "w") as jf:
             json.dump(data, jf, indent=2)
+        os.replace("latest_counts.json.tmp", "latest_counts.json")
+        if ring is not None:
+            ring.publish({"count": data["total"]})
 
         print("Vehicle counts:", data)
 
+    if ring is not None:
+        ring.close()
+
 
 if __name__ == "__main__":
     run_detection("traffic.mp4")   # default video in detection/videos/
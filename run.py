@@ -5,13 +5,15 @@ Usage:
     python run.py simulate
     python run.py predict
     python run.py all --video data/sample.mp4
+    python run.py serve
+    python run.py batch --dir data/recordings --rois data/rois/example.json
 """
 
 import argparse
 import sys
 import os
 
-def run_detect(video_path):
+def run_detect(video_path, **options):
     print(f"\n🚗 Starting Vehicle Detection on: {video_path}\n")
     if not os.path.exists(video_path):
         print(f"❌ Error: Video file not found at '{video_path}'")
@@ -22,7 +24,7 @@ def run_detect(video_path):
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), "ai"))
     try:
         import detect_video
-        detect_video.run(video_path)
+        detect_video.run(video_path, **options)
     except AttributeError:
         # Fallback: if detect_video has no run() function, patch and import
         import importlib
@@ -31,14 +33,11 @@ def run_detect(video_path):
         # The module will use os.environ["TRAFFIC_VIDEO_PATH"]
 
 
-def run_simulate():
+def run_simulate(bridge=None, binary_logs=False):
     print("\n📊 Starting Traffic Simulation Dashboard...\n")
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), "simulation"))
-    try:
-        import main as sim_main
-        sim_main.run()
-    except AttributeError:
-        import main  # noqa — runs on import
+    import main as sim_main
+    sim_main.main(bridge=bridge, binary_logs=binary_logs)
 
 
 def run_predict():
@@ -51,13 +50,33 @@ def run_predict():
         import traffic_predictor  # noqa — runs on import
 
 
-def run_all(video_path):
+def run_serve(socket_path=None, tcp_port=None, live_bundle=None):
+    print("\n🛰  Starting Local Prediction Server...\n")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "ai"))
+    import prediction_server
+    address = ("127.0.0.1", tcp_port) if tcp_port else socket_path
+    prediction_server.run(address, live_bundle=live_bundle)
+
+
+def run_batch(directory, **options):
+    print(f"\n🗂  Batch detection over: {directory}\n")
+    if not os.path.isdir(directory):
+        print(f"❌ Error: directory not found at '{directory}'")
+        sys.exit(1)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from scripts.batch_detect import run_batch as batch
+    batch(directory, **options)
+
+
+def run_all(video_path, bridge="smart_traffic_counts"):
     import threading
     print("\n🚦 SmartTrafficSystem — Full Pipeline\n")
     print("Starting detection + simulation in parallel...\n")
 
-    t_detect   = threading.Thread(target=run_detect,   args=(video_path,), daemon=True)
-    t_simulate = threading.Thread(target=run_simulate, daemon=True)
+    # Detection publishes per-frame counts to a shared-memory ring; the simulation spawns from them
+    t_detect   = threading.Thread(target=run_detect,   args=(video_path,),
+                                  kwargs={"bridge": bridge}, daemon=True)
+    t_simulate = threading.Thread(target=run_simulate, kwargs={"bridge": bridge}, daemon=True)
     t_predict  = threading.Thread(target=run_predict,  daemon=True)
 
     t_predict.start()
@@ -78,9 +97,13 @@ def main():
         epilog="""
 Examples:
   python run.py detect --video data/sample.mp4
+  python run.py detect --video data/sample.mp4 --headless --no-video --counts-out data/counts.csv
   python run.py simulate
+  python run.py simulate --binary-logs
   python run.py predict
   python run.py all --video data/sample.mp4
+  python run.py serve
+  python run.py batch --dir data/recordings --rois data/rois/example.json --workers 4
         """
     )
 
@@ -89,9 +112,14 @@ Examples:
     # detect
     p_detect = subparsers.add_parser("detect", help="Run vehicle detection on a video file")
     p_detect.add_argument("--video", required=True, help="Path to input video file (e.g. data/sample.mp4)")
+    p_detect.add_argument("--headless", action="store_true", help="No preview window")
+    p_detect.add_argument("--no-video", action="store_true", help="Skip the annotated output video")
+    p_detect.add_argument("--counts-out", default=None, help="Stream counts to a .csv / .jsonl file")
 
     # simulate
-    subparsers.add_parser("simulate", help="Run the traffic simulation dashboard")
+    p_sim = subparsers.add_parser("simulate", help="Run the traffic simulation dashboard")
+    p_sim.add_argument("--binary-logs", action="store_true",
+                       help="Write logs/ in the typed binary format instead of CSV")
 
     # predict
     subparsers.add_parser("predict", help="Run the traffic flow predictor")
@@ -99,17 +127,41 @@ Examples:
     # all
     p_all = subparsers.add_parser("all", help="Run full pipeline: predict + detect + simulate")
     p_all.add_argument("--video", required=True, help="Path to input video file")
+    p_all.add_argument("--bridge", default="smart_traffic_counts",
+                       help="Shared-memory ring linking detection counts to the simulation")
+
+    # serve
+    p_serve = subparsers.add_parser("serve", help="Run the local batched prediction server")
+    p_serve.add_argument("--socket", default=None, help="Unix socket path")
+    p_serve.add_argument("--tcp", type=int, default=None, help="Serve on 127.0.0.1:<port> instead")
+    p_serve.add_argument("--live-bundle", default=None,
+                         help="MLPredictor bundle to serve (default: newest models/ml_predictor*.pkl)")
+
+    # batch
+    p_batch = subparsers.add_parser("batch", help="Detect over a directory of videos → traffic_history.csv")
+    p_batch.add_argument("--dir", required=True, help="Directory searched recursively for videos")
+    p_batch.add_argument("--rois", default=None, help="Approach polygons (or <video>.rois.json sidecars)")
+    p_batch.add_argument("--out-dir", default="data/batch", help="Per-video parts + consolidated CSV")
+    p_batch.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPUs)")
+    p_batch.add_argument("--threads", type=int, default=None, help="CPU threads per worker")
+    p_batch.add_argument("--sample-every", type=float, default=1.0, help="Seconds between samples")
 
     args = parser.parse_args()
 
     if args.command == "detect":
-        run_detect(args.video)
+        run_detect(args.video, headless=args.headless, save_video=not args.no_video,
+                   counts_out=args.counts_out)
     elif args.command == "simulate":
-        run_simulate()
+        run_simulate(binary_logs=args.binary_logs)
     elif args.command == "predict":
         run_predict()
     elif args.command == "all":
-        run_all(args.video)
+        run_all(args.video, args.bridge)
+    elif args.command == "serve":
+        run_serve(args.socket, args.tcp, args.live_bundle)
+    elif args.command == "batch":
+        run_batch(args.dir, out_dir=args.out_dir, rois=args.rois, workers=args.workers,
+                  threads=args.threads, sample_every_s=args.sample_every)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,287 @@
+"""
+scripts/batch_detect.py — Offline detection over a directory of recordings
+
+Walks a directory for videos and spreads them over worker processes.
+Each worker loads one detector and runs with its own CPU-thread budget
+(OpenCV, ONNX Runtime / PyTorch intra-op threads).  Every video is
+sampled once per --sample-every seconds and counted per approach inside
+its ROI polygons (--rois, or a <video>.rois.json next to the clip).
+
+Resume: each finished video leaves out_dir/parts/<path>.<fingerprint>.csv,
+written atomically.  A re-run skips videos whose part already exists,
+so an interrupted batch restarts where it stopped and only redoes the
+videos that were in flight.
+
+At the end the parts are consolidated per camera into CSVs in the
+traffic_history.csv schema (scripts/generate_data.py COLUMNS), so
+ai/traffic_predictor.py trains on real counts directly.  The camera of a
+clip is the "camera" field of its <clip>.rois.json, else its directory
+under the batch root, else the "camera" field of --rois.  With one
+camera the output is --out; with several, one <out>_<camera>.csv each,
+so junctions recorded at the same time are never averaged together.
+
+  tick / day / hour / minute / time_of_day   from the recording's start
+      time: a YYYYMMDD[_-]HHMMSS stamp in the file name, else the file
+      mtime minus the clip duration.  Day 0 is the earliest recording.
+  ns_count, ew_count, ns_queue, ew_queue      mean per tick bucket (rounded)
+  total_vehicles                              ns_count + ew_count
+  mode                                        from hour and NS count, as generated data
+  signal_phase, signal_state, emergency, avg_wait_s
+      empty: not observable from a camera (ai/traffic_predictor.py
+      ignores columns with missing values)
+
+Usage:
+    python scripts/batch_detect.py data/recordings --rois data/rois/example.json --workers 4
+    python run.py batch --dir data/recordings --rois data/rois/example.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.generate_data import COLUMNS, determine_mode
+
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".ts")
+STAMP_RE   = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})[T_ -]?(\d{2})-?(\d{2})-?(\d{2})")
+APPROACH_COLS = ["ns_count", "ew_count", "ns_queue", "ew_queue"]
+EPOCH      = datetime(1970, 1, 1)
+
+_detector = None        # per-worker model, loaded once by _init_worker
+
+
+def find_videos(root: str) -> list[str]:
+    found = []
+    for d, _, files in os.walk(root):
+        found += [os.path.join(d, f) for f in files if f.lower().endswith(VIDEO_EXTS)]
+    return sorted(found)
+
+
+def recording_start(path: str, duration_s: float) -> float:
+    """
+    Local wall-clock start of the clip as seconds since 1970-01-01 (naive,
+    no time zone): file-name stamp, else mtime − duration.
+    """
+    m = STAMP_RE.search(os.path.basename(path))
+    if m:
+        try:
+            return (datetime(*map(int, m.groups())) - EPOCH).total_seconds()
+        except ValueError:
+            pass
+    return (datetime.fromtimestamp(os.path.getmtime(path)) - EPOCH).total_seconds() - duration_s
+
+
+def rois_for(path: str, default: str | None) -> str | None:
+    sidecar = os.path.splitext(path)[0] + ".rois.json"
+    return sidecar if os.path.exists(sidecar) else default
+
+
+def camera_for(path: str, root: str, rois: str) -> str:
+    """Camera key of a clip: sidecar "camera", else its directory under root, else --rois "camera"."""
+    rel, named = os.path.dirname(os.path.relpath(path, root)), None
+    if rois == rois_for(path, None) or not rel:   # a shared --rois names every clip alike
+        with open(rois) as f:
+            named = json.load(f).get("camera")
+    return re.sub(r"[^\w.-]+", "_", named or rel or "camera")
+
+
+# ── Worker ───────────────────────────────────────────────────────────────────
+
+def _init_worker(backend: str, threads: int):
+    global _detector
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import cv2
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from ai.detector_backend import load_backend
+    from ai.detect_video import MODEL_PATH, CONFIDENCE
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        _detector = load_backend(backend, MODEL_PATH, conf=CONFIDENCE, threads=threads)
+
+
+def process_video(path: str, part: str, rois: str, sample_every_s: float,
+                  backend: str, cache_dir: str | None, camera: str = "camera") -> tuple[str, int, float]:
+    """Count one video into its part CSV. Returns (path, rows, seconds)."""
+    import cv2
+    from ai.detect_video import run
+
+    t0  = time.perf_counter()
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    cap.release()
+
+    counts = part + ".jsonl"
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run(path, headless=True, save_video=False, counts_out=counts, rois=rois,
+            sample_every_s=sample_every_s, backend=backend, cache_dir=cache_dir,
+            detector=_detector)
+    df = pd.read_json(counts, lines=True) if os.path.getsize(counts) else pd.DataFrame()
+    os.remove(counts)
+    out = pd.DataFrame({"ts": recording_start(path, duration) + df.get("t", pd.Series(dtype=float))})
+    for col in APPROACH_COLS:
+        out[col] = df[col] if col in df else pd.Series(dtype=int)
+    out["video"]  = os.path.basename(path)
+    out["camera"] = camera
+    out.to_csv(part + ".tmp", index=False)
+    os.replace(part + ".tmp", part)
+    return path, len(out), time.perf_counter() - t0
+
+
+def _process(job):
+    try:
+        return process_video(*job)
+    except (Exception, SystemExit) as e:        # one bad clip must not stop the batch
+        return job[0], -1, repr(e)
+
+
+# ── Consolidation ────────────────────────────────────────────────────────────
+
+def consolidate(parts_dir: str, out_path: str, ticks_per_hour: int = 360) -> dict[str, tuple[str, int]]:
+    """
+    Merge the parts into traffic_history.csv-schema files, one per camera
+    (out_path itself when there is only one).  Returns {camera: (path, rows)}.
+    """
+    parts = [os.path.join(parts_dir, f) for f in sorted(os.listdir(parts_dir)) if f.endswith(".csv")]
+    df = pd.concat([pd.read_csv(p) for p in parts], ignore_index=True) if parts else pd.DataFrame()
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    if df.empty:
+        pd.DataFrame(columns=COLUMNS).to_csv(out_path, index=False)
+        return {}
+    if "camera" not in df:
+        df["camera"] = "camera"                   # parts written before cameras were kept
+    df["camera"] = df["camera"].fillna("camera").astype(str)
+
+    ts     = pd.to_datetime(df["ts"], unit="s")
+    day0   = ts.dt.normalize().min()              # shared, so cameras stay comparable
+    sec    = (ts - day0).dt.total_seconds()
+    df["tick"] = (sec * ticks_per_hour / 3600).astype(np.int64)
+
+    cameras = sorted(df["camera"].unique())
+    stem, ext = os.path.splitext(out_path)
+    written = {}
+    for cam in cameras:
+        path = out_path if len(cameras) == 1 else f"{stem}_{cam}{ext}"
+        rows = _history(df[df["camera"] == cam], ticks_per_hour)
+        rows.to_csv(path, index=False)
+        written[cam] = (path, len(rows))
+    return written
+
+
+def _history(df: pd.DataFrame, ticks_per_hour: int) -> pd.DataFrame:
+    """One camera's samples → mean per tick, in the generated-data schema."""
+    g = df.groupby("tick")[APPROACH_COLS].mean().round().astype(np.int64).reset_index()
+
+    tpd       = ticks_per_hour * 24
+    tick_day  = g["tick"] % tpd
+    hour_frac = tick_day / ticks_per_hour
+    hour      = hour_frac.astype(np.int64)
+    g["day"]            = g["tick"] // tpd
+    g["hour"]           = hour
+    g["minute"]         = ((hour_frac - hour) * 60).astype(np.int64)
+    g["time_of_day"]    = (tick_day / tpd).round(4)
+    g["total_vehicles"] = g["ns_count"] + g["ew_count"]
+    g["mode"]           = determine_mode(hour_frac.values, g["ns_count"].values)
+    for col in ("signal_phase", "signal_state", "emergency", "avg_wait_s"):
+        g[col] = np.nan                           # not observable from a camera
+    return g[COLUMNS]
+
+
+# ── Batch ────────────────────────────────────────────────────────────────────
+
+def run_batch(root: str, out_dir: str = "data/batch", rois: str | None = None,
+              workers: int | None = None, threads: int | None = None,
+              sample_every_s: float = 1.0, backend: str = "auto",
+              cache_dir: str | None = None, ticks_per_hour: int = 360,
+              out_path: str | None = None) -> dict:
+    from ai.detection_cache import video_fingerprint
+
+    parts_dir = os.path.join(out_dir, "parts")
+    os.makedirs(parts_dir, exist_ok=True)
+    out_path  = out_path or os.path.join(out_dir, "traffic_history.csv")
+
+    videos  = find_videos(root)
+    jobs, skipped, no_rois = [], 0, []
+    for v in videos:
+        # Content and location: identical copies of a clip are still separate recordings
+        rel  = re.sub(r"[^\w.-]+", "_", os.path.relpath(v, root))
+        part = os.path.join(parts_dir, f"{rel}.{video_fingerprint(v)}.csv")
+        r    = rois_for(v, rois)
+        if os.path.exists(part):
+            skipped += 1
+        elif r is None:
+            no_rois.append(v)
+        else:
+            jobs.append((v, part, r, sample_every_s, backend, cache_dir, camera_for(v, root, r)))
+    for v in no_rois:
+        print(f"⚠️  {v}: no --rois and no {os.path.basename(os.path.splitext(v)[0])}.rois.json — skipped")
+
+    workers = max(1, min(workers or cpu_count(), len(jobs) or 1))
+    threads = threads or max(1, cpu_count() // workers)
+    print(f"🎞  {len(videos)} videos: {len(jobs)} to process, {skipped} already done "
+          f"({workers} workers × {threads} threads)")
+
+    failed, t0 = [], time.perf_counter()
+    if jobs:
+        pool = Pool(workers, initializer=_init_worker, initargs=(backend, threads))
+        try:
+            for i, (path, rows, info) in enumerate(pool.imap_unordered(_process, jobs), 1):
+                if rows < 0:
+                    failed.append(path)
+                    print(f"  [{i}/{len(jobs)}] ❌ {os.path.basename(path)}: {info}")
+                else:
+                    print(f"  [{i}/{len(jobs)}] {os.path.basename(path)}: {rows} samples in {info:.1f}s")
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            print("\n⏸  Interrupted — finished videos are kept; re-run to resume.")
+            raise
+        finally:
+            pool.join()
+
+    written = consolidate(parts_dir, out_path, ticks_per_hour)
+    for cam, (path, n) in written.items():
+        print(f"✅ {cam}: {n} rows → {path}")
+    print(f"   {time.perf_counter() - t0:.1f}s, {len(failed)} failed")
+    outputs = {cam: path for cam, (path, _) in written.items()}
+    return {"videos": len(videos), "processed": len(jobs) - len(failed), "skipped": skipped,
+            "failed": failed, "no_rois": no_rois, "rows": sum(n for _, n in written.values()),
+            "outputs": outputs, "output": out_path if len(outputs) <= 1 else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch detection over a directory of videos")
+    parser.add_argument("dir", help="Directory searched recursively for videos")
+    parser.add_argument("--out-dir", default="data/batch", help="Parts + consolidated output")
+    parser.add_argument("--out",     default=None,
+                        help="Consolidated CSV (default: <out-dir>/traffic_history.csv)")
+    parser.add_argument("--rois",    default=None, help="Approach polygons for every video")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPUs)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="CPU threads per worker (default: CPUs / workers)")
+    parser.add_argument("--sample-every", type=float, default=1.0, help="Seconds between samples")
+    parser.add_argument("--backend", default="auto", choices=("auto", "torch", "onnx", "onnx-int8"))
+    parser.add_argument("--cache",   default=None, metavar="DIR", help="Detection cache directory")
+    parser.add_argument("--tph",     type=int, default=360,
+                        help="Ticks per hour of the output (default: 360 = 1 tick/10s)")
+    args = parser.parse_args(argv)
+    return run_batch(args.dir, args.out_dir, args.rois, args.workers, args.threads,
+                     args.sample_every, args.backend, args.cache, args.tph, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+scripts/bench_backends.py — Detector backend speed and agreement
+
+Runs each detector backend (PyTorch, ONNX Runtime fp32, ONNX Runtime
+INT8) over the same frames and prints frames/s plus how closely the
+vehicle counts match the reference backend (the first one that loads,
+normally torch):
+
+    backend      fps    ×ref   count MAE   exact
+    torch        …
+
+Backends that cannot load here (no ultralytics, no onnxruntime, no
+cached export) are reported and skipped.
+
+Usage:
+    python scripts/bench_backends.py --video data/sample.mp4 --frames 200
+    python scripts/bench_backends.py --backends onnx onnx-int8 --batch 4
+    python scripts/bench_backends.py --video data/cam1.mp4 --calib data/cam1_day.mp4
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.detector_backend import load_backend, DEFAULT_WEIGHTS
+from scripts.bench_batch import load_frames
+
+
+def time_backend(backend, frames: list, batch: int) -> tuple[float, np.ndarray]:
+    """(frames/s, per-frame vehicle counts) after one warm-up batch."""
+    backend.detect(frames[:batch])
+    counts = []
+    t0 = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        counts.extend(len(xyxy) for xyxy, _, _ in backend.detect(frames[i:i + batch]))
+    return len(frames) / (time.perf_counter() - t0), np.array(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detector backend benchmark")
+    parser.add_argument("--video",    default=None)
+    parser.add_argument("--frames",   type=int, default=100)
+    parser.add_argument("--imgsz",    type=int, default=640)
+    parser.add_argument("--batch",    type=int, default=1)
+    parser.add_argument("--threads",  type=int, default=None, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--weights",  default=DEFAULT_WEIGHTS)
+    parser.add_argument("--calib",    default=None, help="video to calibrate a new INT8 export on")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    args = parser.parse_args()
+
+    frames  = load_frames(args.video, args.frames, args.imgsz)
+    results = []
+    for kind in args.backends:
+        try:
+            backend = load_backend(kind, args.weights, args.imgsz, threads=args.threads,
+                                   calib=args.calib)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"⚠️  {kind}: {e}")
+            continue
+        if backend is None:
+            print(f"⚠️  {kind}: not available, skipped")
+            continue
+        fps, counts = time_backend(backend, frames, args.batch)
+        results.append((kind, fps, counts))
+
+    if not results:
+        sys.exit("No backend could be loaded.")
+    _, ref_fps, ref_counts = results[0]
+    print(f"\n{'─'*60}")
+    print(f"  {len(frames)} frames, batch {args.batch}, imgsz {args.imgsz}, reference {results[0][0]}")
+    print(f"  {'backend':<12} {'fps':>8} {'×ref':>7} {'count MAE':>10} {'exact':>7}")
+    for kind, fps, counts in results:
+        mae   = np.abs(counts - ref_counts).mean()
+        exact = (counts == ref_counts).mean()
+        print(f"  {kind:<12} {fps:>8.1f} {fps / ref_fps:>7.2f} {mae:>10.3f} {exact:>6.0%}")
+    print(f"{'─'*60}\n")
+
+
+if __name__ == "__main__":
+    main()
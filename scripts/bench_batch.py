@@ -0,0 +1,83 @@
+"""
+scripts/bench_batch.py — YOLO throughput vs batch size
+
+Runs the detector over a fixed set of frames at batch sizes 1, 2, 4, …
+and prints frames/s and per-batch latency for each, then shows what
+BatchSizer would pick under the given latency cap.  Use it to choose
+--batch for ai/detect_video.py on a given machine.
+
+Frames come from --video (first --frames frames) or, without one, from
+random noise at --imgsz resolution.
+
+Usage:
+    python scripts/bench_batch.py --video data/sample.mp4 --frames 64
+    python scripts/bench_batch.py --max-batch 16 --latency-cap-ms 150
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.batching import BatchSizer, measure_throughput
+
+
+def load_frames(video: str | None, n: int, imgsz: int) -> list:
+    if video is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (imgsz, imgsz, 3), dtype=np.uint8) for _ in range(n)]
+    import cv2
+    cap, frames = cv2.VideoCapture(video), []
+    while len(frames) < n:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        sys.exit(f"❌ Could not read frames from {video}")
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO batch-size throughput benchmark")
+    parser.add_argument("--video",          default=None)
+    parser.add_argument("--frames",         type=int,   default=64)
+    parser.add_argument("--imgsz",          type=int,   default=640)
+    parser.add_argument("--max-batch",      type=int,   default=16)
+    parser.add_argument("--latency-cap-ms", type=float, default=250.0)
+    parser.add_argument("--repeats",        type=int,   default=3)
+    args = parser.parse_args()
+
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        sys.exit("❌ ultralytics not installed (pip install ultralytics)")
+    from ai.detect_video import MODEL_PATH, _yolo_batch
+
+    model  = YOLO(MODEL_PATH)
+    frames = load_frames(args.video, args.frames, args.imgsz)
+    sizes  = [b for b in (1, 2, 4, 8, 16, 32, 64) if b <= min(args.max_batch, len(frames))]
+
+    print(f"Benchmark: {len(frames)} frames, batch sizes {sizes}, CPU={os.cpu_count()}")
+    rows = measure_throughput(lambda fs: _yolo_batch(model, fs), frames, sizes, args.repeats)
+
+    print(f"\n{'─'*40}")
+    print(f"  {'batch':>5}  {'fps':>8}  {'batch_ms':>9}")
+    for r in rows:
+        print(f"  {r['batch']:>5}  {r['fps']:>8}  {r['batch_ms']:>9}")
+    print(f"{'─'*40}")
+
+    # Replay the measured latencies through the auto-tuner
+    sizer   = BatchSizer(0, max_batch=args.max_batch, latency_cap_ms=args.latency_cap_ms)
+    by_size = {r["batch"]: r["batch_ms"] / 1000 for r in rows}
+    while not sizer.settled and sizer.current in by_size:
+        sizer.observe(sizer.current, by_size[sizer.current])
+    print(f"  Auto-tuned batch under {args.latency_cap_ms:.0f} ms cap: {sizer.current}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+scripts/bench_headless.py — Detection throughput by output mode
+
+Renders a synthetic traffic clip (boxes crossing a grey road in both
+directions), then runs ai/detect_video.run() on it in several output
+modes and prints end-to-end fps for each:
+
+    full video     annotate + encode every frame (previous behaviour, no window)
+    every-5        annotated video keeps every 5th frame
+    proxy-0.5      half-resolution annotated video
+    counts only    --headless --no-video, counts streamed to JSONL
+
+Add --display to also time the windowed mode (needs a display).
+
+Usage:
+    python scripts/bench_headless.py --frames 600 --size 1280x720
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_synthetic_video(path: str, n_frames: int, width: int, height: int, fps: float = 25.0,
+                          n_cars: int = 6, seed: int = 0, stop_period: int = 0):
+    """
+    Cars as saturated boxes moving along a horizontal and a vertical lane
+    over a grey scene.  stop_period > 0 freezes all cars for every other
+    block of that many frames, like a queue at a red light.
+    """
+    rng    = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    lanes  = rng.integers(0, 2, n_cars)                       # 0 = E-W, 1 = N-S
+    offset = rng.uniform(0, 1, n_cars)
+    speed  = rng.uniform(0.004, 0.012, n_cars)
+    hues   = rng.integers(0, 180, n_cars).astype(np.uint8)
+    colour = cv2.cvtColor(np.stack([hues, np.full(n_cars, 255, np.uint8),
+                                    np.full(n_cars, 220, np.uint8)], axis=1)[None], cv2.COLOR_HSV2BGR)[0]
+    cw, ch = width // 16, height // 14
+    for i in range(n_frames):
+        frame = np.full((height, width, 3), 40, np.uint8)
+        frame[height // 2 - ch: height // 2 + ch] = 90
+        frame[:, width // 2 - cw: width // 2 + cw] = 90
+        if stop_period:
+            moving = (i // (2 * stop_period)) * stop_period + min(i % (2 * stop_period), stop_period)
+        else:
+            moving = i
+        pos = (offset + speed * moving) % 1.0
+        for lane, p, c in zip(lanes, pos, colour):
+            if lane == 0:
+                x, y, w, h = int(p * width), height // 2 - ch + 4, cw, ch - 8
+            else:
+                x, y, w, h = width // 2 - cw + 4, int(p * height), cw - 8, ch
+            cv2.rectangle(frame, (x, y), (x + w, y + h), tuple(int(v) for v in c), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless detection benchmark")
+    parser.add_argument("--frames",  type=int, default=600)
+    parser.add_argument("--size",    default="1280x720")
+    parser.add_argument("--display", action="store_true", help="Also time the windowed mode")
+    args = parser.parse_args()
+
+    from ai.detect_video import run
+
+    width, height = map(int, args.size.split("x"))
+    tmp   = tempfile.mkdtemp()
+    video = os.path.join(tmp, "synthetic.avi")
+    write_synthetic_video(video, args.frames, width, height)
+
+    modes = [
+        ("full video",  dict(headless=True)),
+        ("every-5",     dict(headless=True, write_every=5)),
+        ("proxy-0.5",   dict(headless=True, proxy_scale=0.5)),
+        ("counts only", dict(headless=True, save_video=False,
+                             counts_out=os.path.join(tmp, "counts.jsonl"))),
+    ]
+    if args.display:
+        modes.insert(0, ("display + video", dict(headless=False)))
+
+    results = []
+    for name, kw in modes:
+        if kw.get("save_video", True):
+            kw["output_path"] = os.path.join(tmp, f"{name.replace(' ', '_')}.mp4")
+        results.append((name, run(video, **kw)))
+
+    base = results[0][1]["fps"] or 1.0
+    print(f"\n{'─'*52}")
+    print(f"  {args.frames} frames @ {width}x{height}")
+    for name, r in results:
+        print(f"  {name:<16} {r['fps']:>8.1f} fps   ×{r['fps'] / base:.2f}")
+    print(f"{'─'*52}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+scripts/bench_mog2.py — MOG2 fallback detector: full resolution vs FastMOG2
+
+Renders a synthetic clip (scripts/bench_headless.write_synthetic_video)
+and times the fallback detector per frame, decode excluded:
+
+    full-res     MOG2 + threshold + contours on the colour frame, fixed
+                 1500 px cutoff (the original fallback)
+    fast         ai/fast_mog2.FastMOG2 on the whole frame
+    fast-roi     FastMOG2 on the --roi rectangle only
+
+Besides frames/s it prints the mean absolute difference between the
+detector's box count and the cars actually drawn (saturated blobs),
+over the frames after the --warmup background-learning frames.
+
+Usage:
+    python scripts/bench_mog2.py --size 1920x1080 --frames 300
+    python scripts/bench_mog2.py --target-width 480 --roi 0,400,1920,680
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.fast_mog2 import FastMOG2
+from scripts.bench_headless import write_synthetic_video
+from scripts.bench_motion_gate import blob_counts
+
+
+def full_res_mog2():
+    fgbg = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=50)
+
+    def detect(frame):
+        _, thresh = cv2.threshold(fgbg.apply(frame), 200, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) > 1500]
+    return detect
+
+
+def time_detector(path: str, detect, warmup: int, roi=None) -> tuple[float, float]:
+    """(frames/s, count MAE vs drawn cars) over one pass of the clip."""
+    cap, spent, err, n = cv2.VideoCapture(path), 0.0, [], 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        t0 = time.perf_counter()
+        boxes = detect(frame)
+        spent += time.perf_counter() - t0
+        if n >= warmup:
+            ref = frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]
+            err.append(abs(len(boxes) - blob_counts([ref])[0]))
+        n += 1
+    cap.release()
+    return n / spent, float(np.mean(err)) if err else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MOG2 fallback benchmark")
+    parser.add_argument("--frames",       type=int, default=300)
+    parser.add_argument("--size",         default="1920x1080")
+    parser.add_argument("--cars",         type=int, default=6)
+    parser.add_argument("--warmup",       type=int, default=30)
+    parser.add_argument("--target-width", type=int, default=320)
+    parser.add_argument("--roi",          default=None, help="x0,y0,x1,y1 (default: middle band)")
+    parser.add_argument("--skip-full",    action="store_true", help="Skip the slow full-res run")
+    args = parser.parse_args()
+
+    w, h = map(int, args.size.lower().split("x"))
+    roi  = tuple(map(int, args.roi.split(","))) if args.roi else (0, h // 3, w, 2 * h // 3)
+    path = os.path.join(tempfile.mkdtemp(), "bench_mog2.avi")
+    print(f"🎞  Rendering {args.frames} frames at {w}x{h} …")
+    write_synthetic_video(path, args.frames, w, h, n_cars=args.cars)
+
+    runs = [("fast",     FastMOG2(args.target_width), None),
+            ("fast-roi", FastMOG2(args.target_width, roi=roi, frame_size=(w, h)), roi)]
+    if not args.skip_full:
+        runs.insert(0, ("full-res", full_res_mog2(), None))
+
+    print(f"\n{'detector':<10} {'fps':>8} {'ms/frame':>9} {'count MAE':>10}")
+    for name, detect, r in runs:
+        fps, mae = time_detector(path, detect, args.warmup, r)
+        print(f"{name:<10} {fps:>8.0f} {1000 / fps:>9.2f} {mae:>10.2f}")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
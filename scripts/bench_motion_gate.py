@@ -0,0 +1,94 @@
+"""
+scripts/bench_motion_gate.py — Inferences saved vs count error for the motion gate
+
+Renders a synthetic stop-and-go clip (cars move for --stop-period frames,
+then stand still for as long), runs the detector on every frame, and
+replays the same frames through ai/motion_gate.gated.  Reports the
+fraction of detector calls saved and the per-frame count error relative
+to the ungated run.
+
+The detector is YOLOv8 when ultralytics is installed. Otherwise it is a
+stateless colour-blob counter that is exact on the synthetic clip.
+
+Usage:
+    python scripts/bench_motion_gate.py --frames 1000 --stop-period 100
+    python scripts/bench_motion_gate.py --threshold 0.005 --max-interval 60
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.motion_gate import MotionGate, gated
+from scripts.bench_headless import write_synthetic_video
+
+
+def blob_counts(frames: list) -> list:
+    """Count saturated blobs (the synthetic cars); grey road and background are ignored."""
+    out = []
+    for frame in frames:
+        sat = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)[..., 1]
+        n, _, stats, _ = cv2.connectedComponentsWithStats((sat > 80).astype(np.uint8))
+        out.append(int(np.count_nonzero(stats[1:, cv2.CC_STAT_AREA] > 200)))
+    return out
+
+
+def load_detector():
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        print("ultralytics not installed — using the colour-blob counter")
+        return blob_counts
+    from ai.detect_video import MODEL_PATH, _yolo_batch
+    model = YOLO(MODEL_PATH)
+    return lambda frames: [len(cls) for _, cls, _ in _yolo_batch(model, frames)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion gate benchmark")
+    parser.add_argument("--frames",       type=int,   default=1000)
+    parser.add_argument("--size",         default="960x540")
+    parser.add_argument("--stop-period",  type=int,   default=100)
+    parser.add_argument("--threshold",    type=float, default=0.002)
+    parser.add_argument("--max-interval", type=int,   default=30)
+    args = parser.parse_args()
+
+    width, height = map(int, args.size.split("x"))
+    video = os.path.join(tempfile.mkdtemp(), "stop_and_go.avi")
+    write_synthetic_video(video, args.frames, width, height, stop_period=args.stop_period)
+
+    cap, frames = cv2.VideoCapture(video), []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+
+    detect = load_detector()
+    full   = np.array(detect(frames))
+
+    gate   = MotionGate(args.threshold, args.max_interval)
+    infer  = gated(detect, gate)
+    gated_counts = np.array([c for f in frames for c in infer([f])])
+
+    err = np.abs(gated_counts - full)
+    g   = gate.summary()
+    print(f"\n{'─'*48}")
+    print(f"  frames            {g['frames']}")
+    print(f"  inferences        {g['inferences']}")
+    print(f"  saved             {g['saved_fraction']:.1%}")
+    print(f"  count MAE         {err.mean():.3f}")
+    print(f"  max count error   {int(err.max())}")
+    print(f"  exact frames      {np.mean(err == 0):.1%}")
+    print(f"{'─'*48}\n")
+
+
+if __name__ == "__main__":
+    main()
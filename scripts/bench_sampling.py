@@ -0,0 +1,67 @@
+"""
+scripts/bench_sampling.py — Long-recording throughput with frame sampling
+
+Renders a synthetic clip of --minutes length (small resolution, so the
+clip itself is quick to make), then runs headless, counts-only detection
+on it at every frame and with one sample per --interval seconds in grab,
+seek and adaptive modes.  Reports how many times faster than real time
+each mode runs, and the extrapolated wall time for a 10-hour recording.
+
+Usage:
+    python scripts/bench_sampling.py --minutes 10 --interval 1.0
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bench_headless import write_synthetic_video
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame sampling benchmark")
+    parser.add_argument("--minutes",  type=float, default=10)
+    parser.add_argument("--size",     default="640x360")
+    parser.add_argument("--fps",      type=float, default=25.0)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--skip-full", action="store_true", help="Do not time the every-frame run")
+    args = parser.parse_args()
+
+    from ai.detect_video import run
+
+    width, height = map(int, args.size.split("x"))
+    tmp      = tempfile.mkdtemp()
+    video    = os.path.join(tmp, "long.avi")
+    n_frames = int(args.minutes * 60 * args.fps)
+    print(f"Rendering {n_frames:,} frames ({args.minutes:g} min) …")
+    write_synthetic_video(video, n_frames, width, height, fps=args.fps, stop_period=250)
+
+    common = dict(headless=True, save_video=False)
+    modes  = [
+        ("grab",     dict(sample_every_s=args.interval, sample_mode="grab")),
+        ("seek",     dict(sample_every_s=args.interval, sample_mode="seek")),
+        ("adaptive", dict(sample_every_s=args.interval, sample_mode="auto", adaptive_stride=True)),
+    ]
+    if not args.skip_full:
+        modes.insert(0, ("every frame", {}))
+
+    source_s = n_frames / args.fps
+    rows = []
+    for name, kw in modes:
+        r = run(video, counts_out=os.path.join(tmp, f"{name.replace(' ', '_')}.csv"), **common, **kw)
+        rows.append((name, r["frames"], r["wall_s"]))
+
+    print(f"\n{'─'*64}")
+    print(f"  {source_s / 60:.0f} min of {width}x{height} @ {args.fps:g} fps")
+    print(f"  {'mode':<12} {'frames':>8} {'wall s':>8} {'× real time':>12} {'10 h takes':>12}")
+    for name, frames, wall in rows:
+        speed = source_s / max(wall, 1e-9)
+        print(f"  {name:<12} {frames:>8} {wall:>8.1f} {speed:>12.0f} {36000 / speed / 60:>10.1f} min")
+    print(f"{'─'*64}\n")
+
+
+if __name__ == "__main__":
+    main()
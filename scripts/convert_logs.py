@@ -0,0 +1,53 @@
+"""
+scripts/convert_logs.py — Convert SimLogger logs between CSV and binary
+
+.csv files are converted to the typed binary format (simulation/binlog.py)
+and .bin files back to CSV, next to the input unless --out-dir is given.
+A CSV → binary → CSV round trip reproduces the original file byte for byte.
+
+Usage:
+    python scripts/convert_logs.py logs/events_20250101_080000.csv logs/stats_20250101_080000.csv
+    python scripts/convert_logs.py logs/*.bin --out-dir exports/
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation.binlog import csv_to_binary, binary_to_csv
+
+
+def convert(path: str, out_dir: str | None = None) -> str:
+    stem, ext = os.path.splitext(path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        stem = os.path.join(out_dir, os.path.basename(stem))
+    if ext.lower() == ".csv":
+        return csv_to_binary(path, stem + ".bin")
+    if ext.lower() == ".bin":
+        return binary_to_csv(path, stem + ".csv")
+    raise ValueError(f"{path}: expected a .csv or .bin log")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert SimLogger logs between CSV and binary")
+    parser.add_argument("logs", nargs="+", help="events_/stats_ .csv or .bin files")
+    parser.add_argument("--out-dir", default=None, help="Write here instead of next to the input")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in args.logs:
+        try:
+            out = convert(path, args.out_dir)
+            print(f"✅ {path} → {out}  ({os.path.getsize(path):,} → {os.path.getsize(out):,} bytes)")
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            failed += 1
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,16 +9,25 @@ Creates a rich traffic_history.csv with realistic daily patterns:
   - Random emergency events
   - All three traffic modes
 
+Each day is generated as one vectorised NumPy block: density curves, modes,
+emergencies and wait noise are computed for the whole day at once, and only
+the queue / signal state machine runs as a tight scalar loop.  Days are
+independent (the signal starts each day on a fresh N-S green) and seeded
+from (seed, day), so they are spread across worker processes and the output
+is identical for any --workers value.  Each day is written as one chunk.
+
 Usage:
     python scripts/generate_data.py --days 7 --out data/traffic_history.csv
+    python scripts/generate_data.py --days 365 --tph 3600 --workers 8
 """
 
-import csv
-import math
-import random
 import os
 import sys
 import argparse
+from functools import partial
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -26,114 +35,162 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 TICKS_PER_HOUR   = 3600       # 60 fps × 60 seconds
 TICKS_PER_DAY    = TICKS_PER_HOUR * 24
 
+COLUMNS = [
+    "tick", "day", "hour", "minute", "time_of_day",
+    "ns_count", "ew_count", "ns_queue", "ew_queue",
+    "total_vehicles", "signal_phase", "signal_state",
+    "mode", "emergency", "avg_wait_s",
+]
+SIGNAL_STATES = np.array(["green", "yellow", "all_red"])
+
 
-def traffic_density(hour_frac: float, base_ns: float = 8, base_ew: float = 7) -> tuple[float, float]:
+def traffic_density(hour_frac, rng: np.random.Generator,
+                    base_ns: float = 8, base_ew: float = 7) -> tuple[np.ndarray, np.ndarray]:
     """
-    Returns (ns_density, ew_density) for a given fractional hour of day (0–24).
+    Returns (ns_density, ew_density) arrays for fractional hours of day (0–24).
     Models two rush peaks and a night trough.
     """
+    hour_frac = np.asarray(hour_frac, dtype=float)
     # Morning rush: peak at 08:00
-    morning = math.exp(-((hour_frac - 8.0) ** 2) / 1.5) * 12
+    morning = np.exp(-((hour_frac - 8.0) ** 2) / 1.5) * 12
     # Evening rush: peak at 17:30
-    evening = math.exp(-((hour_frac - 17.5) ** 2) / 1.8) * 10
+    evening = np.exp(-((hour_frac - 17.5) ** 2) / 1.8) * 10
     # Night trough (quiet after 22:00 until 06:00)
-    night_suppress = max(0.0, 1.0 - math.exp(-((hour_frac - 23) ** 2) / 3))
-    if hour_frac < 6:
-        night_suppress = max(0.0, 1.0 - math.exp(-((hour_frac + 1) ** 2) / 3))
-
-    ns = max(0.5, base_ns + morning * 1.1 + evening * 0.9 - night_suppress * 6
-             + random.gauss(0, 0.8))
-    ew = max(0.5, base_ew + morning * 0.9 + evening * 1.1 - night_suppress * 5
-             + random.gauss(0, 0.7))
+    night_suppress = np.where(
+        hour_frac < 6,
+        np.maximum(0.0, 1.0 - np.exp(-((hour_frac + 1) ** 2) / 3)),
+        np.maximum(0.0, 1.0 - np.exp(-((hour_frac - 23) ** 2) / 3)),
+    )
+
+    ns = np.maximum(0.5, base_ns + morning * 1.1 + evening * 0.9 - night_suppress * 6
+                    + rng.normal(0, 0.8, hour_frac.shape))
+    ew = np.maximum(0.5, base_ew + morning * 0.9 + evening * 1.1 - night_suppress * 5
+                    + rng.normal(0, 0.7, hour_frac.shape))
     return ns, ew
 
 
-def determine_mode(hour_frac: float, ns: float) -> str:
-    if 22 <= hour_frac or hour_frac < 6:
-        return "night"
-    if (7 <= hour_frac <= 9) or (17 <= hour_frac <= 19):
-        if ns > 10:
-            return "rush_hour"
-    return "normal"
-
-
-def generate(days: int, out_path: str, seed: int, ticks_per_hour: int):
-    random.seed(seed)
-    os.makedirs(os.path.dirname(out_path) if os.path.dirname(out_path) else ".", exist_ok=True)
+def determine_mode(hour_frac, ns) -> np.ndarray:
+    hour_frac = np.asarray(hour_frac)
+    night = (hour_frac >= 22) | (hour_frac < 6)
+    rush  = (((hour_frac >= 7) & (hour_frac <= 9)) | ((hour_frac >= 17) & (hour_frac <= 19))) & (ns > 10)
+    return np.where(night, "night", np.where(rush, "rush_hour", "normal"))
 
-    tpd = ticks_per_hour * 24
-    total_ticks = days * tpd
 
-    print(f"Generating {total_ticks:,} ticks ({days} days) → {out_path}")
-
-    phase, state, phase_timer = 0, "green", 0
+def _signal_loop(ns_count: list, ew_count: list, serve: list, arrive: list,
+                 creep: list) -> tuple[list, list, list, list]:
+    """
+    Queue + signal state machine over one day.  Pure scalar Python on
+    plain lists — the only sequential part of the pipeline.
+    serve/arrive: randint(0, 2) draws used on green; creep: randint(0, 1)
+    draws on red (NS in the first half, EW in the second).
+    """
     green_dur  = 25 * 60
     yellow_dur = 3  * 60
     allred_dur = 1  * 60
 
+    phase, state, phase_timer = 0, 0, 0        # state: 0 green, 1 yellow, 2 all_red
     ns_queue, ew_queue = 0, 0
+    n = len(ns_count)
+    out_nsq, out_ewq = [0] * n, [0] * n
+    out_phase, out_state = [0] * n, [0] * n
+
+    for i in range(n):
+        ns_c, ew_c = ns_count[i], ew_count[i]
+        # Queues depend on signal phase
+        if state == 0:
+            if phase == 0:
+                ns_queue = max(0, ns_queue - 2 + serve[i])
+                ew_queue = min(ew_queue + arrive[i], ew_c)
+            else:
+                ew_queue = max(0, ew_queue - 2 + serve[i])
+                ns_queue = min(ns_queue + arrive[i], ns_c)
+        else:
+            ns_queue = min(ns_queue + creep[i], ns_c)
+            ew_queue = min(ew_queue + creep[n + i], ew_c)
+
+        # State machine
+        phase_timer += 1
+        if state == 0   and phase_timer >= green_dur:
+            state, phase_timer = 1, 0
+        elif state == 1 and phase_timer >= yellow_dur:
+            state, phase_timer = 2, 0
+        elif state == 2 and phase_timer >= allred_dur:
+            phase, state, phase_timer = 1 - phase, 0, 0
+            # Adaptive green based on queues
+            demand    = (ns_queue if phase == 0 else ew_queue)
+            ratio     = min(demand / 20.0, 1.0)
+            green_dur = int((10 + (60 - 10) * ratio) * 60)
+
+        out_nsq[i], out_ewq[i] = ns_queue, ew_queue
+        out_phase[i], out_state[i] = phase, state
+
+    return out_nsq, out_ewq, out_phase, out_state
+
+
+def generate_day(day: int, seed: int, ticks_per_hour: int) -> str:
+    """Render one day as a CSV text chunk (no header)."""
+    rng = np.random.default_rng([seed, day])
+    tpd = ticks_per_hour * 24
+
+    tick_day  = np.arange(tpd)
+    hour_frac = tick_day / ticks_per_hour
+    hour      = hour_frac.astype(np.int64)
+    minute    = ((hour_frac - hour) * 60).astype(np.int64)
+    tod       = np.round(tick_day / tpd, 4)
+
+    ns_raw, ew_raw = traffic_density(hour_frac, rng)
+    ns_count = np.maximum(0, np.rint(ns_raw)).astype(np.int64)
+    ew_count = np.maximum(0, np.rint(ew_raw)).astype(np.int64)
+
+    serve  = rng.integers(0, 3, tpd)
+    arrive = rng.integers(0, 3, tpd)
+    creep  = rng.integers(0, 2, 2 * tpd)
+    ns_q, ew_q, phase, state = _signal_loop(
+        ns_count.tolist(), ew_count.tolist(),
+        serve.tolist(), arrive.tolist(), creep.tolist(),
+    )
+    ns_q, ew_q = np.array(ns_q), np.array(ew_q)
+
+    mode      = determine_mode(hour_frac, ns_raw)
+    emergency = (rng.random(tpd) < 0.003).astype(np.int64)
+    avg_wait  = np.round(rng.normal(4 + ns_q * 0.5 + ew_q * 0.3, 0.5), 2)
+    avg_wait  = np.maximum(avg_wait, 0.0) + 0.0          # + 0.0 folds -0.0 into 0.0
+
+    columns = [
+        day * tpd + tick_day, np.full(tpd, day), hour, minute, tod,
+        ns_count, ew_count, ns_q, ew_q,
+        ns_count + ew_count,
+        np.array(phase), SIGNAL_STATES[state],
+        mode, emergency,
+        avg_wait,
+    ]
+    as_text = [list(map(str, c.tolist())) for c in columns]
+    return "\n".join(",".join(row) for row in zip(*as_text)) + "\n"
+
+
+def generate(days: int, out_path: str, seed: int, ticks_per_hour: int, workers: int | None = None):
+    os.makedirs(os.path.dirname(out_path) if os.path.dirname(out_path) else ".", exist_ok=True)
 
+    tpd = ticks_per_hour * 24
+    total_ticks = days * tpd
+    workers = min(workers or cpu_count(), days)
+
+    print(f"Generating {total_ticks:,} ticks ({days} days, {workers} workers) → {out_path}")
+
+    make_day = partial(generate_day, seed=seed, ticks_per_hour=ticks_per_hour)
     with open(out_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "tick", "day", "hour", "minute", "time_of_day",
-            "ns_count", "ew_count", "ns_queue", "ew_queue",
-            "total_vehicles", "signal_phase", "signal_state",
-            "mode", "emergency", "avg_wait_s",
-        ])
-
-        for tick in range(total_ticks):
-            day       = tick // tpd
-            tick_day  = tick % tpd
-            hour_frac = tick_day / ticks_per_hour
-            hour      = int(hour_frac)
-            minute    = int((hour_frac - hour) * 60)
-            tod       = tick_day / tpd   # 0–1
-
-            ns_raw, ew_raw = traffic_density(hour_frac)
-            ns_count = max(0, int(round(ns_raw)))
-            ew_count = max(0, int(round(ew_raw)))
-
-            # Queues depend on signal phase
-            if state == "green":
-                if phase == 0:
-                    ns_queue = max(0, ns_queue - 2 + random.randint(0, 2))
-                    ew_queue = min(ew_queue + random.randint(0, 2), ew_count)
-                else:
-                    ew_queue = max(0, ew_queue - 2 + random.randint(0, 2))
-                    ns_queue = min(ns_queue + random.randint(0, 2), ns_count)
-            else:
-                ns_queue = min(ns_queue + random.randint(0, 1), ns_count)
-                ew_queue = min(ew_queue + random.randint(0, 1), ew_count)
-
-            # State machine
-            phase_timer += 1
-            if state == "green"   and phase_timer >= green_dur:
-                state, phase_timer = "yellow",  0
-            elif state == "yellow"  and phase_timer >= yellow_dur:
-                state, phase_timer = "all_red", 0
-            elif state == "all_red" and phase_timer >= allred_dur:
-                phase, state, phase_timer = 1 - phase, "green", 0
-                # Adaptive green based on queues
-                demand    = (ns_queue if phase == 0 else ew_queue)
-                ratio     = min(demand / 20.0, 1.0)
-                green_dur = int((10 + (60 - 10) * ratio) * 60)
-
-            mode      = determine_mode(hour_frac, ns_raw)
-            emergency = 1 if random.random() < 0.003 else 0
-            avg_wait  = round(random.gauss(4 + ns_queue * 0.5 + ew_queue * 0.3, 0.5), 2)
-
-            writer.writerow([
-                tick, day, hour, minute, round(tod, 4),
-                ns_count, ew_count, ns_queue, ew_queue,
-                ns_count + ew_count,
-                phase, state,
-                mode, emergency,
-                max(0.0, avg_wait),
-            ])
-
-            if tick % 50_000 == 0:
-                print(f"  {tick:>8,} / {total_ticks:,} ticks  ({tick/total_ticks*100:.0f}%)")
+        f.write(",".join(COLUMNS) + "\n")
+        pool   = Pool(workers) if workers > 1 else None
+        # imap keeps day order while later days are still being computed
+        chunks = pool.imap(make_day, range(days)) if pool else map(make_day, range(days))
+        try:
+            for day, chunk in enumerate(chunks):
+                f.write(chunk)
+                print(f"  day {day + 1:>4} / {days}")
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
 
     size_kb = os.path.getsize(out_path) // 1024
     print(f"Done. {out_path}  ({size_kb:,} KB, {total_ticks:,} rows)")
@@ -148,5 +205,7 @@ if __name__ == "__main__":
     parser.add_argument("--seed",  type=int,   default=42)
     parser.add_argument("--tph",   type=int,   default=360,
                         help="Ticks per hour (default: 360 = 1 tick/10s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: one per CPU, capped at --days)")
     args = parser.parse_args()
-    generate(args.days, args.out, args.seed, args.tph)
+    generate(args.days, args.out, args.seed, args.tph, args.workers)
@@ -0,0 +1,106 @@
+"""
+scripts/load_test_predictor.py — Load test for the local prediction server
+
+Opens C concurrent client connections, each issuing N sequential live
+predictions, and reports latency percentiles and throughput.  By default
+an in-process server is started on a temporary Unix socket (or localhost
+TCP where Unix sockets are unavailable), so the batch statistics can be
+reported too; pass --socket / --tcp to hit an already running server.
+
+Usage:
+    python scripts/load_test_predictor.py --clients 32 --requests 200
+    python scripts/load_test_predictor.py --max-delay-ms 0 --max-batch 1   # no batching
+    python scripts/load_test_predictor.py --tcp 8765                      # external server
+"""
+
+import sys
+import os
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.prediction_server import PredictionServer, AsyncPredictionClient
+
+
+async def _client(address, n_requests: int, rows: np.ndarray, latencies: list):
+    client = await AsyncPredictionClient(address).connect()
+    try:
+        for i in range(n_requests):
+            t0 = time.perf_counter()
+            await client.predict(rows[i % len(rows)])
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        await client.close()
+
+
+async def load_test(address, clients: int, requests: int, server=None) -> dict:
+    if server is not None:
+        await server.start()
+        rows = server.registry.live.feature_matrix()
+    else:
+        rows = np.random.default_rng(0).uniform(0, 10, size=(256, 12))
+
+    latencies: list[float] = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(address, requests, rows, latencies) for _ in range(clients)))
+    elapsed = time.perf_counter() - t0
+
+    if server is not None:
+        await server.stop()
+
+    lat_ms = np.array(latencies) * 1000
+    result = {
+        "requests":       len(lat_ms),
+        "elapsed_s":      round(elapsed, 3),
+        "throughput_rps": round(len(lat_ms) / elapsed, 1),
+        "p50_ms":         round(float(np.percentile(lat_ms, 50)), 3),
+        "p99_ms":         round(float(np.percentile(lat_ms, 99)), 3),
+        "max_ms":         round(float(lat_ms.max()), 3),
+    }
+    if server is not None:
+        b = server.batcher
+        result["batches"]   = b.batches
+        result["avg_batch"] = round(b.rows / max(b.batches, 1), 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction server load test")
+    parser.add_argument("--clients",      type=int,   default=32)
+    parser.add_argument("--requests",     type=int,   default=200, help="Requests per client")
+    parser.add_argument("--max-batch",    type=int,   default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    parser.add_argument("--socket",       default=None, help="Connect to a running server")
+    parser.add_argument("--tcp",          type=int,   default=None, help="Connect to 127.0.0.1:<port>")
+    args = parser.parse_args()
+
+    server = None
+    if args.socket:
+        address = args.socket
+    elif args.tcp:
+        address = ("127.0.0.1", args.tcp)
+    else:
+        if hasattr(socket, "AF_UNIX"):
+            address = os.path.join(tempfile.mkdtemp(), "predict.sock")
+        else:
+            address = ("127.0.0.1", 8766)
+        server = PredictionServer(address, max_batch=args.max_batch,
+                                  max_delay_ms=args.max_delay_ms)
+
+    print(f"Load test: {args.clients} clients × {args.requests} requests → {address}")
+    result = asyncio.run(load_test(address, args.clients, args.requests, server))
+
+    print(f"\n{'─'*44}")
+    for k, v in result.items():
+        print(f"  {k:<20} {v}")
+    print(f"{'─'*44}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+scripts/query_logs.py — Tick-range and event-type queries over logs/
+
+Looks events (and the stats rows around them) up through the indexes of
+simulation/logstore.py instead of grepping CSVs.  Indexes are built on the
+first query of a session.  Sessions logged as CSV need --convert-csv once
+(or run the simulation with --binary-logs).
+
+Usage:
+    python scripts/query_logs.py --list
+    python scripts/query_logs.py --event emergency_preemption --from 1000 --to 5000 --window 120
+    python scripts/query_logs.py --from 3000 --to 3600 --session 20250101_080000
+    python scripts/query_logs.py --stats --from 3000 --to 3600
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation.logger   import LOG_DIR
+from simulation.logstore import LogStore
+
+STATS_SHOWN = ("sim_tick", "ns_count", "ew_count", "ns_queue", "ew_queue",
+               "avg_wait_s", "signal_state", "mode")
+
+
+def print_stats(cols: dict, indent: str = "  "):
+    if not cols or not len(cols["sim_tick"]):
+        print(f"{indent}(no stats rows)")
+        return
+    print(indent + "  ".join(f"{c:>12}" for c in STATS_SHOWN))
+    for row in zip(*(cols[c].tolist() for c in STATS_SHOWN)):
+        print(indent + "  ".join(f"{v:>12.2f}" if isinstance(v, float) else f"{v:>12}" for v in row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query SimLogger sessions by tick range and event type")
+    parser.add_argument("--dir",     default=LOG_DIR, help="Log directory")
+    parser.add_argument("--list",    action="store_true", help="List indexed sessions")
+    parser.add_argument("--event",   default=None, help="Event type (default: every type)")
+    parser.add_argument("--from",    dest="start", type=int, default=None, help="First tick")
+    parser.add_argument("--to",      dest="end",   type=int, default=None, help="Last tick")
+    parser.add_argument("--session", default=None, help="Session timestamp (default: all)")
+    parser.add_argument("--window",  type=int, default=0, help="Show stats rows within ±N ticks of each event")
+    parser.add_argument("--stats",   action="store_true", help="Show stats rows in the range instead")
+    parser.add_argument("--convert-csv", action="store_true", help="Convert CSV-only sessions to binary first")
+    args = parser.parse_args(argv)
+
+    store = LogStore(args.dir)
+    if args.convert_csv:
+        for path in store.convert_csv():
+            print(f"✅ Converted → {path}")
+    sessions = store.sessions()
+    if not sessions:
+        sys.exit(f"No binary sessions in {args.dir} (try --convert-csv)")
+
+    if args.list:
+        info = store.describe()
+        for ses in info:
+            print(f"  {ses['session']}  {ses['events']:>9,} events  {ses['stats']:>9,} stats rows  "
+                  f"ticks {ses['first_tick']}…{ses['last_tick']}")
+        return info
+
+    t0 = time.perf_counter()
+    if args.stats:
+        cols = store.stats(args.start, args.end, args.session)
+        print_stats(cols)
+        print(f"\n{len(cols.get('sim_tick', []))} stats rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        return cols
+
+    hits = (store.incident(args.event, args.start, args.end, args.window, args.session) if args.window
+            else store.events(args.event, args.start, args.end, args.session))
+    elapsed = (time.perf_counter() - t0) * 1000
+    for hit in hits:
+        details = " | ".join(f"{k}={v}" for k, v in hit["details"].items())
+        wall    = datetime.fromtimestamp(hit["wall_time"]).isoformat(timespec="seconds")
+        print(f"[{hit['session']}] tick {hit['tick']:>8}  {wall}  {hit['event']:<22} {details}")
+        if "stats" in hit:
+            print_stats(hit["stats"], indent="      ")
+    print(f"\n{len(hits)} events in {elapsed:.1f} ms")
+    return hits
+
+
+if __name__ == "__main__":
+    main()
@@ -34,7 +34,7 @@ def run(ticks: int, mode: str, emergency_rate: float, out_csv: str, quiet: bool)
     intersection = Intersection()
     intersection.set_mode(mode)
     intersection.predictor.EMERGENCY_PROB = emergency_rate
-    stats = StatsCollector()
+    stats = StatsCollector(spill=out_csv)      # streams every tick, however long the run
 
     print_every = max(ticks // 20, 1)
 
@@ -50,7 +50,7 @@ def run(ticks: int, mode: str, emergency_rate: float, out_csv: str, quiet: bool)
                   f"passed={intersection.total_vehicles_passed:4d}  "
                   f"avgwait={intersection.avg_wait():.2f}s")
 
-    stats.export_csv(out_csv)
+    stats.close()
     stats.summary()
     pygame.quit()
 
@@ -0,0 +1,210 @@
+"""
+scripts/synth_video.py — Synthetic intersection videos with ground truth
+
+Runs the real simulation (simulation.intersection.Intersection: spawning,
+signal phases, queues at the stop lines) with a fixed random seed and
+renders each frame the same way the GUI does, using the road geometry from
+simulation/config.py and Vehicle.draw.  Nothing is downloaded, and the
+same seed always gives the same clip.
+
+Besides the video it writes two sidecar files:
+
+  <clip>.truth.jsonl   one line per frame:
+        frame, t, count, ns_count, ew_count, ns_queue, ew_queue
+            counted over *visible* vehicles only
+        boxes      [[x1, y1, x2, y2], …] in video pixels, every vehicle on screen
+        cls        COCO class id (car 2, bus 5, truck 7; emergency → car)
+        direction  "N→S" | "S→N" | "E→W" | "W→E"
+        visible    at least half the body on screen and not hidden under
+                   vehicles drawn later (queued vehicles overlap in the sim)
+        stopped    waiting at a red light or behind a queue
+
+  <clip>.rois.json     approach polygons and stop lines for the road arms
+        (ai/approach_roi.py format).  detect_video --rois and
+        scripts/batch_detect.py pick it up.
+
+Usage:
+    python scripts/synth_video.py data/synth/junction.avi --frames 900
+    python scripts/synth_video.py detection/videos/traffic.mp4 --mode rush_hour --scale 3
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COCO_CLASS = {"car": 2, "truck": 7, "bus": 5, "emergency": 2}
+NS_DIRS    = ("N→S", "S→N")
+MIN_VISIBLE = 0.5
+NOISE_BANK = 8            # pre-drawn sensor-noise frames, cycled
+
+
+def sidecars(path: str) -> tuple[str, str]:
+    """(truth JSONL, ROI JSON) paths next to a clip."""
+    stem = os.path.splitext(path)[0]
+    return stem + ".truth.jsonl", stem + ".rois.json"
+
+
+def scene_rois() -> dict:
+    """Road arms and stop lines of the simulated junction, as frame fractions."""
+    from simulation.config import CX, CY, ROAD_W, STOP_DIST, SIM_X, SIM_Y
+
+    hw = ROAD_W // 2
+    fx = lambda x: round(x / SIM_X, 4)                                   # noqa: E731
+    fy = lambda y: round(y / SIM_Y, 4)                                   # noqa: E731
+    rect = lambda x0, y0, x1, y1: [[fx(x0), fy(y0)], [fx(x1), fy(y0)],   # noqa: E731
+                                   [fx(x1), fy(y1)], [fx(x0), fy(y1)]]
+    return {
+        "camera": "synthetic_junction",
+        "approaches": {
+            "ns": [rect(CX - hw, 0, CX + hw, CY - hw), rect(CX - hw, CY + hw, CX + hw, SIM_Y)],
+            "ew": [rect(0, CY - hw, CX - hw, CY + hw), rect(CX + hw, CY - hw, SIM_X, CY + hw)],
+        },
+        "stop_lines": [
+            {"direction": "N→S", "line": [[fx(CX - hw), fy(CY - STOP_DIST)], [fx(CX + hw), fy(CY - STOP_DIST)]]},
+            {"direction": "S→N", "line": [[fx(CX + hw), fy(CY + STOP_DIST)], [fx(CX - hw), fy(CY + STOP_DIST)]]},
+            {"direction": "W→E", "line": [[fx(CX - STOP_DIST), fy(CY + hw)], [fx(CX - STOP_DIST), fy(CY - hw)]]},
+            {"direction": "E→W", "line": [[fx(CX + STOP_DIST), fy(CY - hw)], [fx(CX + STOP_DIST), fy(CY + hw)]]},
+        ],
+    }
+
+
+def vehicle_rect(v) -> tuple[int, int, int, int]:
+    """Body rectangle exactly as Vehicle.draw lays it out (x, y, w, h in sim pixels)."""
+    bw, bh = (v.w, v.h) if abs(v.dx) > 0 else (v.h, v.w)
+    return int(v.x - bw // 2), int(v.y - bh // 2), bw, bh
+
+
+def visibility(rects: list, width: int, height: int) -> np.ndarray:
+    """Fraction of each body that ends up on screen, in draw order (later covers earlier)."""
+    owner = np.full((height, width), -1, np.int32)
+    for i, (x, y, w, h) in enumerate(rects):
+        owner[max(y, 0):max(y + h, 0), max(x, 0):max(x + w, 0)] = i
+    shown = np.bincount(owner[owner >= 0], minlength=len(rects))
+    area  = np.array([w * h for _, _, w, h in rects], dtype=float)
+    return shown / np.maximum(area, 1)
+
+
+def on_screen(v, width: int, height: int) -> bool:
+    x, y, w, h = vehicle_rect(v)
+    return x + w > 0 and y + h > 0 and x < width and y < height
+
+
+def frame_truth(i: int, fps: float, vehicles: list, scale: float, sim_w: int, sim_h: int) -> dict:
+    vehicles = [v for v in vehicles if v.active and on_screen(v, sim_w, sim_h)]
+    rects    = [vehicle_rect(v) for v in vehicles]
+    visible  = visibility(rects, sim_w, sim_h) >= MIN_VISIBLE
+    boxes    = [[round(x * scale), round(y * scale), round((x + w) * scale), round((y + h) * scale)]
+                for x, y, w, h in rects]
+    ns       = np.array([v.direction in NS_DIRS for v in vehicles], dtype=bool)
+    stopped  = np.array([v.stopped for v in vehicles], dtype=bool)
+    return {
+        "frame": i, "t": round(i / fps, 4),
+        "count":    int(visible.sum()),
+        "ns_count": int((visible & ns).sum()),
+        "ew_count": int((visible & ~ns).sum()),
+        "ns_queue": int((visible & ns & stopped).sum()),
+        "ew_queue": int((visible & ~ns & stopped).sum()),
+        "boxes":     boxes,
+        "cls":       [COCO_CLASS[v.vtype] for v in vehicles],
+        "direction": [v.direction for v in vehicles],
+        "visible":   visible.tolist(),
+        "stopped":   stopped.tolist(),
+    }
+
+
+def render_clip(path: str, frames: int = 600, seed: int = 0, fps: float = 30.0,
+                scale: float = 2.0, noise: float = 2.0, mode: str = "normal",
+                warmup_s: float = 20.0) -> dict:
+    """
+    Simulate and render `frames` video frames (the sim advances FPS / fps
+    ticks per frame, so the clip plays in real time).  warmup_s seconds are
+    simulated first so the clip opens on a populated junction.  Returns
+    {"video", "truth", "rois", "frames", "size", "mean_count"}.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from simulation.config import FPS, SIM_X, SIM_Y
+    from simulation.intersection import Intersection
+
+    pygame.init()
+    truth_path, rois_path = sidecars(path)
+    size   = (round(SIM_X * scale), round(SIM_Y * scale))
+    step   = max(1, round(FPS / fps))
+    state  = random.getstate()
+    random.seed(seed)
+    rng    = np.random.default_rng(seed)
+    bank   = [rng.normal(0, noise, (size[1], size[0], 3)).round().astype(np.int16)
+              for _ in range(NOISE_BANK if noise > 0 else 0)]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fourcc = cv2.VideoWriter_fourcc(*("mp4v" if path.lower().endswith(".mp4") else "MJPG"))
+    writer = cv2.VideoWriter(path, fourcc, fps, size)
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+    counts = []
+    try:
+        sim     = Intersection()
+        sim.set_mode(mode)
+        surface = pygame.Surface((SIM_X, SIM_Y))
+        for _ in range(int(warmup_s * FPS)):
+            sim.update()
+        with open(truth_path + ".tmp", "w") as tf:
+            for i in range(frames):
+                for _ in range(step):
+                    sim.update()
+                sim.alerts = []                      # on-screen text is not part of the scene
+                sim.draw(surface, sim.tick)
+                rgb   = pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+                frame = cv2.resize(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), size,
+                                   interpolation=cv2.INTER_LINEAR)
+                if bank:
+                    frame = cv2.add(frame, bank[i % len(bank)], dtype=cv2.CV_8U)
+                writer.write(frame)
+                rec = frame_truth(i, fps, sim.vehicles, scale, SIM_X, SIM_Y)
+                counts.append(rec["count"])
+                tf.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(truth_path + ".tmp", truth_path)
+    finally:
+        writer.release()
+        random.setstate(state)
+    with open(rois_path, "w") as f:
+        json.dump(scene_rois(), f, indent=2, ensure_ascii=False)
+    return {"video": path, "truth": truth_path, "rois": rois_path, "frames": frames,
+            "size": size, "mean_count": float(np.mean(counts)) if counts else 0.0}
+
+
+def load_truth(path: str) -> list[dict]:
+    """Per-frame ground truth of a rendered clip (its video path or truth file)."""
+    if not path.endswith(".truth.jsonl"):
+        path = sidecars(path)[0]
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a synthetic intersection video with ground truth")
+    parser.add_argument("out", help="Video path (.avi = MJPG, .mp4 = mp4v)")
+    parser.add_argument("--frames", type=int,   default=600)
+    parser.add_argument("--seed",   type=int,   default=0)
+    parser.add_argument("--fps",    type=float, default=30.0)
+    parser.add_argument("--scale",  type=float, default=2.0, help="Output pixels per sim pixel")
+    parser.add_argument("--noise",  type=float, default=2.0, help="Gaussian sensor noise (σ, grey levels)")
+    parser.add_argument("--mode",   default="normal", choices=("normal", "rush_hour", "night"))
+    parser.add_argument("--warmup", type=float, default=20.0, help="Simulated seconds before frame 0")
+    args = parser.parse_args(argv)
+    info = render_clip(args.out, args.frames, args.seed, args.fps, args.scale, args.noise,
+                       args.mode, args.warmup)
+    print(f"🎞  {info['frames']} frames {info['size'][0]}x{info['size'][1]} → {info['video']}  "
+          f"(mean {info['mean_count']:.1f} visible vehicles)")
+    print(f"   ground truth → {info['truth']}\n   ROIs         → {info['rois']}")
+    return info
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+simulation/binlog.py — Typed binary event and telemetry logs
+-------------------------------------------------------------
+A binary alternative to the CSV files that SimLogger writes.  Numbers
+are stored as numbers, and event details are typed fields rather than a
+"k=v | k=v" string.
+
+  logs/stats_<ts>.bin    one STATS_DTYPE row per snapshot
+  logs/events_<ts>.bin   one RECORD_SIZE-byte record per event:
+        wall_time f8, tick i8, type u2, present u2, payload
+      `type` selects the event's schema, which places its fields at fixed
+      offsets in the payload.  Bit i of `present` is set when field i
+      was given.
+
+Each file has a <file>.json header: the schemas and the string labels
+(categorical fields hold u4/u2 codes into them).  The header is
+rewritten, atomically, before any record that refers to a new schema
+or label is written.  The row count comes from the file size, so a log
+cut short by a crash still reads back.
+
+Known events have schemas declared in EVENT_SCHEMAS.  Other events
+infer theirs from first use: bool → "?", int → "i8", float → "f8",
+anything else → "cat".  A kwarg that an event has not used before
+is appended to its schema.  A value that does not fit its field's kind
+is dropped and counted in `dropped`.
+
+Reading maps the file and views it through each schema's dtype, so a
+day of telemetry loads as NumPy columns in milliseconds:
+
+    from simulation.binlog import read_events, read_stats
+    stats  = read_stats("logs/stats_20250101_080000.bin")    # {column: array}
+    events = read_events("logs/events_20250101_080000.bin")  # {event: {field: array}}
+    events["phase_change"]["adaptive_green_s"].mean()
+
+csv_to_binary() and binary_to_csv() convert both ways.  CSV → binary →
+CSV gives back the same bytes (see scripts/convert_logs.py).
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+RECORD_SIZE = 64
+EVENT_HEAD  = [("wall_time", "<f8"), ("tick", "<i8"), ("type", "<u2"), ("present", "<u2")]
+PAYLOAD_AT  = 24                                        # 8-byte aligned, 40 bytes of fields
+MAX_FIELDS  = 16                                        # bits in `present`
+EVENT_DTYPE = np.dtype(EVENT_HEAD + [("_pad", "V4"), ("payload", f"V{RECORD_SIZE - PAYLOAD_AT}")])
+KINDS       = {"i8": "<i8", "f8": "<f8", "?": "?", "cat": "<u4"}
+
+EVENT_SCHEMAS = {
+    "session_start":        [("mode", "cat")],
+    "session_end":          [("total_passed", "i8"), ("emergency_events", "i8")],
+    "mode_change":          [("mode", "cat")],
+    "manual_emergency":     [],
+    "pause_toggle":         [("paused", "?")],
+    "phase_change":         [("phase", "i8"), ("adaptive_green_s", "f8")],
+    "emergency_preemption": [("phase", "i8")],
+    "model_rejected":       [("source", "cat"), ("reason", "cat")],
+    "model_reload":         [("source", "cat"), ("old_version", "cat"), ("new_version", "cat")],
+}
+
+# Same columns, in the same order, as SimLogger's stats CSV
+STATS_DTYPE = np.dtype([
+    ("wall_time",         "<f8"),
+    ("sim_tick",          "<i8"),
+    ("ns_count",          "<i4"),
+    ("ew_count",          "<i4"),
+    ("ns_queue",          "<i4"),
+    ("ew_queue",          "<i4"),
+    ("avg_wait_s",        "<f8"),
+    ("phase",             "<i2"),
+    ("signal_state",      "<u2"),     # code into labels["signal_state"]
+    ("green_remaining_s", "<f8"),
+    ("total_passed",      "<i8"),
+    ("emergency_active",  "?"),
+    ("mode",              "<u2"),     # code into labels["mode"]
+    ("pred_ns",           "<f8"),
+    ("pred_ew",           "<f8"),
+])
+STATS_CATEGORICAL = ("signal_state", "mode")
+
+
+def _kind_of(value) -> str:
+    if isinstance(value, (bool, np.bool_)):
+        return "?"
+    if isinstance(value, (int, np.integer)):
+        return "i8"
+    if isinstance(value, (float, np.floating)):
+        return "f8"
+    return "cat"
+
+
+def _fits(kind: str, value) -> bool:
+    have = _kind_of(value)
+    return (kind == "cat" or have == kind
+            or (kind == "f8" and have == "i8")
+            or (kind == "i8" and have == "f8" and float(value).is_integer()))
+
+
+def _parse(text: str):
+    """A CSV detail value back to the Python type it was logged as."""
+    if text in ("True", "False"):
+        return text == "True"
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _atomic_json(path: str, obj: dict):
+    with open(path + ".tmp", "w") as f:
+        json.dump(obj, f)
+    os.replace(path + ".tmp", path)
+
+
+def _map(path: str, dtype: np.dtype) -> np.ndarray:
+    n = os.path.getsize(path) // dtype.itemsize       # a torn last record is ignored
+    return np.memmap(path, dtype=dtype, mode="r", shape=(n,)) if n else np.zeros(0, dtype)
+
+
+def _schema_dtype(fields: list) -> np.dtype:
+    """A view of the whole record with the schema's fields at their payload offsets."""
+    names   = [n for n, _ in EVENT_HEAD] + [f[0] for f in fields]
+    formats = [k for _, k in EVENT_HEAD] + [KINDS[f[1]] for f in fields]
+    offsets = [0, 8, 16, 18] + [f[2] for f in fields]
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets,
+                     "itemsize": RECORD_SIZE})
+
+
+# ── Writers ───────────────────────────────────────────────────────────────────
+
+class _BinaryLog:
+    _file = None
+
+    def flush(self, durable: bool = False):
+        self._file.flush()
+        if durable:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class BinaryEventLog(_BinaryLog):
+    """Appends typed event records.  write() takes (wall_time, tick, event_type, kwargs)."""
+
+    def __init__(self, path: str):
+        self.path    = path
+        self.schemas: list[dict] = []         # {"event", "fields": [[name, kind, offset]]}
+        self.labels:  list[str]  = []
+        self.dropped = 0
+        self._ids:   dict[str, int] = {}
+        self._codes: dict[str, int] = {}
+        self._dtypes: list[np.dtype] = []
+        self._file   = open(path, "wb")
+        self._save_header()
+
+    def _save_header(self):
+        _atomic_json(self.path + ".json", {"format": "events", "record_size": RECORD_SIZE,
+                                           "schemas": self.schemas, "labels": self.labels})
+
+    def _label(self, text: str) -> int:
+        code = self._codes.get(text)
+        if code is None:
+            code = self._codes[text] = len(self.labels)
+            self.labels.append(text)
+        return code
+
+    def _add_field(self, tid: int, name: str, kind: str) -> bool:
+        fields = self.schemas[tid]["fields"]
+        size   = np.dtype(KINDS[kind]).itemsize
+        end    = max((off + np.dtype(KINDS[k]).itemsize for _, k, off in fields), default=PAYLOAD_AT)
+        offset = -(-end // size) * size
+        if len(fields) >= MAX_FIELDS or offset + size > RECORD_SIZE:
+            return False
+        fields.append([name, kind, offset])
+        self._dtypes[tid] = _schema_dtype(fields)
+        return True
+
+    def _schema(self, event_type: str, kwargs: dict) -> tuple[int, bool]:
+        """(type id, header changed) for an event, extending its schema to new kwargs."""
+        changed = False
+        tid     = self._ids.get(event_type)
+        if tid is None:
+            tid = self._ids[event_type] = len(self.schemas)
+            self.schemas.append({"event": event_type, "fields": []})
+            self._dtypes.append(_schema_dtype([]))
+            for name, kind in EVENT_SCHEMAS.get(event_type, []):
+                self._add_field(tid, name, kind)
+            changed = True
+        known = {f[0] for f in self.schemas[tid]["fields"]}
+        for name, value in kwargs.items():
+            if name not in known:
+                changed |= self._add_field(tid, name, _kind_of(value))
+        return tid, changed
+
+    def write(self, records: list):
+        rows    = np.zeros(len(records), EVENT_DTYPE)
+        changed = False
+        for i, (wall_time, tick, event_type, kwargs) in enumerate(records):
+            tid, new = self._schema(event_type, kwargs)
+            changed |= new
+            row      = rows[i:i + 1].view(self._dtypes[tid])[0]
+            present  = 0
+            n_labels = len(self.labels)
+            for bit, (name, kind, _) in enumerate(self.schemas[tid]["fields"]):
+                if name not in kwargs:
+                    continue
+                value = kwargs[name]
+                if not _fits(kind, value):
+                    self.dropped += 1
+                    continue
+                row[name] = self._label(str(value)) if kind == "cat" else value
+                present  |= 1 << bit
+            for name in kwargs.keys() - {f[0] for f in self.schemas[tid]["fields"]}:
+                self.dropped += 1                                   # schema is full
+            changed |= len(self.labels) != n_labels
+            row["wall_time"], row["tick"], row["type"], row["present"] = wall_time, tick, tid, present
+        if changed:
+            self._save_header()
+        rows.tofile(self._file)
+
+
+class BinaryStatsLog(_BinaryLog):
+    """Appends STATS_DTYPE rows.  write() takes SimLogger snapshot tuples (in column order)."""
+
+    def __init__(self, path: str):
+        self.path   = path
+        self.labels: dict[str, list[str]] = {name: [] for name in STATS_CATEGORICAL}
+        self._codes  = {name: {} for name in STATS_CATEGORICAL}
+        self._cat_at = [STATS_DTYPE.names.index(name) for name in STATS_CATEGORICAL]
+        self._file   = open(path, "wb")
+        self._save_header()
+
+    def _save_header(self):
+        _atomic_json(self.path + ".json", {"format": "stats",
+                                           "dtype": np.lib.format.dtype_to_descr(STATS_DTYPE),
+                                           "labels": self.labels})
+
+    def write(self, records: list):
+        rows    = np.zeros(len(records), STATS_DTYPE)
+        changed = False
+        for i, rec in enumerate(records):
+            rec = list(rec)
+            for name, at in zip(STATS_CATEGORICAL, self._cat_at):
+                codes = self._codes[name]
+                if rec[at] not in codes:
+                    codes[rec[at]] = len(self.labels[name])
+                    self.labels[name].append(str(rec[at]))
+                    changed = True
+                rec[at] = codes[rec[at]]
+            rows[i] = tuple(rec)
+        if changed:
+            self._save_header()
+        rows.tofile(self._file)
+
+
+# ── Readers ───────────────────────────────────────────────────────────────────
+
+def _header(path: str) -> dict:
+    with open(path + ".json") as f:
+        return json.load(f)
+
+
+def read_stats(path: str, rows=None) -> dict[str, np.ndarray]:
+    """
+    Stats log → {column: array} (memory-mapped; categories decoded to str).
+    rows: a slice or record numbers, to read only those.
+    """
+    header = _header(path)
+    data   = _map(path, np.lib.format.descr_to_dtype(header["dtype"]))
+    rows   = data if rows is None else data[rows]
+    out    = {name: rows[name] for name in rows.dtype.names}
+    for name in STATS_CATEGORICAL:
+        out[name] = np.asarray(header["labels"][name] or [""], dtype=object)[rows[name]]
+    return out
+
+
+def read_events(path: str) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Event log → {event_type: {"wall_time", "tick", "present", <fields>…}}.
+    A field an event did not carry reads as 0 / False / "" (check `present`).
+    """
+    header = _header(path)
+    rows   = _map(path, EVENT_DTYPE)
+    labels = np.asarray(header["labels"] + [""], dtype=object)
+    types  = rows["type"]
+    out    = {}
+    for tid, schema in enumerate(header["schemas"]):
+        idx  = np.flatnonzero(types == tid)
+        view = rows.view(_schema_dtype(schema["fields"]))[idx]
+        cols = {"wall_time": view["wall_time"], "tick": view["tick"], "present": view["present"]}
+        for bit, (name, kind, _) in enumerate(schema["fields"]):
+            if kind == "cat":
+                codes = np.where(view["present"] >> bit & 1, view[name], len(labels) - 1)
+                cols[name] = labels[np.minimum(codes, len(labels) - 1)]
+            else:
+                cols[name] = view[name]
+        out[schema["event"]] = cols
+    return out
+
+
+def iter_events(path: str, records=None):
+    """(wall_time, tick, event_type, kwargs) per record, in log order or for the given record numbers."""
+    header  = _header(path)
+    labels  = header["labels"]
+    rows    = _map(path, EVENT_DTYPE)
+    schemas = [(s["event"], s["fields"], _schema_dtype(s["fields"])) for s in header["schemas"]]
+    for i in (range(len(rows)) if records is None else records):
+        event, fields, dtype = schemas[int(rows["type"][i])]
+        row     = rows[i:i + 1].view(dtype)[0]
+        present = int(row["present"])
+        kwargs  = {}
+        for bit, (name, kind, _) in enumerate(fields):
+            if present >> bit & 1:
+                value = row[name].item()
+                kwargs[name] = labels[value] if kind == "cat" else value
+        yield float(row["wall_time"]), int(row["tick"]), event, kwargs
+
+
+# ── CSV conversion ────────────────────────────────────────────────────────────
+
+def _timestamp(text: str) -> float:
+    return datetime.fromisoformat(text).timestamp()
+
+
+def csv_to_binary(csv_path: str, out_path: str | None = None) -> str:
+    """Convert a SimLogger events_/stats_ CSV to the binary format; returns the .bin path."""
+    from simulation.logger import EVENT_HEADER, STATS_HEADER
+
+    out_path = out_path or os.path.splitext(csv_path)[0] + ".bin"
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        if header == EVENT_HEADER:
+            log     = BinaryEventLog(out_path)
+            records = []
+            for wall, tick, event_type, details in reader:
+                kwargs = dict(kv.split("=", 1) for kv in details.split(" | ")) if details else {}
+                kwargs = {k: v if dict(EVENT_SCHEMAS.get(event_type, [])).get(k) == "cat" else _parse(v)
+                          for k, v in kwargs.items()}
+                records.append((_timestamp(wall), int(tick), event_type, kwargs))
+        elif header == STATS_HEADER:
+            log     = BinaryStatsLog(out_path)
+            kinds   = [STATS_DTYPE[name].kind for name in STATS_DTYPE.names]
+            parse   = {"f": float, "i": int, "u": str, "b": lambda s: s == "1"}
+            records = [(_timestamp(r[0]),) + tuple(parse[k](v) for k, v in zip(kinds[1:], r[1:]))
+                       for r in reader]
+        else:
+            raise ValueError(f"{csv_path}: not a SimLogger events or stats CSV")
+    try:
+        log.write(records)
+    finally:
+        log.close()
+    return out_path
+
+
+def binary_to_csv(path: str, out_path: str | None = None) -> str:
+    """Convert a binary events/stats log back to SimLogger's CSV; returns the .csv path."""
+    from simulation.logger import EVENT_HEADER, STATS_HEADER, _event_row, _snapshot_row
+
+    out_path = out_path or os.path.splitext(path)[0] + ".csv"
+    kind     = _header(path)["format"]
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        if kind == "events":
+            writer.writerow(EVENT_HEADER)
+            writer.writerows(_event_row(rec) for rec in iter_events(path))
+        else:
+            cols = read_stats(path)
+            writer.writerow(STATS_HEADER)
+            writer.writerows(_snapshot_row(rec) for rec in zip(*(c.tolist() for c in cols.values())))
+    return out_path
@@ -113,6 +113,10 @@ ALL_RED_TIME  = 1    # seconds (safety clearance)
 # ── ML Predictor ──────────────────────────────────────────────────────────────
 HISTORY_LEN  = 120   # ticks of history to feed ML model
 PRED_HORIZON = 30    # ticks ahead to predict
+PRED_HORIZONS = (5, 15, 30, 60, 90, 120)   # forecast trajectory (ticks ahead)
+TRAIN_SAMPLES = 120  # training windows kept in the rolling history buffer
+PRED_INTERVAL = 0.8  # nominal coverage of the reported prediction interval
+PLAN_ON_UPPER = False  # size green time against the interval's upper bound
 
 # ── Dashboard Panel Layout ────────────────────────────────────────────────────
 SIM_PANEL_W  = 920   # left: simulation
@@ -337,7 +337,12 @@ class Dashboard:
         bar_h  = 6
         pygame.draw.rect(surface, C["chart_grid"], (x, y + 14, bar_w, bar_h), border_radius=3)
         pygame.draw.rect(surface, C["accent"],     (x, y + 14, int(bar_w * conf), bar_h), border_radius=3)
-        cl = self.font_small.render(f"Confidence {conf*100:.0f}%", True, C["text_dim"])
+        last   = self.intersection.predictor.last_pred
+        text   = f"Confidence {conf*100:.0f}%"
+        if "upper_ns" in last:
+            text += (f"   NS {last['lower_ns']:.1f}–{last['upper_ns']:.1f}"
+                     f"   EW {last['lower_ew']:.1f}–{last['upper_ew']:.1f}")
+        cl = self.font_small.render(text, True, C["text_dim"])
         surface.blit(cl, (x, y + 24))
 
     # ── Mode buttons ──────────────────────────────────────────────────────────
@@ -7,6 +7,8 @@ emergency detection, and feeds data to the ML predictor.
 
 import random
 import math
+import time
+from collections import deque
 import pygame
 from simulation.config import (
     C, FPS, SPAWN_POINTS, VEHICLE_TYPES, EMERGENCY_PROB,
@@ -21,6 +23,7 @@ from simulation.ml_predictor import MLPredictor
 VEHICLE_TYPE_POOL = (
     ["car"] * 70 + ["truck"] * 15 + ["bus"] * 10 + ["emergency"] * 5
 )
+MIN_SPAWN_GAP = 10   # frames between spawns on one approach when driven by measured rates
 
 
 class Intersection:
@@ -36,6 +39,10 @@ class Intersection:
 
         self.tick         = 0
         self.spawn_timer  = {sp[2]: 0 for sp in SPAWN_POINTS}
+        self.arrival_rates: dict[str, float] | None = None   # measured veh/min per direction
+        self.live_source  = None                              # e.g. ai.count_bridge.BridgeReader
+        self.live_targets: dict[str, int] | None = None       # camera counts per approach
+        self.live_latency_ms: deque = deque(maxlen=5000)      # frame → spawn decision
         self.mode         = "normal"
         self.paused       = False
 
@@ -113,14 +120,75 @@ class Intersection:
             return int(SPAWN_INTERVAL_BASE / NIGHT_DENSITY_MULT)
         return SPAWN_INTERVAL_BASE
 
+    def set_arrival_rates(self, rates: dict[str, float] | None):
+        """
+        Drive spawning from measured arrival rates ({direction: vehicles/min},
+        e.g. ai.line_counter.LineCrossingCounter.spawn_rates()).  None
+        restores the mode-based intervals.
+        """
+        self.arrival_rates = dict(rates) if rates is not None else None
+
+    def set_live_source(self, source):
+        """
+        Spawn from live camera counts.  source.poll() returns new count
+        records (ai.count_bridge.BridgeReader): records with stop-line
+        rates drive Poisson arrivals, the rest keep each approach's vehicle
+        count at the camera's.  None restores the mode-based intervals.
+        """
+        self.live_source  = source
+        self.live_targets = None
+        if source is None:
+            self.arrival_rates = None
+
+    def _poll_live(self):
+        records = self.live_source.poll()
+        if not records:
+            return
+        rec = records[-1]                       # only the newest frame matters
+        if rec.get("has_rates"):
+            self.arrival_rates = {"N→S": rec["rate_sb"], "S→N": rec["rate_nb"],
+                                  "E→W": rec["rate_wb"], "W→E": rec["rate_eb"]}
+            self.live_targets  = None
+        elif rec["ns_count"] >= 0:
+            self.live_targets  = {"ns": rec["ns_count"], "ew": rec["ew_count"]}
+        else:                                   # total only: split evenly
+            half = max(rec["count"], 0) / 2
+            self.live_targets  = {"ns": math.ceil(half), "ew": math.floor(half)}
+        self.live_latency_ms.append((time.monotonic() - rec["t_frame"]) * 1000)
+
+    def live_latency(self) -> dict:
+        """Frame → spawn decision latency percentiles (ms) in live mode."""
+        if not self.live_latency_ms:
+            return {"n": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        lat = sorted(self.live_latency_ms)
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))]         # noqa: E731
+        return {"n": len(lat), "p50_ms": round(pct(0.5), 2),
+                "p99_ms": round(pct(0.99), 2), "max_ms": round(lat[-1], 2)}
+
     def _maybe_spawn(self):
+        if self.live_source is not None:
+            self._poll_live()
         interval = self._spawn_interval()
+        density  = self.current_density() if self.live_targets is not None else None
         for sp in SPAWN_POINTS:
             x0, y0, direction, dx, dy = sp
             self.spawn_timer[direction] = self.spawn_timer.get(direction, 0) + 1
-            jitter = random.randint(-interval // 4, interval // 4)
-            if self.spawn_timer[direction] < interval + jitter:
-                continue
+            if density is not None:
+                # Top up the approach until it holds as many vehicles as the camera sees
+                approach = "ns" if direction in ("N→S", "S→N") else "ew"
+                if (self.spawn_timer[direction] < MIN_SPAWN_GAP
+                        or density[approach] >= self.live_targets[approach]):
+                    continue
+                density[approach] += 1
+            elif self.arrival_rates is not None:
+                # Poisson arrivals at the measured rate, never closer than MIN_SPAWN_GAP
+                p = self.arrival_rates.get(direction, 0.0) / (FPS * 60)
+                if self.spawn_timer[direction] < MIN_SPAWN_GAP or random.random() >= p:
+                    continue
+            else:
+                jitter = random.randint(-interval // 4, interval // 4)
+                if self.spawn_timer[direction] < interval + jitter:
+                    continue
             self.spawn_timer[direction] = 0
             self._spawn_vehicle(x0, y0, dx, dy, direction)
 
@@ -7,6 +7,16 @@ Writes a timestamped CSV log of key simulation events:
   - Mode changes
   - Per-tick stats snapshot (every N ticks)
 
+event() and snapshot() only capture raw values and put them on a queue.
+A background thread formats the rows, writes them in batches and flushes
+when FLUSH_ROWS rows are pending or the oldest has waited FLUSH_INTERVAL
+seconds.  close() drains the queue and fsyncs both files.  Loggers still
+open at interpreter exit, or when SIGTERM/SIGHUP arrive, are closed the
+same way, so a killed run keeps everything logged before the signal.
+
+SimLogger(binary=True) writes the typed binary format of
+simulation/binlog.py (events_<ts>.bin, stats_<ts>.bin) instead of CSV.
+
 Usage:
     from simulation.logger import SimLogger
     log = SimLogger()
@@ -18,11 +28,179 @@ Usage:
 import csv
 import os
 import time
+import queue
+import signal
+import atexit
+import weakref
+import threading
 from datetime import datetime
 
+from simulation.binlog import BinaryEventLog, BinaryStatsLog
+
 
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
 
+FLUSH_ROWS     = 256      # pending rows that force a flush
+FLUSH_INTERVAL = 0.5      # seconds the oldest pending row may wait
+CRASH_SIGNALS  = ("SIGTERM", "SIGHUP")
+
+EVENT_HEADER = ["wall_time", "sim_tick", "event_type", "details"]
+STATS_HEADER = [
+    "wall_time", "sim_tick", "ns_count", "ew_count",
+    "ns_queue", "ew_queue", "avg_wait_s", "phase",
+    "signal_state", "green_remaining_s", "total_passed",
+    "emergency_active", "mode", "pred_ns", "pred_ew",
+]
+
+_EVENT, _SNAPSHOT, _FLUSH, _STOP = range(4)
+
+
+def _wall(t: float) -> str:
+    return datetime.fromtimestamp(t).isoformat(timespec="seconds")
+
+
+def _event_row(item) -> list:
+    t, tick, event_type, kwargs = item
+    return [_wall(t), tick, event_type, " | ".join(f"{k}={v}" for k, v in kwargs.items())]
+
+
+def _snapshot_row(item) -> list:
+    (t, tick, ns, ew, ns_q, ew_q, avg_wait, phase, state, remaining,
+     passed, emergency, mode, pred_ns, pred_ew) = item
+    return [_wall(t), tick, ns, ew, ns_q, ew_q, f"{avg_wait:.2f}", phase, state,
+            f"{remaining:.1f}", passed, int(emergency), mode, f"{pred_ns:.2f}", f"{pred_ew:.2f}"]
+
+
+class CsvLog:
+    """One CSV log file; write() formats queued records into rows."""
+
+    def __init__(self, path: str, header: list, row):
+        self.path  = path
+        self._row  = row
+        self._file = open(path, "w", newline="")
+        self._csv  = csv.writer(self._file)
+        self._csv.writerow(header)
+        self._file.flush()
+
+    def write(self, records: list):
+        self._csv.writerows(self._row(r) for r in records)
+
+    def flush(self, durable: bool = False):
+        self._file.flush()
+        if durable:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class LogWriter(threading.Thread):
+    """Drains queued log records into the event and stats logs in batches."""
+
+    def __init__(self, event_log, stats_log):
+        super().__init__(name="sim-logger", daemon=True)
+        self.logs    = (event_log, stats_log)
+        self.rows    = [0, 0]             # records written per log
+        self.error: Exception | None = None
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()   # reentrant: safe from signal handlers
+        self.start()
+
+    def run(self):
+        pending, oldest = 0, 0.0
+        while True:
+            try:
+                first = self.queue.get(timeout=FLUSH_INTERVAL if pending else None)
+                batch = [first]
+                while len(batch) < FLUSH_ROWS and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                batch = []
+
+            events, snaps, waiters, stop = [], [], [], False
+            for item in batch:
+                kind = item[0]
+                if kind == _EVENT:
+                    events.append(item[1:])
+                elif kind == _SNAPSHOT:
+                    snaps.append(item[1:])
+                elif kind == _FLUSH:
+                    waiters.append(item[1])
+                else:
+                    stop = True
+
+            if events or snaps:
+                if not pending:
+                    oldest = time.monotonic()
+                pending += len(events) + len(snaps)
+                self._write(events, snaps)
+            if pending and (waiters or stop or pending >= FLUSH_ROWS
+                            or time.monotonic() - oldest >= FLUSH_INTERVAL):
+                self._flush(durable=stop)
+                pending = 0
+            elif stop:
+                self._flush(durable=True)
+            for done in waiters:
+                done.set()
+            if stop:
+                return
+
+    def _write(self, events: list, snaps: list):
+        if self.error is not None:
+            return
+        try:
+            for i, records in enumerate((events, snaps)):
+                if records:
+                    self.logs[i].write(records)
+                    self.rows[i] += len(records)
+        except OSError as e:                      # keep the simulation running
+            self.error = e
+
+    def _flush(self, durable: bool = False):
+        if self.error is not None:
+            return
+        try:
+            for log in self.logs:
+                log.flush(durable)
+        except OSError as e:
+            self.error = e
+
+
+# ── Crash safety ──────────────────────────────────────────────────────────────
+
+_open_loggers: "weakref.WeakSet[SimLogger]" = weakref.WeakSet()
+_prev_handlers: dict = {}
+
+
+def _close_all():
+    for logger in list(_open_loggers):
+        logger.close()
+
+
+def _on_signal(signum, frame):
+    _close_all()
+    prev = _prev_handlers.get(signum)
+    if callable(prev):
+        prev(signum, frame)
+    elif prev != signal.SIG_IGN:              # default action: die of the same signal
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+def _install_crash_handlers():
+    """Once per process; signal handlers can only be set from the main thread."""
+    if _prev_handlers or threading.current_thread() is not threading.main_thread():
+        return
+    atexit.register(_close_all)
+    for name in CRASH_SIGNALS:
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue
+        prev = signal.getsignal(signum)
+        if prev is None:                      # installed outside Python; leave it alone
+            continue
+        _prev_handlers[signum] = prev
+        signal.signal(signum, _on_signal)
+
 
 class SimLogger:
     """
@@ -30,11 +208,16 @@ class SimLogger:
     Creates two files per session:
       logs/events_<timestamp>.csv   — discrete events
       logs/stats_<timestamp>.csv    — per-tick snapshots
+    (.bin plus a .json header each with binary=True).
+
+    Rows reach disk within FLUSH_INTERVAL seconds; call flush() to wait for
+    them.  Event kwargs are formatted on the writer thread, so pass values
+    rather than objects that keep changing.
     """
 
     SNAPSHOT_EVERY = 60   # ticks between stat snapshots
 
-    def __init__(self, enabled: bool = True):
+    def __init__(self, enabled: bool = True, binary: bool = False):
         self.enabled = enabled
         if not enabled:
             return
@@ -42,46 +225,37 @@ class SimLogger:
         os.makedirs(LOG_DIR, exist_ok=True)
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        self._event_path = os.path.join(LOG_DIR, f"events_{ts}.csv")
-        self._stats_path = os.path.join(LOG_DIR, f"stats_{ts}.csv")
+        ext = "bin" if binary else "csv"
 
-        self._event_file = open(self._event_path, "w", newline="")
-        self._stats_file = open(self._stats_path, "w", newline="")
+        self._event_path = os.path.join(LOG_DIR, f"events_{ts}.{ext}")
+        self._stats_path = os.path.join(LOG_DIR, f"stats_{ts}.{ext}")
 
-        self._event_writer = csv.writer(self._event_file)
-        self._stats_writer = csv.writer(self._stats_file)
+        if binary:
+            self._event_log = BinaryEventLog(self._event_path)
+            self._stats_log = BinaryStatsLog(self._stats_path)
+        else:
+            self._event_log = CsvLog(self._event_path, EVENT_HEADER, _event_row)
+            self._stats_log = CsvLog(self._stats_path, STATS_HEADER, _snapshot_row)
 
-        self._event_writer.writerow(["wall_time", "sim_tick", "event_type", "details"])
-        self._stats_writer.writerow([
-            "wall_time", "sim_tick", "ns_count", "ew_count",
-            "ns_queue", "ew_queue", "avg_wait_s", "phase",
-            "signal_state", "green_remaining_s", "total_passed",
-            "emergency_active", "mode", "pred_ns", "pred_ew",
-        ])
-
-        self._event_file.flush()
-        self._stats_file.flush()
+        self._writer = LogWriter(self._event_log, self._stats_log)
+        self._put    = self._writer.queue.put
+        self._closed = False
+        _open_loggers.add(self)
+        _install_crash_handlers()
         print(f"[Logger] Events → {self._event_path}")
         print(f"[Logger] Stats  → {self._stats_path}")
 
     # ── Events ────────────────────────────────────────────────────────────────
 
     def event(self, event_type: str, tick: int = 0, **kwargs):
-        if not self.enabled:
+        if not self.enabled or self._closed:
             return
-        details = " | ".join(f"{k}={v}" for k, v in kwargs.items())
-        self._event_writer.writerow([
-            datetime.now().isoformat(timespec="seconds"),
-            tick,
-            event_type,
-            details,
-        ])
-        self._event_file.flush()
+        self._put((_EVENT, time.time(), tick, event_type, kwargs))
 
     # ── Snapshots ─────────────────────────────────────────────────────────────
 
     def snapshot(self, tick: int, intersection, ml_pred: dict):
-        if not self.enabled:
+        if not self.enabled or self._closed:
             return
         if tick % self.SNAPSHOT_EVERY != 0:
             return
@@ -90,30 +264,34 @@ class SimLogger:
         dens   = intersection.current_density()
         queues = intersection.queue_lengths()
 
-        self._stats_writer.writerow([
-            datetime.now().isoformat(timespec="seconds"),
-            tick,
-            dens["ns"],
-            dens["ew"],
-            queues["ns"],
-            queues["ew"],
-            f"{intersection.avg_wait():.2f}",
-            ctrl.phase,
-            ctrl.state,
-            f"{ctrl.seconds_remaining():.1f}",
-            intersection.total_vehicles_passed,
-            int(ctrl.emergency_active),
-            intersection.mode,
-            f"{ml_pred.get('predicted_ns', 0):.2f}",
-            f"{ml_pred.get('predicted_ew', 0):.2f}",
-        ])
-        self._stats_file.flush()
+        self._put((
+            _SNAPSHOT, time.time(), tick,
+            dens["ns"], dens["ew"], queues["ns"], queues["ew"],
+            intersection.avg_wait(),
+            ctrl.phase, ctrl.state, ctrl.seconds_remaining(),
+            intersection.total_vehicles_passed, ctrl.emergency_active, intersection.mode,
+            ml_pred.get("predicted_ns", 0), ml_pred.get("predicted_ew", 0),
+        ))
 
     # ── Lifecycle ─────────────────────────────────────────────────────────────
 
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything logged so far is written and flushed."""
+        if not self.enabled or self._closed:
+            return True
+        done = threading.Event()
+        self._put((_FLUSH, done))
+        return done.wait(timeout)
+
     def close(self):
-        if not self.enabled:
+        if not self.enabled or self._closed:
             return
-        self._event_file.close()
-        self._stats_file.close()
+        self._closed = True
+        _open_loggers.discard(self)
+        self._put((_STOP,))
+        self._writer.join()
+        self._event_log.close()
+        self._stats_log.close()
+        if self._writer.error is not None:
+            print(f"[Logger] Write failed: {self._writer.error}")
         print(f"[Logger] Session closed.")
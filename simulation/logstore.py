@@ -0,0 +1,273 @@
+"""
+simulation/logstore.py — Tick-indexed queries over SimLogger sessions
+----------------------------------------------------------------------
+Answers "which events of type X happened between tick A and B, and what
+did the stats look like around them" from the binary logs
+(simulation/binlog.py), without scanning them.
+
+Each events_<ts>.bin / stats_<ts>.bin gets a <file>.idx/ directory of
+raw int64 arrays (memory-mapped when read) and an index.json holding
+their lengths:
+  sparse        the tick of every INDEX_EVERY-th record, in tick order
+  order         tick order of the records (only when the file is not
+                already sorted by tick)
+  post_tick_<t> / post_rec_<t>
+                posting list of event type t (events only): its records'
+                ticks and record numbers, sorted by tick
+
+A range lookup bisects `sparse` and then one INDEX_EVERY-record block of
+the memory-mapped file, so it reads O(log n + matches) records.  A
+query for one event type bisects only that type's posting list.  Nothing
+is read in full, so queries stay sublinear in the size of the log.
+
+An index is built on first query.  When the file has grown (a live
+session), the index is extended from the records it already covers:
+the new records are appended to `sparse`, `order` and the posting
+lists, and index.json (the commit point) gets the new lengths, so each
+query pays only for the records logged since the last one.  A new tail
+that goes back in tick order cannot be appended and triggers one full
+rebuild.  CSV-only sessions can be converted with convert_csv() first.
+
+Usage:
+    from simulation.logstore import LogStore
+    store = LogStore("logs")
+    for hit in store.incident("emergency_preemption", 1000, 5000, window=120):
+        print(hit["tick"], hit["details"], hit["stats"]["avg_wait_s"])
+
+    python scripts/query_logs.py --event emergency_preemption --from 1000 --to 5000
+"""
+
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+
+from simulation.binlog import (EVENT_DTYPE, _header, _map, csv_to_binary,
+                               iter_events, read_stats)
+from simulation.logger import LOG_DIR
+
+INDEX_EVERY   = 1024      # records per sparse index entry
+INDEX_EXT     = ".idx"
+INDEX_VERSION = 2         # raw appendable arrays; older .npy indexes are rebuilt
+
+
+def _bounds(tick_at, sparse: np.ndarray, every: int, n: int, tick: int, side: str) -> int:
+    """Position of `tick` among n tick-sorted records, reading one block of them."""
+    j    = int(np.searchsorted(sparse, tick, side))
+    base = max(j - 1, 0) * every
+    stop = min(j * every + 1, n)
+    return base + int(np.searchsorted(tick_at(slice(base, stop)), tick, side))
+
+
+class IndexedLog:
+    """One binary log file with its tick index (and posting lists, for events)."""
+
+    def __init__(self, path: str):
+        self.path   = path
+        self.header = _header(path)
+        self.events = self.header["format"] == "events"
+        dtype       = EVENT_DTYPE if self.events else np.lib.format.descr_to_dtype(self.header["dtype"])
+        self.rows   = _map(path, dtype)
+        self.ticks  = self.rows["tick" if self.events else "sim_tick"]
+        self.types  = {s["event"]: tid for tid, s in enumerate(self.header["schemas"])} \
+            if self.events else {}
+        self.dir    = path + INDEX_EXT
+        meta        = self._meta()
+        if meta is None or meta["records"] > len(self.rows) or not self.extend(meta):
+            self.build()
+        self.meta   = self._meta()
+        self.every  = self.meta["every"]
+        self.order  = self._array("order") if self.meta["order"] else None
+        self.sparse = self._array("sparse")
+
+    # ── Index ─────────────────────────────────────────────────────────────────
+
+    def _meta(self) -> dict | None:
+        try:
+            with open(os.path.join(self.dir, "index.json")) as f:
+                meta = json.load(f)
+            return meta if meta.get("version") == INDEX_VERSION else None
+        except (OSError, ValueError):
+            return None
+
+    def _array(self, name: str) -> np.ndarray:
+        n = self.meta["lengths"].get(name, 0)
+        if not n:
+            return np.zeros(0, np.int64)
+        return np.memmap(os.path.join(self.dir, name + ".i8"), dtype=np.int64, mode="r", shape=(n,))
+
+    def _postings(self, ticks: np.ndarray, recs: np.ndarray) -> dict[str, np.ndarray]:
+        """Posting-list pieces of tick-sorted records, per event type present."""
+        types = np.asarray(self.rows["type"])[recs]
+        out   = {}
+        for tid in np.unique(types).tolist():
+            hit = types == tid
+            out[f"post_tick_{tid}"] = ticks[hit]
+            out[f"post_rec_{tid}"]  = recs[hit]
+        return out
+
+    def build(self):
+        """Write <file>.idx/ from scratch; one pass over the file."""
+        ticks  = np.asarray(self.ticks, dtype=np.int64)
+        recs   = np.arange(len(ticks), dtype=np.int64)
+        arrays = {}
+        order  = None
+        if len(ticks) > 1 and (np.diff(ticks) < 0).any():
+            order = arrays["order"] = np.argsort(ticks, kind="stable").astype(np.int64)
+            ticks, recs = ticks[order], order
+        arrays["sparse"] = ticks[::INDEX_EVERY]
+        if self.events:
+            arrays.update(self._postings(ticks, recs))
+
+        tmp = self.dir + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, arr in arrays.items():
+            np.ascontiguousarray(arr, dtype=np.int64).tofile(os.path.join(tmp, name + ".i8"))
+        self._commit(tmp, {"records": len(ticks), "order": order is not None,
+                           "last_tick": int(ticks[-1]) if len(ticks) else None,
+                           "lengths": {name: len(arr) for name, arr in arrays.items()}})
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.replace(tmp, self.dir)
+
+    def extend(self, meta: dict) -> bool:
+        """
+        Index the records appended since `meta` was written, reading only
+        those.  Returns False when they go back in tick order (or the
+        index was built with another INDEX_EVERY); build() then starts over.
+        """
+        start, n = meta["records"], len(self.rows)
+        if start == n:
+            return True
+        ticks = np.asarray(self.ticks[start:], dtype=np.int64)
+        last  = meta["last_tick"]
+        if meta["every"] != INDEX_EVERY or (np.diff(ticks) < 0).any() \
+                or (last is not None and ticks[0] < last):
+            return False
+
+        recs   = np.arange(start, n, dtype=np.int64)
+        arrays = {"sparse": ticks[(-start) % INDEX_EVERY::INDEX_EVERY]}
+        if meta["order"]:
+            arrays["order"] = recs
+        if self.events:
+            arrays.update(self._postings(ticks, recs))
+
+        lengths = dict(meta["lengths"])
+        for name, arr in arrays.items():
+            with open(os.path.join(self.dir, name + ".i8"), "ab") as f:
+                f.truncate(lengths.get(name, 0) * 8)     # drop a tail an interrupted extend left
+                np.ascontiguousarray(arr, dtype=np.int64).tofile(f)
+            lengths[name] = lengths.get(name, 0) + len(arr)
+        self._commit(self.dir, {"records": n, "order": meta["order"],
+                                "last_tick": int(ticks[-1]), "lengths": lengths})
+        return True
+
+    @staticmethod
+    def _commit(directory: str, meta: dict):
+        meta = {"version": INDEX_VERSION, "every": INDEX_EVERY, **meta}
+        tmp  = os.path.join(directory, "index.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, "index.json"))
+
+    # ── Lookups ───────────────────────────────────────────────────────────────
+
+    def _tick_at(self, span: slice) -> np.ndarray:
+        return self.ticks[span] if self.order is None else self.ticks[self.order[span]]
+
+    def span(self, start: int | None, end: int | None) -> np.ndarray:
+        """Record numbers with start <= tick <= end, in tick order."""
+        n  = len(self.rows)
+        lo = 0 if start is None else _bounds(self._tick_at, self.sparse, self.every, n, start, "left")
+        hi = n if end is None else _bounds(self._tick_at, self.sparse, self.every, n, end, "right")
+        hi    = max(hi, lo)
+        return np.arange(lo, hi) if self.order is None else self.order[lo:hi]
+
+    def postings(self, event_type: str, start: int | None, end: int | None) -> np.ndarray:
+        """Record numbers of one event type with start <= tick <= end, in tick order."""
+        tid = self.types.get(event_type)
+        if tid is None:
+            return np.zeros(0, np.int64)
+        ticks = self._array(f"post_tick_{tid}")
+        lo    = 0 if start is None else int(np.searchsorted(ticks, start, "left"))
+        hi    = len(ticks) if end is None else int(np.searchsorted(ticks, end, "right"))
+        return np.asarray(self._array(f"post_rec_{tid}")[lo:max(hi, lo)])
+
+
+class LogStore:
+    """Tick-range and event-type queries over every binary session in a log directory."""
+
+    def __init__(self, log_dir: str = LOG_DIR):
+        self.log_dir = log_dir
+        self._open: dict[str, IndexedLog] = {}
+
+    def sessions(self) -> list[str]:
+        """Session timestamps with a binary event log, oldest first."""
+        paths = glob.glob(os.path.join(self.log_dir, "events_*.bin"))
+        return sorted(os.path.basename(p)[len("events_"):-len(".bin")] for p in paths)
+
+    def describe(self) -> list[dict]:
+        """Per session: event and stats record counts and the tick span (indexes it if needed)."""
+        out = []
+        for ses in self.sessions():
+            events, stats = self._log("events", ses), self._log("stats", ses)
+            ticks = events.ticks if events.order is None else events.ticks[events.order]
+            out.append({"session": ses, "events": len(events.rows),
+                        "stats": len(stats.rows) if stats is not None else 0,
+                        "first_tick": int(ticks[0]) if len(ticks) else None,
+                        "last_tick":  int(ticks[-1]) if len(ticks) else None})
+        return out
+
+    def convert_csv(self) -> list[str]:
+        """Convert CSV-only sessions to binary so they can be indexed; returns the new .bin paths."""
+        made = []
+        for path in sorted(glob.glob(os.path.join(self.log_dir, "*_*.csv"))):
+            name = os.path.basename(path)
+            if name.startswith(("events_", "stats_")) and not os.path.exists(path[:-4] + ".bin"):
+                made.append(csv_to_binary(path))
+        return made
+
+    def _log(self, kind: str, session: str) -> IndexedLog | None:
+        path = os.path.join(self.log_dir, f"{kind}_{session}.bin")
+        log  = self._open.get(path)
+        if log is not None and len(log.rows) != os.path.getsize(path) // log.rows.itemsize:
+            log = None                                    # the session is still being written
+        if log is None and os.path.exists(path):
+            log = self._open[path] = IndexedLog(path)
+        return log
+
+    def events(self, event_type: str | None = None, start: int | None = None,
+               end: int | None = None, session: str | None = None) -> list[dict]:
+        """Events in [start, end] ticks (all types, or one), by session then tick."""
+        out = []
+        for ses in [session] if session else self.sessions():
+            log = self._log("events", ses)
+            if log is None:
+                continue
+            recs = log.span(start, end) if event_type is None else log.postings(event_type, start, end)
+            for wall_time, tick, event, kwargs in iter_events(log.path, recs.tolist()):
+                out.append({"session": ses, "wall_time": wall_time, "tick": tick,
+                            "event": event, "details": kwargs})
+        return out
+
+    def stats(self, start: int | None = None, end: int | None = None,
+              session: str | None = None) -> dict[str, np.ndarray]:
+        """Stats rows in [start, end] ticks of one session (the latest by default)."""
+        session = session or (self.sessions() or [None])[-1]
+        log     = self._log("stats", session) if session else None
+        if log is None:
+            return {}
+        return read_stats(log.path, log.span(start, end))
+
+    def incident(self, event_type: str | None, start: int | None = None, end: int | None = None,
+                 window: int = 60, session: str | None = None) -> list[dict]:
+        """Each matching event, with the stats rows within ±window ticks of it under "stats"."""
+        hits = self.events(event_type, start, end, session)
+        for hit in hits:
+            hit["stats"] = self.stats(hit["tick"] - window, hit["tick"] + window, hit["session"])
+        return hits
+
+    def close(self):
+        self._open.clear()
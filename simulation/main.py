@@ -18,6 +18,7 @@ Controls:
 
 import sys
 import os
+from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -30,14 +31,12 @@ from simulation.intersection import Intersection
 from simulation.dashboard    import Dashboard
 from simulation.logger       import SimLogger
 from simulation.stats        import StatsCollector
+from simulation.model_watcher import ModelWatcher
 
 
-def _export_session(intersection, stats, logger, tick):
-    from datetime import datetime
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    csv_path  = os.path.join("data", f"run_{ts}.csv")
+def _export_session(intersection, stats, logger, tick, ts):
     json_path = os.path.join("data", f"summary_{ts}.json")
-    stats.export_csv(csv_path)
+    stats.close()                      # data/run_<ts>.csv was streamed during the run
     stats.export_json(json_path)
     stats.summary()
     logger.event("session_end", tick=tick,
@@ -46,7 +45,11 @@ def _export_session(intersection, stats, logger, tick):
     logger.close()
 
 
-def main():
+def main(bridge: str | None = None, binary_logs: bool = False):
+    """
+    bridge: shared-memory ring name to spawn from live detection counts.
+    binary_logs: write logs/ in the binary format of simulation/binlog.py.
+    """
     pygame.init()
     pygame.display.set_caption(WINDOW_TITLE)
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
@@ -56,9 +59,16 @@ def main():
     intersection = Intersection()
     dashboard    = Dashboard(intersection)
     dashboard.init_fonts()
+    if bridge:
+        from ai.count_bridge import BridgeReader
+        intersection.set_live_source(BridgeReader(name=bridge))
+        print(f"[Live] Spawning from detection counts on shared memory '{bridge}'")
 
-    logger = SimLogger(enabled=True)
-    stats  = StatsCollector()
+    session = datetime.now().strftime("%Y%m%d_%H%M%S")
+    logger  = SimLogger(enabled=True, binary=binary_logs)
+    stats   = StatsCollector(spill=os.path.join("data", f"run_{session}.csv"))
+    watcher = ModelWatcher()
+    watcher.start()
 
     font_hud = pygame.font.SysFont("monospace", 11)
     logger.event("session_start", tick=0, mode=intersection.mode)
@@ -99,7 +109,6 @@ def main():
                     intersection.paused = not intersection.paused
                     logger.event("pause_toggle", tick=tick, paused=intersection.paused)
                 elif event.key == pygame.K_s:
-                    from datetime import datetime
                     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
                     stats.export_csv(os.path.join("data", f"snapshot_{ts}.csv"))
 
@@ -119,6 +128,9 @@ def main():
             elif action == "pause":
                 intersection.paused = not intersection.paused
 
+        # Swap in any newly validated model between ticks
+        watcher.apply(intersection.predictor, logger, tick)
+
         if not intersection.paused:
             intersection.update()
             dashboard.update(tick)
@@ -160,7 +172,12 @@ def main():
         pygame.display.flip()
         clock.tick(FPS)
 
-    _export_session(intersection, stats, logger, tick)
+    watcher.stop()
+    if intersection.live_source is not None:
+        lat = intersection.live_latency()
+        print(f"[Live] frame → spawn decision: p50 {lat['p50_ms']} ms  p99 {lat['p99_ms']} ms "
+              f"({lat['n']} updates, {intersection.live_source.lost} records lost)")
+    _export_session(intersection, stats, logger, tick, session)
     pygame.quit()
     sys.exit(0)
 
@@ -8,17 +8,38 @@ vehicle density PRED_HORIZON ticks ahead.
 Features per window step:
   [ns_count, ew_count, ns_queue, ew_queue, time_of_day_sin, time_of_day_cos]
 
+Each forest is a direct multi-output model: one evaluation returns the
+whole forecast trajectory for PRED_HORIZONS, and the PRED_HORIZON column
+is what predict() reports.  predict_batch() evaluates many feature rows
+(many timestamps, or many intersections) in a single call.
+
+Uncertainty comes from the forest itself: the trees are flattened into
+padded node arrays after each fit, so one vectorised traversal yields
+every tree's prediction.  Their spread, scaled by a conformal factor
+fitted on out-of-bag residuals, gives a PRED_INTERVAL prediction interval
+(lower_*/upper_* in the prediction dict).
+
 The model is trained online as the simulation runs, so predictions
 improve over time.  An initial synthetic warm-up dataset primes the
-model before live data accumulates.
+model before live data accumulates.  Online retrains fit on a background
+thread and the new model is swapped in between ticks, so the simulation
+loop never waits for a fit.
 """
 
+import os
 import math
+import time
+import pickle
 import random
+import threading
 import numpy as np
 from collections import deque
+from statistics import NormalDist
+from numpy.lib.stride_tricks import sliding_window_view
 
-from simulation.config import HISTORY_LEN, PRED_HORIZON, FPS
+from simulation.config import (
+    HISTORY_LEN, PRED_HORIZON, PRED_HORIZONS, TRAIN_SAMPLES, PRED_INTERVAL, FPS,
+)
 
 try:
     from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
@@ -28,6 +49,166 @@ except ImportError:
     ML_AVAILABLE = False
     print("[ML] scikit-learn not found — using heuristic predictor.")
 
+SPREAD_FLOOR  = 0.25   # vehicles; keeps intervals open where all trees agree
+CONF_FLOOR    = 5.0    # vehicles; interval widths are judged against at least this
+BUNDLE_SCHEMA = "ml_predictor/v1"
+
+
+def _compile_forest(model, scaler) -> dict:
+    """
+    Flatten a fitted forest (and its input scaler) into padded node arrays
+    of shape (n_trees, max_nodes) so all trees can be walked at once.
+    """
+    trees = [est.tree_ for est in model.estimators_]
+    n_t   = len(trees)
+    n_max = max(t.node_count for t in trees)
+    n_out = trees[0].value.shape[1]
+
+    left      = np.full((n_t, n_max), -1, dtype=np.intp)
+    right     = np.full((n_t, n_max), -1, dtype=np.intp)
+    feature   = np.zeros((n_t, n_max), dtype=np.intp)
+    threshold = np.zeros((n_t, n_max))
+    value     = np.zeros((n_t, n_max, n_out))
+    for i, t in enumerate(trees):
+        n = t.node_count
+        left[i, :n]      = t.children_left
+        right[i, :n]     = t.children_right
+        feature[i, :n]   = np.maximum(t.feature, 0)    # leaves use -2
+        threshold[i, :n] = t.threshold
+        value[i, :n]     = t.value[:, :, 0]
+
+    return {
+        "left": left, "right": right, "feature": feature,
+        "threshold": threshold, "value": value,
+        "depth": max(t.max_depth for t in trees),
+        "mean":  scaler.mean_, "scale": scaler.scale_,
+    }
+
+
+def _tree_predictions(forest: dict, X: np.ndarray) -> np.ndarray:
+    """Every tree's prediction for every row: (n_trees, n_rows, n_outputs)."""
+    # sklearn trees compare float32 features against float64 thresholds
+    Xs    = ((X - forest["mean"]) / forest["scale"]).astype(np.float32)
+    n_t   = forest["left"].shape[0]
+    rows  = np.arange(len(Xs))[None, :]
+    t_idx = np.arange(n_t)[:, None]
+    node  = np.zeros((n_t, len(Xs)), dtype=np.intp)
+    for _ in range(forest["depth"]):
+        left    = forest["left"][t_idx, node]
+        go_left = Xs[rows, forest["feature"][t_idx, node]] <= forest["threshold"][t_idx, node]
+        nxt     = np.where(go_left, left, forest["right"][t_idx, node])
+        node    = np.where(left == -1, node, nxt)
+    return forest["value"][t_idx, node]
+
+
+def _conformal_scale(model, per_tree: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Per-horizon factor k such that mean ± k·(tree spread + floor) covers
+    PRED_INTERVAL of the out-of-bag residuals (split-conformal quantile).
+    """
+    oob    = np.asarray(model.oob_prediction_).reshape(y.shape)
+    spread = per_tree.std(axis=0) + SPREAD_FLOOR
+    score  = np.abs(y - oob) / spread
+    n      = np.sum(~np.isnan(score), axis=0)
+    level  = np.minimum(np.ceil((n + 1) * PRED_INTERVAL) / np.maximum(n, 1), 1.0)
+    return np.array([np.nanquantile(score[:, k], level[k]) for k in range(y.shape[1])])
+
+
+def _confidence(pred: float, lower: float, upper: float) -> float:
+    """
+    1 − interval half-width relative to the forecast, clipped to 0..1.
+    Forecasts below CONF_FLOOR are scored against CONF_FLOOR, so a ±1.5
+    vehicle interval on a near-empty approach is not reported as no
+    confidence at all.
+    """
+    half = (upper - lower) / 2
+    return float(min(max(1.0 - half / max(pred, CONF_FLOOR), 0.0), 1.0))
+
+
+# ── Model bundles ─────────────────────────────────────────────────────────────
+#
+# A bundle is the picklable unit of a trained predictor: both forests, their
+# scalers, the conformal interval scales and enough metadata to validate it
+# against this code before it goes live.
+
+def fit_bundle(ns, ew, qns, qew, ticks, horizons) -> dict | None:
+    """
+    Train both multi-output forests on aligned count/queue/tick series.
+    Returns None when the series are too short to yield 20 training windows.
+    """
+    ns_arr, ew_arr, qns_arr, qew_arr, tk_arr = (
+        np.asarray(v, dtype=float) if isinstance(v, np.ndarray) else np.fromiter(v, float)
+        for v in (ns, ew, qns, qew, ticks)
+    )
+
+    horizons = tuple(sorted(horizons))
+    max_h    = horizons[-1]
+    hist_len = len(ns_arr)
+    if hist_len - max_h - HISTORY_LEN < 20:
+        return None
+
+    # Window i covers [i - HISTORY_LEN, i) for i in HISTORY_LEN .. end - max_h - 1;
+    # its targets are the counts i + h ticks later, one column per horizon.
+    end = hist_len - max_h
+    X   = MLPredictor._build_feature_matrix(
+        ns_arr[:end - 1], ew_arr[:end - 1],
+        qns_arr[:end - 1], qew_arr[:end - 1],
+        tk_arr[HISTORY_LEN:end],
+    )
+    targets = {
+        "ns": np.column_stack([ns_arr[HISTORY_LEN + h:end + h] for h in horizons]),
+        "ew": np.column_stack([ew_arr[HISTORY_LEN + h:end + h] for h in horizons]),
+    }
+
+    bundle = {"schema": BUNDLE_SCHEMA, "n_features": MLPredictor.N_FEATURES,
+              "horizons": horizons, "interval_k": {}, "samples": len(X),
+              "version": time.strftime("%Y%m%d_%H%M%S")}
+    for axis, y in targets.items():
+        scaler = StandardScaler().fit(X)
+        model  = RandomForestRegressor(
+            n_estimators=40, max_depth=6, random_state=42, n_jobs=-1, oob_score=True
+        )
+        model.fit(scaler.transform(X), y)
+        per_tree = _tree_predictions(_compile_forest(model, scaler), X)
+        bundle[f"scaler_{axis}"]   = scaler
+        bundle[f"model_{axis}"]    = model
+        bundle["interval_k"][axis] = _conformal_scale(model, per_tree, y)
+    return bundle
+
+
+def prepare_bundle(bundle) -> dict:
+    """
+    Validate a bundle against this predictor's schema and compile its
+    forests for the vectorised tree walk.  This is the expensive half of a
+    model swap, so ModelWatcher runs it off the simulation thread.
+    Raises ValueError when the bundle does not fit.
+    """
+    if not isinstance(bundle, dict) or bundle.get("schema") != BUNDLE_SCHEMA:
+        raise ValueError(f"not a {BUNDLE_SCHEMA} bundle")
+    if bundle.get("n_features") != MLPredictor.N_FEATURES:
+        raise ValueError(f"expects {bundle.get('n_features')} features, "
+                         f"predictor builds {MLPredictor.N_FEATURES}")
+    horizons = tuple(bundle.get("horizons", ()))
+    if PRED_HORIZON not in horizons:
+        raise ValueError(f"horizons {horizons} do not include PRED_HORIZON={PRED_HORIZON}")
+
+    forest = {}
+    for axis in ("ns", "ew"):
+        model = bundle.get(f"model_{axis}")
+        if getattr(model, "n_features_in_", None) != MLPredictor.N_FEATURES:
+            raise ValueError(f"model_{axis} was fitted on a different feature set")
+        if getattr(model, "n_outputs_", None) != len(horizons):
+            raise ValueError(f"model_{axis} has {getattr(model, 'n_outputs_', '?')} outputs, "
+                             f"bundle lists {len(horizons)} horizons")
+        if np.shape(bundle["interval_k"][axis]) != (len(horizons),):
+            raise ValueError(f"interval_k[{axis!r}] does not match horizons")
+        forest[axis] = _compile_forest(model, bundle[f"scaler_{axis}"])
+        probe = _tree_predictions(forest[axis], np.zeros((1, MLPredictor.N_FEATURES)))
+        if not np.all(np.isfinite(probe)):
+            raise ValueError(f"model_{axis} produces non-finite predictions")
+
+    return {**bundle, "horizons": horizons, "forest": forest}
+
 
 class MLPredictor:
     """
@@ -36,24 +217,40 @@ class MLPredictor:
     """
 
     FEATURE_DIM = 6    # features per time-step
+    N_FEATURES  = 12   # length of the aggregated feature vector
 
     def __init__(self):
-        self.history_ns    = deque(maxlen=HISTORY_LEN + PRED_HORIZON + 10)
-        self.history_ew    = deque(maxlen=HISTORY_LEN + PRED_HORIZON + 10)
-        self.history_qns   = deque(maxlen=HISTORY_LEN + PRED_HORIZON + 10)
-        self.history_qew   = deque(maxlen=HISTORY_LEN + PRED_HORIZON + 10)
-        self.tick_log      = deque(maxlen=HISTORY_LEN + PRED_HORIZON + 10)
+        # Forecast trajectory; PRED_HORIZON is always one of the outputs
+        self.horizons      = tuple(sorted(set(PRED_HORIZONS) | {PRED_HORIZON}))
+        self._main_col     = self.horizons.index(PRED_HORIZON)
+
+        buffer_len         = HISTORY_LEN + self.horizons[-1] + TRAIN_SAMPLES
+        self.history_ns    = deque(maxlen=buffer_len)
+        self.history_ew    = deque(maxlen=buffer_len)
+        self.history_qns   = deque(maxlen=buffer_len)
+        self.history_qew   = deque(maxlen=buffer_len)
+        self.tick_log      = deque(maxlen=buffer_len)
 
         self.trained       = False
         self.train_counter = 0
         self.retrain_every = 60    # retrain model every N ticks
+        self.online_training = True
+        self.model_version = "warmup"
 
         self.scaler_ns     = None
         self.scaler_ew     = None
         self.model_ns      = None
         self.model_ew      = None
+        self._forest       = {}    # axis → compiled node arrays
+        self._interval_k   = {}    # axis → conformal scale per horizon
+        self._bundle       = None  # picklable form of the installed model
+        self._training     = None  # background retrain thread, if one is running
+        self._trained_next = None  # its prepared bundle, installed between ticks
+        self._train_lock   = threading.Lock()
 
         self.last_pred     = {"predicted_ns": 5.0, "predicted_ew": 5.0,
+                               "lower_ns": 0.0, "upper_ns": 10.0,
+                               "lower_ew": 0.0, "upper_ew": 10.0,
                                "confidence": 0.0,   "model_type": "warmup"}
 
         # Warm-up synthetic data so model is usable from tick 1
@@ -64,6 +261,7 @@ class MLPredictor:
     def record(self, tick: int, ns_count: int, ew_count: int,
                ns_queue: int, ew_queue: int):
         """Call every simulation tick to log traffic state."""
+        self._install_trained()
         self.history_ns.append(ns_count)
         self.history_ew.append(ew_count)
         self.history_qns.append(ns_queue)
@@ -73,12 +271,15 @@ class MLPredictor:
         self.train_counter += 1
         if self.train_counter >= self.retrain_every:
             self.train_counter = 0
-            self._retrain()
+            self._retrain(background=True)
 
     # ── Prediction ────────────────────────────────────────────────────────────
 
     def predict(self, tick: int) -> dict:
-        """Return predicted NS and EW density PRED_HORIZON ticks ahead."""
+        """
+        Return predicted NS and EW density PRED_HORIZON ticks ahead, with a
+        PRED_INTERVAL prediction interval (lower_ns/upper_ns, lower_ew/upper_ew).
+        """
         if not self.trained or not ML_AVAILABLE:
             return self._heuristic_predict()
 
@@ -87,88 +288,218 @@ class MLPredictor:
             return self._heuristic_predict()
 
         try:
-            X = np.array(feat).reshape(1, -1)
-            X_ns = self.scaler_ns.transform(X)
-            X_ew = self.scaler_ew.transform(X)
-            pred_ns = float(self.model_ns.predict(X_ns)[0])
-            pred_ew = float(self.model_ew.predict(X_ew)[0])
-            pred_ns = max(0.0, pred_ns)
-            pred_ew = max(0.0, pred_ew)
-            self.last_pred = {
-                "predicted_ns": pred_ns,
-                "predicted_ew": pred_ew,
-                "confidence":   0.85,
-                "model_type":   "RandomForest",
-            }
+            out = self._forest_predict(np.array(feat).reshape(1, -1))
+            col = self._main_col
+            pred = {"model_type": "RandomForest", "interval": PRED_INTERVAL}
+            for axis in ("ns", "ew"):
+                mean, lower, upper = (float(a[0, col]) for a in out[axis])
+                pred[f"predicted_{axis}"] = mean
+                pred[f"lower_{axis}"]     = lower
+                pred[f"upper_{axis}"]     = upper
+            pred["confidence"] = (
+                _confidence(pred["predicted_ns"], pred["lower_ns"], pred["upper_ns"])
+                + _confidence(pred["predicted_ew"], pred["lower_ew"], pred["upper_ew"])
+            ) / 2
+            self.last_pred = pred
         except Exception:
             return self._heuristic_predict()
 
         return self.last_pred
 
+    def predict_horizons(self, tick: int) -> dict:
+        """
+        Return the full forecast trajectory for self.horizons from one
+        model evaluation:
+          {"horizons": (5, 15, ...), "predicted_ns": [...], "predicted_ew": [...],
+           "lower_ns": [...], "upper_ns": [...], ..., "model_type": str}
+        """
+        feat = self._extract_latest_features(tick)
+        if feat is None:
+            base = self._heuristic_predict()
+            n    = len(self.horizons)
+            traj = {"horizons": self.horizons, "model_type": base["model_type"]}
+            for key in ("predicted_ns", "predicted_ew",
+                        "lower_ns", "upper_ns", "lower_ew", "upper_ew"):
+                traj[key] = [base[key]] * n
+            return traj
+        out  = self.predict_batch(np.array(feat).reshape(1, -1))
+        traj = {"horizons": self.horizons, "model_type": out["model_type"]}
+        for key, val in out.items():
+            if isinstance(val, np.ndarray):
+                traj[key] = val[0].tolist()
+        return traj
+
+    def predict_batch(self, features) -> dict:
+        """
+        Forecast many feature rows at once — e.g. every window in
+        feature_matrix(), or the stacked latest features of several
+        intersections.  Returns (n_rows, len(horizons)) arrays:
+          {"horizons": ..., "predicted_ns": ndarray, "predicted_ew": ndarray,
+           "lower_ns": ndarray, "upper_ns": ndarray, ..., "model_type": str}
+        Without a trained forest, each row's window mean is carried flat
+        across all horizons, ± z·std of the window.
+        """
+        X = np.asarray(features, dtype=float).reshape(-1, self.N_FEATURES)
+        if self.trained and ML_AVAILABLE:
+            try:
+                out   = self._forest_predict(X)
+                batch = {"horizons": self.horizons, "model_type": "RandomForest"}
+                for axis in ("ns", "ew"):
+                    (batch[f"predicted_{axis}"], batch[f"lower_{axis}"],
+                     batch[f"upper_{axis}"]) = out[axis]
+                return batch
+            except Exception:
+                pass
+        n     = len(self.horizons)
+        z     = NormalDist().inv_cdf((1 + PRED_INTERVAL) / 2)
+        batch = {"horizons": self.horizons, "model_type": "heuristic"}
+        for axis, mean_col, std_col in (("ns", 0, 4), ("ew", 1, 5)):
+            mean = np.repeat(X[:, mean_col:mean_col + 1], n, axis=1)
+            half = np.repeat(z * X[:, std_col:std_col + 1], n, axis=1)
+            batch[f"predicted_{axis}"] = mean
+            batch[f"lower_{axis}"]     = np.maximum(mean - half, 0.0)
+            batch[f"upper_{axis}"]     = mean + half
+        return batch
+
+    def feature_matrix(self) -> np.ndarray:
+        """
+        Feature rows for every historical timestamp in the buffer: row j
+        summarises the HISTORY_LEN ticks preceding tick_log[HISTORY_LEN + j].
+        """
+        if len(self.history_ns) < HISTORY_LEN + 1:
+            return np.empty((0, self.N_FEATURES))
+        return self._build_feature_matrix(
+            np.fromiter(self.history_ns, float)[:-1],
+            np.fromiter(self.history_ew, float)[:-1],
+            np.fromiter(self.history_qns, float)[:-1],
+            np.fromiter(self.history_qew, float)[:-1],
+            np.fromiter(self.tick_log, float)[HISTORY_LEN:],
+        )
+
+    def _forest_predict(self, X: np.ndarray) -> dict:
+        """
+        One vectorised pass over both compiled forests.
+        Returns {"ns": (mean, lower, upper), "ew": (...)}, each (n, H), clipped at 0.
+        """
+        out = {}
+        for axis in ("ns", "ew"):
+            per_tree = _tree_predictions(self._forest[axis], X)
+            mean     = per_tree.mean(axis=0)
+            half     = self._interval_k[axis] * (per_tree.std(axis=0) + SPREAD_FLOOR)
+            out[axis] = (np.maximum(mean, 0.0),
+                         np.maximum(mean - half, 0.0),
+                         np.maximum(mean + half, 0.0))
+        return out
+
     def _heuristic_predict(self) -> dict:
-        """Fallback: use recent average with light trend."""
+        """Fallback: recent average, with a normal interval from its spread."""
         if len(self.history_ns) < 5:
             return {"predicted_ns": 5.0, "predicted_ew": 5.0,
+                    "lower_ns": 0.0, "upper_ns": 10.0,
+                    "lower_ew": 0.0, "upper_ew": 10.0,
                     "confidence": 0.0, "model_type": "heuristic"}
-        recent_ns = list(self.history_ns)[-20:]
-        recent_ew = list(self.history_ew)[-20:]
-        pred_ns   = sum(recent_ns) / len(recent_ns)
-        pred_ew   = sum(recent_ew) / len(recent_ew)
-        return {"predicted_ns": pred_ns, "predicted_ew": pred_ew,
-                "confidence": 0.4, "model_type": "heuristic"}
+        z    = NormalDist().inv_cdf((1 + PRED_INTERVAL) / 2)
+        pred = {"model_type": "heuristic", "interval": PRED_INTERVAL}
+        for axis, hist in (("ns", self.history_ns), ("ew", self.history_ew)):
+            recent = np.fromiter(hist, float)[-20:]
+            mean   = float(recent.mean())
+            # predictive spread of one new draw around a sample mean
+            half   = z * float(recent.std()) * math.sqrt(1 + 1 / len(recent))
+            pred[f"predicted_{axis}"] = mean
+            pred[f"lower_{axis}"]     = max(0.0, mean - half)
+            pred[f"upper_{axis}"]     = mean + half
+        pred["confidence"] = (
+            _confidence(pred["predicted_ns"], pred["lower_ns"], pred["upper_ns"])
+            + _confidence(pred["predicted_ew"], pred["lower_ew"], pred["upper_ew"])
+        ) / 2
+        return pred
 
     # ── Training ──────────────────────────────────────────────────────────────
 
-    def _retrain(self):
-        if not ML_AVAILABLE:
+    def _retrain(self, background: bool = False):
+        """
+        Fit a new bundle on the current history.  Online retrains run on a
+        background thread (a fit takes ~150 ms, several frames); the result
+        is installed by the next record() call, between ticks.  A retrain
+        due while one is still running is skipped.
+        """
+        if not ML_AVAILABLE or not self.online_training:
             return
-        if len(self.history_ns) < HISTORY_LEN + PRED_HORIZON:
+        series = [np.fromiter(v, float) for v in (self.history_ns, self.history_ew,
+                                                  self.history_qns, self.history_qew, self.tick_log)]
+        if not background:
+            prepared = self._fit(series, self.horizons)
+            if prepared is not None:
+                self.install(prepared)
             return
-
-        X_list, y_ns, y_ew = [], [], []
-        hist_len = len(self.history_ns)
-        ns_arr   = list(self.history_ns)
-        ew_arr   = list(self.history_ew)
-        qns_arr  = list(self.history_qns)
-        qew_arr  = list(self.history_qew)
-        tk_arr   = list(self.tick_log)
-
-        for i in range(HISTORY_LEN, hist_len - PRED_HORIZON):
-            feat = self._build_features(
-                ns_arr[i - HISTORY_LEN:i],
-                ew_arr[i - HISTORY_LEN:i],
-                qns_arr[i - HISTORY_LEN:i],
-                qew_arr[i - HISTORY_LEN:i],
-                tk_arr[i],
-            )
-            X_list.append(feat)
-            y_ns.append(ns_arr[i + PRED_HORIZON])
-            y_ew.append(ew_arr[i + PRED_HORIZON])
-
-        if len(X_list) < 20:
+        if self._training is not None and self._training.is_alive():
             return
+        self._training = threading.Thread(target=self._fit_in_background, args=(series, self.horizons),
+                                          name="predictor-retrain", daemon=True)
+        self._training.start()
 
-        X  = np.array(X_list)
-        yn = np.array(y_ns)
-        ye = np.array(y_ew)
-
+    @staticmethod
+    def _fit(series: list, horizons: tuple) -> dict | None:
         try:
-            self.scaler_ns = StandardScaler().fit(X)
-            self.scaler_ew = StandardScaler().fit(X)
-            Xn = self.scaler_ns.transform(X)
-            Xe = self.scaler_ew.transform(X)
-
-            self.model_ns = RandomForestRegressor(
-                n_estimators=40, max_depth=6, random_state=42, n_jobs=-1
-            )
-            self.model_ew = RandomForestRegressor(
-                n_estimators=40, max_depth=6, random_state=42, n_jobs=-1
-            )
-            self.model_ns.fit(Xn, yn)
-            self.model_ew.fit(Xe, ye)
-            self.trained = True
+            bundle = fit_bundle(*series, horizons)
+            return prepare_bundle(bundle) if bundle is not None else None
         except Exception as exc:
             print(f"[ML] Training failed: {exc}")
+            return None
+
+    def _fit_in_background(self, series: list, horizons: tuple):
+        prepared = self._fit(series, horizons)
+        if prepared is not None:
+            with self._train_lock:
+                self._trained_next = prepared
+
+    def _install_trained(self):
+        if self._trained_next is None:
+            return
+        with self._train_lock:
+            prepared, self._trained_next = self._trained_next, None
+        if prepared is not None and self.online_training:   # a loaded model takes precedence
+            self.install(prepared)
+
+    def wait_for_training(self, timeout: float | None = None):
+        """Block until a background retrain finishes and install its model (tests, scripts)."""
+        if self._training is not None:
+            self._training.join(timeout)
+        self._install_trained()
+
+    # ── Model bundles ─────────────────────────────────────────────────────────
+
+    def install(self, prepared: dict, external: bool = False):
+        """
+        Swap in a bundle returned by prepare_bundle().  Only attribute
+        assignments happen here, so it is safe to call between ticks.
+        External bundles (hot-reloaded or tuned offline) pause online
+        retraining so they are not overwritten a second later.
+        """
+        self.horizons      = tuple(prepared["horizons"])
+        self._main_col     = self.horizons.index(PRED_HORIZON)
+        self.scaler_ns     = prepared["scaler_ns"]
+        self.scaler_ew     = prepared["scaler_ew"]
+        self.model_ns      = prepared["model_ns"]
+        self.model_ew      = prepared["model_ew"]
+        self._interval_k   = prepared["interval_k"]
+        self._forest       = prepared["forest"]
+        self.model_version = prepared["version"]
+        self._bundle       = {k: v for k, v in prepared.items() if k != "forest"}
+        self.trained       = True
+        if external:
+            self.online_training = False
+
+    def save(self, path: str):
+        """Persist the current model as a bundle that ModelWatcher/install() accept."""
+        if self._bundle is None:
+            raise RuntimeError("no trained model to save")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Write-then-rename so a watcher never unpickles a half-written file
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self._bundle, f)
+        os.replace(tmp, path)
 
     def _build_features(self, ns_win, ew_win, qns_win, qew_win, tick) -> list:
         """Aggregate a HISTORY_LEN window into a fixed feature vector."""
@@ -192,6 +523,32 @@ class MLPredictor:
         ]
         return features
 
+    @staticmethod
+    def _build_feature_matrix(ns, ew, qns, qew, ticks) -> np.ndarray:
+        """
+        Vectorised _build_features over every HISTORY_LEN window of the
+        given series; row j summarises series[j:j + HISTORY_LEN] at ticks[j].
+        """
+        ns_w  = sliding_window_view(ns,  HISTORY_LEN)
+        ew_w  = sliding_window_view(ew,  HISTORY_LEN)
+        qns_w = sliding_window_view(qns, HISTORY_LEN)
+        qew_w = sliding_window_view(qew, HISTORY_LEN)
+        day_cycle = (np.asarray(ticks, dtype=float) / (FPS * 600)) * 2 * math.pi
+        return np.column_stack([
+            ns_w.mean(axis=1),
+            ew_w.mean(axis=1),
+            ns_w.max(axis=1),
+            ew_w.max(axis=1),
+            ns_w.std(axis=1),
+            ew_w.std(axis=1),
+            qns_w.mean(axis=1),
+            qew_w.mean(axis=1),
+            np.sin(day_cycle),
+            np.cos(day_cycle),
+            ns_w[:, -1],
+            ew_w[:, -1],
+        ])
+
     def _extract_latest_features(self, tick) -> list | None:
         if len(self.history_ns) < HISTORY_LEN:
             return None
@@ -209,7 +566,7 @@ class MLPredictor:
         Simulates a 10-min day with morning and evening rush peaks.
         """
         ticks_per_minute = FPS * 60
-        total_ticks      = HISTORY_LEN + PRED_HORIZON + 200
+        total_ticks      = self.history_ns.maxlen
 
         for t in range(total_ticks):
             day_frac = (t % (ticks_per_minute * 10)) / (ticks_per_minute * 10)
@@ -241,4 +598,6 @@ class MLPredictor:
     def get_model_info(self) -> str:
         if not self.trained:
             return "Warming up…"
+        if not self.online_training:
+            return f"RF · v{self.model_version} (loaded)"
         return f"RF · {len(self.history_ns)} samples"
@@ -0,0 +1,122 @@
+"""
+simulation/model_watcher.py — Hot reload of predictor models
+
+Watches models/ for new or updated MLPredictor bundles (written by
+MLPredictor.save() or `python ai/traffic_predictor.py --live`), loads and
+validates them on a background thread, and hands the prepared model to
+the simulation loop, which swaps it in between ticks.
+
+The expensive work (unpickling, schema checks, compiling the forests)
+never runs on the simulation thread; apply() is a handful of attribute
+assignments, so a reload costs no frame time.
+
+Usage:
+    from simulation.model_watcher import ModelWatcher
+    watcher = ModelWatcher()
+    watcher.start()
+    ...
+    watcher.apply(intersection.predictor, logger, tick)   # once per frame
+    ...
+    watcher.stop()
+"""
+
+import os
+import glob
+import pickle
+import threading
+
+from simulation.ml_predictor import prepare_bundle
+
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+
+class ModelWatcher:
+    """Background poller that prepares new model bundles for a live swap."""
+
+    POLL_INTERVAL = 2.0   # seconds between directory scans
+
+    def __init__(self, model_dir: str = MODEL_DIR, pattern: str = "ml_predictor*.pkl",
+                 load_existing: bool = False):
+        self.model_dir = model_dir
+        self.pattern   = pattern
+        self._seen: dict[str, float] = {}
+        self._lock     = threading.Lock()
+        self._ready    = None            # (path, prepared bundle) awaiting apply()
+        self._rejected: list[tuple[str, str]] = []
+        self._stop     = threading.Event()
+        self._thread   = None
+
+        if not load_existing:
+            # Artifacts already on disk at start-up are not "new"
+            for path in self._candidates():
+                self._seen[path] = os.path.getmtime(path)
+
+    # ── Background side ───────────────────────────────────────────────────────
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.POLL_INTERVAL + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.scan()
+            self._stop.wait(self.POLL_INTERVAL)
+
+    def _candidates(self) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.model_dir, self.pattern)))
+
+    def scan(self):
+        """Check the directory once; load and validate anything new."""
+        for path in self._candidates():
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue                  # removed between glob and stat
+            if self._seen.get(path) == mtime:
+                continue
+            self._seen[path] = mtime
+            try:
+                with open(path, "rb") as f:
+                    prepared = prepare_bundle(pickle.load(f))
+            except Exception as exc:
+                with self._lock:
+                    self._rejected.append((path, str(exc)))
+                continue
+            with self._lock:
+                self._ready = (path, prepared)   # newest wins if several land at once
+
+    # ── Simulation side ───────────────────────────────────────────────────────
+
+    def apply(self, predictor, logger=None, tick: int = 0) -> bool:
+        """
+        Call between ticks.  Installs the newest validated bundle, if any,
+        and logs the change.  Returns True when a model was swapped.
+        """
+        if self._ready is None and not self._rejected:
+            return False
+        with self._lock:
+            ready, self._ready       = self._ready, None
+            rejected, self._rejected = self._rejected, []
+
+        if logger is not None:
+            for path, reason in rejected:
+                logger.event("model_rejected", tick=tick,
+                             source=os.path.basename(path), reason=reason)
+        if ready is None:
+            return False
+
+        path, prepared = ready
+        previous = predictor.model_version
+        predictor.install(prepared, external=True)
+        if logger is not None:
+            logger.event("model_reload", tick=tick,
+                         source=os.path.basename(path),
+                         old_version=previous,
+                         new_version=predictor.model_version)
+        return True
@@ -4,19 +4,177 @@ simulation/stats.py — In-memory stats collector + CSV/JSON exporter
 Collects fine-grained per-tick metrics during a simulation run and
 exports them to CSV or JSON for offline analysis / model training.
 
+Storage is a preallocated NumPy ring with one typed field per metric
+(COLUMNS).  record() writes one row tuple into a fixed slot, so it takes
+constant time and builds no per-tick dict, and there is no list to
+shift.  Once MAX_RECORDS ticks are held, each new tick overwrites the
+oldest.  String metrics (signal_state, mode) are stored as small
+integer codes into a per-column label list.
+
+The ring is twice the capacity long, and each row is written at i and
+at i + capacity.  Any run of up to capacity consecutive ticks is then
+one contiguous slice, so last_n() returns column views with no copying,
+even after the ring has wrapped.
+
+Long runs: with spill="data/run.csv", every `chunk` ticks the finished
+chunk of rows is handed to a background StatsSpill thread.  The thread
+appends it to disk while the simulation keeps running, so memory stays
+at the ring size and the file holds the whole run.  close() hands over
+only the last partial chunk, so shutdown export takes milliseconds.  A
+.csv path gets the export_csv format.  Any other path gets raw rows in
+COLUMNS layout, plus a <path>.json header with the dtype and labels
+(read_spill() loads it).  The header is written when the spill opens and
+atomically rewritten before any chunk that uses new labels, and the row
+count comes from the file size, so the file of a killed run still reads
+back up to its last written chunk.  Full-run summary totals are accumulated as
+chunks are handed off.
+
 Usage:
     from simulation.stats import StatsCollector
     stats = StatsCollector()
     stats.record(tick, intersection, ml_pred)
     stats.export_csv("data/run_001.csv")
     stats.summary()
+    recent = stats.last_n(600)           # {column: read-only array view}
+
+    stats = StatsCollector(spill="data/run_001.csv")   # streams the full run
+    ...
+    stats.close()
 """
 
 import csv
 import json
 import os
-import math
-from collections import deque
+import queue
+import threading
+
+import numpy as np
+
+from simulation.binlog import _atomic_json, _map
+
+# Column order is the CSV header order
+COLUMNS = [
+    ("tick",              np.int64),
+    ("time_s",            np.float64),
+    ("ns_count",          np.int32),
+    ("ew_count",          np.int32),
+    ("total_vehicles",    np.int32),
+    ("ns_queue",          np.int32),
+    ("ew_queue",          np.int32),
+    ("avg_wait_s",        np.float64),
+    ("total_passed",      np.int64),
+    ("total_spawned",     np.int64),
+    ("emergency_events",  np.int32),
+    ("emergency_active",  np.int8),
+    ("phase",             np.int8),
+    ("signal_state",      np.int16),    # code into labels["signal_state"]
+    ("green_remaining_s", np.float64),
+    ("adaptive_green_s",  np.float64),
+    ("mode",              np.int16),    # code into labels["mode"]
+    ("pred_ns",           np.float64),
+    ("pred_ew",           np.float64),
+    ("ml_confidence",     np.float64),
+]
+CATEGORICAL = ("signal_state", "mode")
+SPILL_CHUNK = 3_600     # ticks per background write (1 minute at 60 fps)
+
+
+def _decode(rows: np.ndarray, labels: dict[str, list[str]]) -> dict[str, np.ndarray]:
+    """Structured rows → {column: array}, category codes replaced by labels."""
+    out = {name: rows[name] for name in rows.dtype.names}
+    for name in CATEGORICAL:
+        out[name] = np.asarray(labels[name], dtype=object)[rows[name]]
+    return out
+
+
+def _write_csv_rows(writer, rows: np.ndarray, labels: dict[str, list[str]]):
+    data = _decode(rows, labels)
+    writer.writerows(zip(*(v.tolist() for v in data.values())))
+
+
+def _partial(rows: np.ndarray) -> dict:
+    """Summary aggregates of a block of rows; blocks combine with _combine()."""
+    waits = rows["avg_wait_s"][rows["avg_wait_s"] > 0]
+    return {
+        "n":          len(rows),
+        "wait_sum":   float(waits.sum()),
+        "wait_n":     len(waits),
+        "wait_max":   float(waits.max()) if len(waits) else 0,
+        "ns_sum":     int(rows["ns_count"].sum()),
+        "ew_sum":     int(rows["ew_count"].sum()),
+        "total_sum":  int(rows["total_vehicles"].sum()),
+        "total_max":  int(rows["total_vehicles"].max()) if len(rows) else 0,
+    }
+
+
+def _combine(a: dict, b: dict) -> dict:
+    return {k: max(a[k], b[k]) if k.endswith("_max") else a[k] + b[k] for k in a}
+
+
+class StatsSpill(threading.Thread):
+    """Background writer that appends chunks of stats rows to one file."""
+
+    def __init__(self, path: str, labels: dict[str, list[str]]):
+        super().__init__(name="stats-spill", daemon=True)
+        self.path   = path
+        self.labels = labels            # the collector's, append-only
+        self.binary = not path.lower().endswith(".csv")
+        self.rows   = 0                 # rows on disk
+        self.error: Exception | None = None
+        self._queue: queue.Queue = queue.Queue()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "wb" if self.binary else "w", newline="" if not self.binary else None)
+        if not self.binary:
+            self._csv = csv.writer(self._file)
+            self._csv.writerow([name for name, _ in COLUMNS])
+        self._saved: dict[str, int] = {}          # label counts in the header on disk
+        if self.binary:
+            self._save_header()
+        self.start()
+
+    def _save_header(self):
+        labels = {k: list(v) for k, v in self.labels.items()}
+        _atomic_json(self.path + ".json",
+                     {"dtype": np.lib.format.dtype_to_descr(np.dtype(COLUMNS)), "labels": labels})
+        self._saved = {k: len(v) for k, v in labels.items()}
+
+    def put(self, rows: np.ndarray):
+        self._queue.put(rows)
+
+    def run(self):
+        while True:
+            rows = self._queue.get()
+            if rows is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                if self.binary:
+                    # Labels first: rows on disk never hold codes the header lacks
+                    if any(len(v) != self._saved[k] for k, v in self.labels.items()):
+                        self._save_header()
+                    rows.tofile(self._file)
+                else:
+                    _write_csv_rows(self._csv, rows, self.labels)
+                self._file.flush()
+                self.rows += len(rows)
+            except OSError as e:                  # keep the simulation running
+                self.error = e
+
+    def close(self):
+        self._queue.put(None)
+        self.join()
+        self._file.close()
+        if self.error is not None:
+            print(f"[Stats] Spill to {self.path} failed: {self.error}")
+
+
+def read_spill(path: str) -> dict[str, np.ndarray]:
+    """Load a binary spill file (memory-mapped) as decoded columns; works mid-run too."""
+    with open(path + ".json") as f:
+        header = json.load(f)
+    rows = _map(path, np.lib.format.descr_to_dtype(header["dtype"]))
+    return _decode(rows, header["labels"])
 
 
 class StatsCollector:
@@ -24,59 +182,95 @@ class StatsCollector:
 
     MAX_RECORDS = 18_000   # 5 minutes at 60 fps — beyond this, rotate
 
-    def __init__(self):
-        self.records:  list[dict] = []
-        self._tick_map: dict[int, dict] = {}
+    def __init__(self, capacity: int | None = None, spill: str | None = None,
+                 chunk: int = SPILL_CHUNK):
+        self.capacity = capacity or self.MAX_RECORDS
+        self._ring    = np.zeros(2 * self.capacity, dtype=COLUMNS)
+        self.labels: dict[str, list[str]]      = {c: [] for c in CATEGORICAL}
+        self._codes: dict[str, dict[str, int]] = {c: {} for c in CATEGORICAL}
+        self._n = 0                             # ticks recorded in total
+
+        # Spill: ticks [0, _spilled) have been handed to the writer thread
+        self.chunk    = min(chunk, self.capacity)
+        self.sink     = StatsSpill(spill, self.labels) if spill else None
+        self._spilled = 0
+        self._totals  = _partial(self._ring[:0])
 
     # ── Recording ─────────────────────────────────────────────────────────────
 
+    def _code(self, column: str, value: str) -> int:
+        code = self._codes[column].get(value)
+        if code is None:
+            code = self._codes[column][value] = len(self.labels[column])
+            self.labels[column].append(value)
+        return code
+
     def record(self, tick: int, intersection, ml_pred: dict):
         """Call every simulation tick."""
         ctrl   = intersection.controller
         dens   = intersection.current_density()
         queues = intersection.queue_lengths()
 
-        row = {
-            "tick":              tick,
-            "time_s":            tick / 60,
-            "ns_count":          dens["ns"],
-            "ew_count":          dens["ew"],
-            "total_vehicles":    dens["total"],
-            "ns_queue":          queues["ns"],
-            "ew_queue":          queues["ew"],
-            "avg_wait_s":        round(intersection.avg_wait(), 3),
-            "total_passed":      intersection.total_vehicles_passed,
-            "total_spawned":     intersection.total_vehicles_spawned,
-            "emergency_events":  intersection.emergency_events,
-            "emergency_active":  int(ctrl.emergency_active),
-            "phase":             ctrl.phase,
-            "signal_state":      ctrl.state,
-            "green_remaining_s": round(ctrl.seconds_remaining(), 2),
-            "adaptive_green_s":  round(ctrl.green_duration / 60, 2),
-            "mode":              intersection.mode,
-            "pred_ns":           round(ml_pred.get("predicted_ns", 0), 3),
-            "pred_ew":           round(ml_pred.get("predicted_ew", 0), 3),
-            "ml_confidence":     round(ml_pred.get("confidence", 0), 3),
-        }
+        row = (
+            tick,
+            tick / 60,
+            dens["ns"],
+            dens["ew"],
+            dens["total"],
+            queues["ns"],
+            queues["ew"],
+            round(intersection.avg_wait(), 3),
+            intersection.total_vehicles_passed,
+            intersection.total_vehicles_spawned,
+            intersection.emergency_events,
+            int(ctrl.emergency_active),
+            ctrl.phase,
+            self._code("signal_state", ctrl.state),
+            round(ctrl.seconds_remaining(), 2),
+            round(ctrl.green_duration / 60, 2),
+            self._code("mode", intersection.mode),
+            round(ml_pred.get("predicted_ns", 0), 3),
+            round(ml_pred.get("predicted_ew", 0), 3),
+            round(ml_pred.get("confidence", 0), 3),
+        )                                       # in COLUMNS order
+        i = self._n % self.capacity
+        self._ring[i] = self._ring[i + self.capacity] = row
+        self._n += 1
+        if self.sink is not None and self._n - self._spilled >= self.chunk:
+            self._spill(self.chunk)
 
-        self.records.append(row)
-        if len(self.records) > self.MAX_RECORDS:
-            self.records.pop(0)
+    def _spill(self, n: int):
+        """Hand the oldest n unspilled ticks to the writer thread (a copy: the ring moves on)."""
+        start = self._spilled % self.capacity
+        rows  = self._ring[start:start + n].copy()
+        self._totals   = _combine(self._totals, _partial(rows))
+        self._spilled += n
+        self.sink.put(rows)
+
+    def close(self):
+        """Flush the partial last chunk and finish the spill file (no-op without spill)."""
+        if self.sink is None:
+            return
+        if self._n > self._spilled:
+            self._spill(self._n - self._spilled)
+        self.sink.close()
+        print(f"[Stats] Spilled {self.sink.rows} records → {self.sink.path}")
+        self.sink = None
 
     # ── Export ────────────────────────────────────────────────────────────────
 
     def export_csv(self, path: str):
-        """Write all collected records to a CSV file."""
-        if not self.records:
+        """Write the records held in memory (the last `capacity` ticks) to a CSV file."""
+        if not len(self):
             print("[Stats] No records to export.")
             return
 
         os.makedirs(os.path.dirname(path) if os.path.dirname(path) else ".", exist_ok=True)
         with open(path, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=self.records[0].keys())
-            writer.writeheader()
-            writer.writerows(self.records)
-        print(f"[Stats] Exported {len(self.records)} records → {path}")
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in COLUMNS])
+            _write_csv_rows(writer, self._rows(len(self)), self.labels)
+        print(f"[Stats] Exported {len(self)} records → {path}")
 
     def export_json(self, path: str):
         """Write summary statistics to JSON."""
@@ -89,29 +283,29 @@ class StatsCollector:
     # ── Summary ───────────────────────────────────────────────────────────────
 
     def _compute_summary(self) -> dict:
-        if not self.records:
+        """Over the whole run when spilling (or after close), else over the ring."""
+        if not len(self):
             return {}
 
-        waits    = [r["avg_wait_s"]   for r in self.records if r["avg_wait_s"] > 0]
-        ns_vals  = [r["ns_count"]     for r in self.records]
-        ew_vals  = [r["ew_count"]     for r in self.records]
-        total    = [r["total_vehicles"] for r in self.records]
-
-        def safe_avg(lst): return sum(lst) / len(lst) if lst else 0.0
-        def safe_max(lst): return max(lst) if lst else 0
+        last = self._rows(1)[0]
+        if self._spilled:
+            agg = _combine(self._totals, _partial(self._rows(self._n - self._spilled)))
+        else:
+            agg = _partial(self._rows(len(self)))
+        n = agg["n"]
 
         return {
-            "total_ticks":          len(self.records),
-            "simulation_time_s":    self.records[-1]["time_s"] if self.records else 0,
-            "total_vehicles_passed": self.records[-1]["total_passed"] if self.records else 0,
-            "total_spawned":        self.records[-1]["total_spawned"] if self.records else 0,
-            "emergency_events":     self.records[-1]["emergency_events"] if self.records else 0,
-            "avg_wait_s":           round(safe_avg(waits), 3),
-            "max_wait_s":           round(safe_max(waits), 3),
-            "avg_ns_density":       round(safe_avg(ns_vals), 2),
-            "avg_ew_density":       round(safe_avg(ew_vals), 2),
-            "peak_total_vehicles":  safe_max(total),
-            "avg_total_vehicles":   round(safe_avg(total), 2),
+            "total_ticks":          n,
+            "simulation_time_s":    float(last["time_s"]),
+            "total_vehicles_passed": int(last["total_passed"]),
+            "total_spawned":        int(last["total_spawned"]),
+            "emergency_events":     int(last["emergency_events"]),
+            "avg_wait_s":           round(agg["wait_sum"] / agg["wait_n"], 3) if agg["wait_n"] else 0.0,
+            "max_wait_s":           round(agg["wait_max"], 3),
+            "avg_ns_density":       round(agg["ns_sum"] / n, 2),
+            "avg_ew_density":       round(agg["ew_sum"] / n, 2),
+            "peak_total_vehicles":  agg["total_max"],
+            "avg_total_vehicles":   round(agg["total_sum"] / n, 2),
         }
 
     def summary(self):
@@ -129,8 +323,35 @@ class StatsCollector:
 
     # ── Accessors ─────────────────────────────────────────────────────────────
 
-    def last_n(self, n: int) -> list[dict]:
-        return self.records[-n:]
+    def _rows(self, n: int) -> np.ndarray:
+        """The newest min(n, len) rows as one contiguous read-only ring slice."""
+        n     = max(0, min(n, len(self)))
+        start = (self._n - n) % self.capacity
+        rows  = self._ring[start:start + n]
+        rows.flags.writeable = False
+        return rows
+
+    def last_n(self, n: int) -> dict[str, np.ndarray]:
+        """
+        The newest min(n, len) ticks, oldest first, as read-only views into
+        the ring (no copy).  signal_state / mode hold codes; see decoded().
+        """
+        rows = self._rows(n)
+        return {name: rows[name] for name in rows.dtype.names}
+
+    def decoded(self, data: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Copy of a last_n() result with category codes replaced by their labels."""
+        out = dict(data)
+        for name in CATEGORICAL:
+            out[name] = np.asarray(self.labels[name], dtype=object)[data[name]]
+        return out
+
+    @property
+    def records(self) -> list[dict]:
+        """All held ticks as row dicts (materialized on each access)."""
+        data = _decode(self._rows(len(self)), self.labels)
+        cols = {k: v.tolist() for k, v in data.items()}
+        return [dict(zip(cols, row)) for row in zip(*cols.values())]
 
     def __len__(self):
-        return len(self.records)
+        return min(self._n, self.capacity)
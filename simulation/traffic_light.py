@@ -12,7 +12,7 @@ import pygame
 import math
 from simulation.config import (
     C, FPS, MIN_GREEN, MAX_GREEN, DEFAULT_GREEN,
-    YELLOW_TIME, ALL_RED_TIME, CX, CY, ROAD_W
+    YELLOW_TIME, ALL_RED_TIME, CX, CY, ROAD_W, PLAN_ON_UPPER
 )
 
 STATE_GREEN   = "green"
@@ -107,6 +107,7 @@ class IntersectionController:
         self.green_duration  = DEFAULT_GREEN * FPS
         self.yellow_duration = YELLOW_TIME * FPS
         self.all_red_duration = ALL_RED_TIME * FPS
+        self.plan_on_upper   = PLAN_ON_UPPER  # plan against the upper prediction bound
 
         self.emergency_active     = False
         self.emergency_phase      = None     # which phase clears for emergency
@@ -174,6 +175,8 @@ class IntersectionController:
         """
         Use vehicle queue lengths and ML prediction to set next green duration.
         Longer queue in the incoming direction → more green time.
+        With plan_on_upper, the prediction interval's upper bound is used
+        instead of the point forecast (conservative sizing for peaks).
         """
         queue_ns = sum(1 for v in vehicles if v.active and not v.passed and
                        v.direction in ("N→S", "S→N") and v.stopped)
@@ -183,6 +186,9 @@ class IntersectionController:
         # Predicted density boost
         pred_ns = ml_pred.get("predicted_ns", 5.0)
         pred_ew = ml_pred.get("predicted_ew", 5.0)
+        if self.plan_on_upper:
+            pred_ns = ml_pred.get("upper_ns", pred_ns)
+            pred_ew = ml_pred.get("upper_ew", pred_ew)
 
         if self.phase == 0:     # about to go N-S green
             demand = queue_ns + pred_ns * 0.4
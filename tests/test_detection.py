@@ -0,0 +1,857 @@
+"""
+tests/test_detection.py — Detection pipeline tests (no model weights, no display)
+Run: pytest tests/ -v
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+cv2 = pytest.importorskip("cv2")
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in serving synthetic frames, optionally slowly."""
+
+    def __init__(self, n_frames: int, delay: float = 0.0, shape=(48, 64, 3),
+                 frame_ms: float = 40.0):
+        self.frames   = [np.full(shape, i % 256, dtype=np.uint8) for i in range(n_frames)]
+        self.delay    = delay
+        self.frame_ms = frame_ms
+        self.pos      = 0
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.pos * self.frame_ms
+        if prop == cv2.CAP_PROP_FPS:
+            return 1000.0 / self.frame_ms
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.frames))
+        return 0.0
+
+    def grab(self):
+        if self.pos >= len(self.frames):
+            return False
+        self.pos += 1
+        return True
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.pos = int(value)
+        return True
+
+    def read(self):
+        if self.pos >= len(self.frames):
+            return False, None
+        time.sleep(self.delay)
+        frame = self.frames[self.pos].copy()
+        self.pos += 1
+        return True, frame
+
+    def release(self):
+        self.released = True
+
+
+class FakeWriter:
+    def __init__(self, delay: float = 0.0):
+        self.written = []
+        self.delay   = delay
+
+    def write(self, frame):
+        time.sleep(self.delay)
+        self.written.append(int(frame[0, 0, 0]))
+
+
+# ── Staged pipeline ───────────────────────────────────────────────────────────
+
+def test_pipeline_keeps_frame_order():
+    from ai.video_pipeline import run_pipeline
+    seen = []
+    out  = FakeWriter()
+    timer, frames, _ = run_pipeline(
+        FakeCapture(30),
+        infer=lambda frame: int(frame[0, 0, 0]),
+        annotate=lambda frame, result: seen.append(result),
+        out=out, queue_size=2,
+    )
+    assert frames == 30
+    assert seen == list(range(30))
+    assert out.written == list(range(30))
+    assert {"decode", "infer", "annotate", "encode"} <= set(timer.summary())
+
+
+def test_pipeline_overlaps_stages():
+    from ai.video_pipeline import run_pipeline
+    delay = 0.01
+    n     = 30
+
+    def slow_infer(frame):
+        time.sleep(delay)
+        return None
+
+    _, frames, wall = run_pipeline(
+        FakeCapture(n, delay=delay), infer=slow_infer,
+        annotate=lambda frame, result: None, out=FakeWriter(delay=delay),
+    )
+    assert frames == n
+    # Serial execution would take ~3 × n × delay; overlapped stages ≈ n × delay
+    assert wall < 2 * n * delay
+
+
+class FailingCapture(FakeCapture):
+    def read(self):
+        if self.pos == 3:
+            raise RuntimeError("decoder died")
+        return super().read()
+
+
+def test_pipeline_surfaces_stage_errors_instead_of_hanging():
+    from ai.video_pipeline import run_pipeline
+
+    def emit(idx, result):
+        if idx == 3:
+            raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        run_pipeline(FakeCapture(50), infer=lambda f: None, emit=emit, queue_size=4)
+    with pytest.raises(RuntimeError, match="decoder died"):
+        run_pipeline(FailingCapture(50), infer=lambda f: None, emit=lambda i, r: None,
+                     queue_size=4)
+
+
+def test_background_subtraction_runs_headless():
+    from ai.detect_video import _detect_background_subtraction
+    out = FakeWriter()
+    timer, frames, _ = _detect_background_subtraction(FakeCapture(10), out, window=None)
+    assert frames == 10
+    assert len(out.written) == 10
+
+
+def test_fast_mog2_maps_boxes_to_full_resolution_and_roi():
+    from ai.fast_mog2 import FastMOG2
+    bg = np.full((1080, 1920, 3), 40, np.uint8)
+
+    def with_boxes(*boxes):
+        f = bg.copy()
+        for x, y, w, h in boxes:
+            f[y:y + h, x:x + w] = (0, 200, 255)
+        return f
+
+    full = FastMOG2()
+    roi  = FastMOG2(roi=(600, 400, 1400, 800), frame_size=(1920, 1080))
+    for _ in range(20):
+        full(bg)
+        roi(bg)
+    assert full.levels == roi.levels == 3          # both work at 1/8 scale
+
+    car, speck, outside = (800, 500, 200, 120), (300, 300, 30, 30), (1500, 100, 200, 120)
+    frame = with_boxes(car, speck, outside)
+    boxes = full(frame)
+    assert len(boxes) == 2                         # the 900 px speck is below the cutoff
+    got = boxes[np.argmin(np.abs(boxes[:, 0] - car[0]))]
+    assert np.abs(got - np.array(car)).max() <= 16
+
+    boxes = roi(frame)
+    assert len(boxes) == 1
+    assert np.abs(boxes[0] - np.array(car)).max() <= 16
+
+
+# ── Batched inference ─────────────────────────────────────────────────────────
+
+def test_batch_sizer_fixed_size():
+    from ai.batching import BatchSizer
+    sizer = BatchSizer(4)
+    for _ in range(10):
+        sizer.observe(4, 10.0)
+    assert sizer.current == 4 and sizer.settled
+
+
+def test_batch_sizer_grows_then_settles():
+    from ai.batching import BatchSizer
+    # 20 ms fixed overhead + 5 ms per frame: bigger batches keep getting
+    # cheaper per frame, but 16 frames (100 ms) breaks the 80 ms cap
+    cost  = lambda n: 0.020 + 0.005 * n                                  # noqa: E731
+    sizer = BatchSizer(0, max_batch=32, latency_cap_ms=80)
+    for _ in range(50):
+        sizer.observe(sizer.current, cost(sizer.current))
+    assert sizer.settled
+    assert sizer.current == 8
+    assert cost(sizer.current) <= 0.080
+
+
+def test_batch_sizer_shrinks_over_cap():
+    from ai.batching import BatchSizer
+    sizer = BatchSizer(0, max_batch=8, latency_cap_ms=1000)
+    for _ in range(30):
+        sizer.observe(sizer.current, 0.01 + 0.001 * sizer.current)
+    assert sizer.settled
+    before = sizer.current
+    sizer.observe(before, 2.0)                  # machine got busy
+    assert sizer.current == before // 2
+
+
+def test_pipeline_batched_keeps_order():
+    from ai.batching import BatchSizer
+    from ai.video_pipeline import run_pipeline
+    sizes, seen = [], []
+
+    def infer_batch(frames):
+        sizes.append(len(frames))
+        return [int(f[0, 0, 0]) for f in frames]
+
+    timer, frames, _ = run_pipeline(
+        FakeCapture(23), infer_batch=infer_batch,
+        annotate=lambda frame, result: seen.append(result),
+        out=FakeWriter(), batcher=BatchSizer(5),
+    )
+    assert frames == 23
+    assert seen == list(range(23))
+    assert sum(sizes) == 23 and max(sizes) <= 5
+    assert timer.summary()["infer"]["items"] == 23
+
+
+# ── Multi-stream ──────────────────────────────────────────────────────────────
+
+def test_multi_stream_shares_one_infer_call_per_batch():
+    from ai.multi_stream import MultiStreamDetector
+    calls, records = [], []
+
+    def infer_batch(items):
+        calls.append([sid for sid, _ in items])
+        return [int(f[0, 0, 0]) for _, f in items]
+
+    det = MultiStreamDetector(
+        [FakeCapture(12), FakeCapture(12), FakeCapture(12)], infer_batch,
+        count=lambda v: v, emit=records.append, max_batch=6,
+    )
+    stats = det.run()
+    assert [s.processed for s in stats] == [12, 12, 12]
+    assert all(s.dropped == 0 and s.stale == 0 for s in stats)
+    # Per stream, frames come out in order with their own counts
+    for name in {r["stream"] for r in records}:
+        frames = [r["frame"] for r in records if r["stream"] == name]
+        assert frames == sorted(frames) and len(frames) == 12
+    assert all(r["count"] == r["frame"] for r in records)
+    assert max(len(c) for c in calls) <= 6
+    assert all(r.cap.released for r in det.readers)
+
+
+def test_multi_stream_releases_every_capture_when_a_source_fails_to_open():
+    from ai.multi_stream import MultiStreamDetector
+    good, bad = FakeCapture(4), FakeCapture(4)
+    bad.isOpened = lambda: False
+    caps = {"cam_a.mp4": good, "cam_b.mp4": bad}
+    with pytest.raises(ValueError, match="cam_b.mp4"):
+        MultiStreamDetector(["cam_a.mp4", "cam_b.mp4"], lambda items: [], open_capture=caps.get)
+    assert good.released and bad.released
+
+
+def test_multi_stream_is_fair_to_slow_stream():
+    from ai.multi_stream import MultiStreamDetector
+    per_batch = []
+
+    def infer_batch(items):
+        per_batch.append([sid for sid, _ in items])
+        return [()] * len(items)
+
+    det = MultiStreamDetector([FakeCapture(200), FakeCapture(20, delay=0.005)],
+                              infer_batch, max_batch=4)
+    det.run()
+    # Whenever both streams had frames, neither took more than its share
+    mixed = [b for b in per_batch if 0 in b and 1 in b]
+    assert mixed and all(abs(b.count(0) - b.count(1)) <= 1 for b in mixed)
+    assert det.stats[1].processed == 20
+
+
+def test_multi_stream_realtime_drops_when_behind():
+    from ai.multi_stream import MultiStreamDetector
+
+    def slow_infer(items):
+        time.sleep(0.02)
+        return [()] * len(items)
+
+    # 500 fps sources against ~100 frames/s of inference
+    det = MultiStreamDetector([FakeCapture(60, frame_ms=2), FakeCapture(60, frame_ms=2)], slow_infer,
+                              max_batch=2, buffer=2, realtime=True)
+    stats = det.run()
+    for s in stats:
+        assert s.decoded == 60
+        assert s.processed + s.dropped == 60
+        assert s.dropped > 0
+
+
+# ── Headless output ───────────────────────────────────────────────────────────
+
+def test_count_sink_csv_and_jsonl(tmp_path):
+    import csv
+    import json
+    from ai.count_sink import CountSink
+    for name in ("counts.csv", "counts.jsonl"):
+        path = tmp_path / name
+        with CountSink(str(path)) as sink:
+            for i in range(3):
+                sink.write({"frame": i, "t": i * 0.04, "count": i + 1})
+        if name.endswith(".csv"):
+            rows = list(csv.DictReader(open(path)))
+            assert [r["count"] for r in rows] == ["1", "2", "3"]
+        else:
+            rows = [json.loads(line) for line in open(path)]
+            assert [r["count"] for r in rows] == [1, 2, 3]
+
+
+def test_pipeline_counts_only_skips_annotate_and_encode():
+    from ai.video_pipeline import run_pipeline
+    emitted, annotated = [], []
+    timer, frames, _ = run_pipeline(
+        FakeCapture(12), infer=lambda frame: int(frame[0, 0, 0]),
+        annotate=lambda frame, result: annotated.append(result),
+        out=None, window=None, emit=lambda idx, result: emitted.append((idx, result)),
+    )
+    assert frames == 12
+    assert emitted == [(i, i) for i in range(12)]
+    assert annotated == []
+    assert "encode" not in timer.summary()
+
+
+def test_pipeline_writes_every_kth_proxy_frame():
+    from ai.video_pipeline import run_pipeline
+
+    class SizeWriter(FakeWriter):
+        def write(self, frame):
+            self.written.append(frame.shape[:2])
+
+    out = SizeWriter()
+    run_pipeline(FakeCapture(10, shape=(40, 60, 3)), infer=lambda f: None,
+                 annotate=lambda f, r: None, out=out, write_every=3, proxy_scale=0.5)
+    assert out.written == [(20, 30)] * 4           # frames 0, 3, 6, 9
+
+
+# ── Motion gate ───────────────────────────────────────────────────────────────
+
+def test_motion_gate_skips_static_frames_and_carries_counts():
+    from ai.motion_gate import MotionGate, gated
+    still  = np.full((120, 160, 3), 60, np.uint8)
+    frames = [still.copy() for _ in range(40)]
+    calls  = []
+
+    def detector(batch):
+        calls.append(len(batch))
+        return [7] * len(batch)
+
+    gate  = MotionGate(threshold=0.01, max_interval=1000)
+    infer = gated(detector, gate)
+    out   = [c for f in frames for c in infer([f])]
+    assert out == [7] * 40                     # carried forward
+    assert gate.inferences < 5
+    assert gate.summary()["saved_fraction"] > 0.85
+
+
+def test_motion_gate_fires_on_motion_and_max_interval():
+    from ai.motion_gate import MotionGate
+    gate = MotionGate(threshold=0.01, max_interval=10)
+    bg   = np.full((120, 160, 3), 60, np.uint8)
+    for _ in range(30):
+        gate.should_infer(bg)
+    before = gate.inferences
+    assert before >= 3                         # forced roughly every 10 frames
+
+    moving = bg.copy()
+    moving[40:80, 60:120] = 255
+    assert gate.should_infer(moving)
+    assert gate.inferences == before + 1
+
+
+# ── Frame sampling ────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("mode", ["grab", "seek"])
+def test_stride_sampler_reads_one_frame_per_interval(mode):
+    from ai.frame_sampler import StrideSampler
+    sampler = StrideSampler(FakeCapture(100), interval_s=0.4, mode=mode)   # 25 fps → stride 10
+    got = []
+    while True:
+        ok, frame = sampler.read()
+        if not ok:
+            break
+        got.append(int(frame[0, 0, 0]))
+    assert got == list(range(0, 100, 10))
+    assert sampler.times == [i / 25 for i in range(0, 100, 10)]
+    assert sampler.decoded == 10
+
+
+def test_stride_sampler_adapts_to_traffic():
+    from ai.frame_sampler import StrideSampler
+    sampler = StrideSampler(FakeCapture(10), adaptive=True,
+                            min_interval_s=0.2, max_interval_s=2.0, low=2, high=12)
+    sampler.observe(0)
+    assert sampler.stride == 50
+    sampler.observe(20)
+    assert sampler.stride == 5
+    sampler.observe(7)
+    assert sampler.stride == round(1.1 * 25)
+
+
+def test_pipeline_over_sampler_emits_source_times():
+    from ai.frame_sampler import StrideSampler
+    from ai.video_pipeline import run_pipeline
+    sampler = StrideSampler(FakeCapture(60), interval_s=0.2, mode="grab")
+    seen = []
+    run_pipeline(sampler, infer=lambda f: int(f[0, 0, 0]), annotate=None,
+                 emit=lambda idx, r: seen.append((sampler.times[idx], r)))
+    assert seen == [(i / 25, i) for i in range(0, 60, 5)]
+
+
+# ── Approach ROIs ─────────────────────────────────────────────────────────────
+
+EXAMPLE_ROIS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data", "rois", "example.json")
+
+
+def test_points_in_polygon_matches_scalar_test():
+    from ai.approach_roi import points_in_polygon
+    tri = np.array([[0, 0], [10, 0], [0, 10]], dtype=float)
+    pts = np.array([[1, 1], [6, 6], [4, 4], [-1, 2], [2, 9]], dtype=float)
+    assert points_in_polygon(pts, tri).tolist() == [True, False, True, False, False]
+    assert points_in_polygon(np.zeros((0, 2)), tri).shape == (0,)
+
+
+def test_rois_crop_and_assign_to_approaches():
+    from ai.approach_roi import ApproachROIs
+    rois = ApproachROIs.load(EXAMPLE_ROIS).resolve(200, 100)
+    assert 0 < rois.crop_fraction() < 0.6
+    # One box per arm, expressed in the crop it was found in
+    frame_boxes = np.array([
+        [90, 10, 100, 30],      # north arm  → ns
+        [20, 45, 40, 55],       # west arm   → ew
+        [95, 45, 105, 55],      # junction box → outside every approach
+    ])
+    per_crop = []
+    for x0, y0, x1, y1, _ in rois.crops:
+        inside = ((frame_boxes[:, 0] >= x0) & (frame_boxes[:, 2] <= x1)
+                  & (frame_boxes[:, 1] >= y0) & (frame_boxes[:, 3] <= y1))
+        per_crop.append(frame_boxes[inside] - [x0, y0, x0, y0])
+    xyxy, labels = rois.merge_crop_detections(per_crop)
+    assert sorted(labels.tolist()) == [0, 1]
+    assert len(xyxy) == 2
+
+
+def test_approach_counter_reports_record_schema_with_queues():
+    from ai.approach_roi import ApproachCounter
+    counter = ApproachCounter(stop_px=2.0)
+    boxes   = np.array([[0, 0, 10, 10], [50, 50, 60, 60], [80, 0, 90, 10]])
+    labels  = np.array([0, 0, 1])
+    first   = counter.update(boxes, labels)
+    assert first == {"ns_count": 2, "ns_queue": 0, "ew_count": 1, "ew_queue": 0}
+    moved   = boxes + [[0, 0, 0, 0], [0, 20, 0, 20], [1, 0, 1, 0]]
+    second  = counter.update(moved, labels)
+    assert second == {"ns_count": 2, "ns_queue": 1, "ew_count": 1, "ew_queue": 1}
+
+    from simulation.ml_predictor import MLPredictor
+    MLPredictor().record(0, **second)          # same keyword schema
+
+
+def test_roi_infer_batches_all_crops_in_one_call():
+    from ai.approach_roi import ApproachROIs
+    from ai.detect_video import _roi_infer
+    rois  = ApproachROIs.load(EXAMPLE_ROIS).resolve(64, 48)
+    calls = []
+
+    def detect_crops(crops):
+        calls.append(len(crops))
+        return [np.zeros((0, 4)) for _ in crops]
+
+    out = _roi_infer(detect_crops, rois)([np.zeros((48, 64, 3), np.uint8)] * 3)
+    assert calls == [3 * len(rois.crops)]
+    assert [r[2]["ns_count"] for r in out] == [0, 0, 0]
+
+
+
+def test_roi_mosaic_is_one_detector_input_per_frame_and_maps_boxes_back():
+    from ai.approach_roi import ApproachROIs
+    from ai.detect_video import _roi_mosaic_infer
+    rois = ApproachROIs.load(EXAMPLE_ROIS).resolve(1280, 720)
+    assert len(rois.crops) == 4
+    mw, mh = rois.mosaic_size
+    assert max(mw, mh) < 1280 and rois.mosaic_gain() > 2
+
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    canvas = rois.mosaic(frame)
+    assert canvas.shape == (mh, mw, 3)
+    for (x0, y0, x1, y1, _), (tx, ty) in zip(rois.crops, rois.tiles):
+        assert np.array_equal(canvas[ty:ty + y1 - y0, tx:tx + x1 - x0], frame[y0:y1, x0:x1])
+
+    # One vehicle per arm, in frame coordinates, then placed on the mosaic
+    frame_boxes = np.array([[600, 100, 640, 160], [600, 500, 640, 560],
+                            [100, 330, 160, 360], [900, 330, 960, 360]])
+    mosaic_boxes = []
+    for box in frame_boxes:
+        for (x0, y0, x1, y1, _), (tx, ty) in zip(rois.crops, rois.tiles):
+            if x0 <= box[0] and box[2] <= x1 and y0 <= box[1] and box[3] <= y1:
+                mosaic_boxes.append(box - [x0, y0, x0, y0] + [tx, ty, tx, ty])
+    calls = []
+
+    def detect(mosaics):
+        calls.append([m.shape for m in mosaics])
+        return [np.array(mosaic_boxes) for _ in mosaics]
+
+    out = _roi_mosaic_infer(detect, rois)([frame, frame])
+    assert calls == [[(mh, mw, 3)] * 2]
+    xyxy, labels, counts = out[0]
+    assert sorted(map(tuple, xyxy.tolist())) == sorted(map(tuple, frame_boxes.tolist()))
+    assert counts["ns_count"] == 2 and counts["ew_count"] == 2
+
+    # Tiny frames: padding would make the mosaic bigger than the frame
+    assert ApproachROIs.load(EXAMPLE_ROIS).resolve(64, 48).mosaic_size is None
+
+
+# ── Line-crossing counter ─────────────────────────────────────────────────────
+
+def _lines_counter(**kw):
+    from ai.line_counter import LineCrossingCounter
+    lines = [{"direction": "N→S", "line": [[0.0, 0.5], [1.0, 0.5]]},
+             {"direction": "W→E", "line": [[0.5, 1.0], [0.5, 0.0]]}]
+    return LineCrossingCounter(lines, (100, 100), **kw)
+
+
+def test_line_counter_counts_each_vehicle_once():
+    counter = _lines_counter()
+    # One car driving down through y = 50, lingering around the line
+    ys = [20, 30, 40, 48, 52, 49, 53, 60, 70]
+    for f, y in enumerate(ys):
+        counter.update(np.array([[40, y - 10, 50, y]]), frame=f, t=f / 25)
+    assert counter.arrivals.tolist() == [1, 0]
+    # Per-frame counting would have said 9
+    assert counter.fields()["arrivals_sb"] == 1
+
+
+def test_line_counter_direction_and_parallel_tracks():
+    counter = _lines_counter()
+    for f in range(12):
+        boxes = np.array([
+            [10 + 8 * f, 10, 20 + 8 * f, 20],        # eastbound, crosses x = 50
+            [90 - 8 * f, 80, 100 - 8 * f, 90],       # westbound: wrong way for the W→E line
+        ])
+        counter.update(boxes, frame=f, t=f)
+    assert counter.arrivals.tolist() == [0, 1]
+
+
+def test_line_counter_external_ids_and_eviction():
+    counter = _lines_counter(max_age=3)
+    counter.update(np.array([[0, 30, 10, 40], [60, 0, 70, 10]]), frame=0, t=0, ids=[7, 9])
+    counter.update(np.array([[0, 50, 10, 60]]), frame=1, t=0.04, ids=[7])   # id 7 jumps the line
+    assert counter.arrivals.tolist() == [1, 0]
+    assert counter.n == 2
+    counter.update(np.zeros((0, 4)), frame=10, t=0.4)
+    assert counter.n == 0                                    # both evicted
+
+
+def test_line_counter_arrays_grow_and_rates():
+    from ai.line_counter import LineCrossingCounter
+    counter = LineCrossingCounter([{"direction": "N→S", "line": [[0, 0.5], [1, 0.5]]}],
+                                  (10000, 100), capacity=2, window_s=60)
+    # Car k appears at second 3k just above the line and crosses it a second later
+    for t in range(60):
+        k, phase = divmod(t, 3)
+        x = 200 * k
+        boxes = {0: [[x, 35, x + 10, 45]], 1: [[x, 45, x + 10, 55]]}.get(phase, [])
+        counter.update(np.array(boxes, dtype=float).reshape(-1, 4), frame=t, t=float(t))
+    assert counter.arrivals.tolist() == [20]
+    assert len(counter.ids) >= 2
+    rates = counter.spawn_rates()
+    assert set(rates) == {"N→S", "S→N", "E→W", "W→E"}
+    assert rates["N→S"] == pytest.approx(20 / 59 * 60, rel=0.05)
+    assert rates["S→N"] == 0.0
+
+
+# ── Detector backends ─────────────────────────────────────────────────────────
+
+def test_letterbox_and_postprocess_map_boxes_back_to_frame():
+    from ai.detector_backend import letterbox, postprocess
+    frames = [np.zeros((100, 200, 3), np.uint8), np.zeros((300, 150, 3), np.uint8)]
+    blob, scales, pads = letterbox(frames, 64)
+    assert blob.shape == (2, 3, 64, 64) and blob.dtype == np.float32
+    assert scales.tolist() == pytest.approx([0.32, 64 / 300])
+    # One car box per frame, expressed in letterboxed coordinates (cx, cy, w, h)
+    truth = np.array([[20, 30, 60, 70], [30, 60, 90, 150]], dtype=float)
+    out   = np.zeros((2, 4 + 8, 1), np.float32)
+    for b in range(2):
+        x1, y1, x2, y2 = truth[b] * scales[b] + np.tile(pads[b], 2)
+        out[b, :4, 0] = [(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1]
+        out[b, 4 + 2, 0] = 0.9                                       # class 2 = car
+    res = postprocess(out, scales, pads, [f.shape for f in frames], conf=0.4)
+    for b in range(2):
+        xyxy, cls, conf = res[b]
+        assert cls.tolist() == [2] and conf[0] == pytest.approx(0.9)
+        assert np.abs(xyxy[0] - truth[b]).max() <= 1
+
+
+def test_nms_is_class_aware_and_postprocess_filters_classes():
+    from ai.detector_backend import nms, postprocess
+    boxes  = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [0, 0, 10, 10], [50, 50, 60, 60]], float)
+    scores = np.array([0.9, 0.8, 0.7, 0.6])
+    assert sorted(nms(boxes, scores, 0.5).tolist()) == [0, 3]
+    assert sorted(nms(boxes, scores, 0.5, np.array([2, 2, 7, 2])).tolist()) == [0, 2, 3]
+
+    out = np.zeros((1, 4 + 8, 3), np.float32)
+    out[0, :4] = [[10, 30, 50], [10, 30, 50], [8, 8, 8], [8, 8, 8]]
+    out[0, 4 + 0, 0] = 0.95                                          # person: filtered
+    out[0, 4 + 7, 1] = 0.85                                          # truck: kept
+    out[0, 4 + 5, 2] = 0.30                                          # bus below conf
+    xyxy, cls, _ = postprocess(out, np.ones(1), np.zeros((1, 2)), [(64, 64, 3)], conf=0.4)[0]
+    assert cls.tolist() == [7] and xyxy.tolist() == [[26, 26, 34, 34]]
+
+
+def test_onnx_backend_runs_exported_graph(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import helper, TensorProto, numpy_helper
+    from ai.detector_backend import OnnxBackend
+
+    # Stand-in for an exported YOLOv8: a fixed prediction broadcast over the batch
+    pred = np.zeros((1, 4 + 8, 2), np.float32)
+    pred[0, :, 0] = [32, 32, 16, 16, 0, 0, 0.9, 0, 0, 0, 0, 0]       # car in the middle
+    pred[0, :, 1] = [10, 10, 8, 8, 0.9, 0, 0, 0, 0, 0, 0, 0]         # person: filtered
+    graph = helper.make_graph(
+        [helper.make_node("Flatten", ["images"], ["f"], axis=1),
+         helper.make_node("ReduceMean", ["f"], ["m"], axes=[1], keepdims=1),
+         helper.make_node("Unsqueeze", ["m", "axis2"], ["m3"]),             # (batch, 1, 1)
+         helper.make_node("Mul", ["m3", "zero"], ["z"]),
+         helper.make_node("Add", ["pred", "z"], ["output0"])],
+        "fake_yolo",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, 64, 64])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, None)],
+        [numpy_helper.from_array(pred, "pred"),
+         numpy_helper.from_array(np.zeros((1, 1, 1), np.float32), "zero"),
+         numpy_helper.from_array(np.array([2], np.int64), "axis2")])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    helper.set_model_props(model, {"names": "{0: 'person', 2: 'car'}"})
+    path = str(tmp_path / "yolov8n_64.onnx")
+    onnx.save(model, path)
+
+    backend = OnnxBackend(path, conf=0.4)
+    assert backend.batched and backend.imgsz == 64 and backend.names[2] == "car"
+    res = backend.detect([np.zeros((128, 128, 3), np.uint8), np.zeros((64, 128, 3), np.uint8)])
+    assert [r[1].tolist() for r in res] == [[2], [2]]
+    assert res[0][0].tolist() == [[48, 48, 80, 80]]                  # ×2 back to 128×128
+    assert res[1][0].tolist() == [[48, 16, 80, 48]]                  # 16 px vertical pad undone
+
+
+def test_int8_export_is_static_calibrated_and_keeps_the_head_tail_fp32(tmp_path, monkeypatch):
+    onnx = pytest.importorskip("onnx")
+    ort  = pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnxruntime.quantization")
+    from onnx import helper, TensorProto, numpy_helper
+    from ai import detector_backend as db
+
+    # Backbone conv + SiLU, then a head whose decode tail mixes pixels and scores
+    rng = np.random.default_rng(0)
+    w   = lambda *shape: numpy_helper.from_array(rng.normal(0, 0.3, shape).astype(np.float32))  # noqa: E731
+    inits = [w(4, 3, 3, 3), w(4, 4, 1, 1), w(8, 4, 1, 1),
+             numpy_helper.from_array(np.array(64, np.float32), "stride"),
+             numpy_helper.from_array(np.array([0, 12, -1], np.int64), "shape")]
+    for t, name in zip(inits, ("w0", "wbox", "wcls")):
+        t.name = name
+    graph = helper.make_graph(
+        [helper.make_node("Conv", ["images", "w0"], ["c0"], "/model.0/conv/Conv", pads=[1, 1, 1, 1]),
+         helper.make_node("Sigmoid", ["c0"], ["s0"], "/model.0/act/Sigmoid"),
+         helper.make_node("Mul", ["c0", "s0"], ["a0"], "/model.0/act/Mul"),
+         helper.make_node("Conv", ["a0", "wbox"], ["box"], "/model.1/cv2/Conv"),
+         helper.make_node("Conv", ["a0", "wcls"], ["cls"], "/model.1/cv3/Conv"),
+         helper.make_node("Mul", ["box", "stride"], ["px"], "/model.1/Mul"),
+         helper.make_node("Sigmoid", ["cls"], ["score"], "/model.1/Sigmoid"),
+         helper.make_node("Concat", ["px", "score"], ["cat"], "/model.1/Concat", axis=1),
+         helper.make_node("Reshape", ["cat", "shape"], ["output0"], "/model.1/Reshape")],
+        "fake_yolo",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, 64, 64])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, None)],
+        inits)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    helper.set_model_props(model, {"names": "{2: 'car'}"})
+    monkeypatch.setattr(db, "MODELS_DIR", str(tmp_path))
+    fp32 = db.onnx_path_for("yolov8n.pt", 64)
+    onnx.save(model, fp32)
+    onnx.save(model, db.onnx_path_for("yolov8n.pt", 64, int8=True))    # stale, untagged INT8 copy
+
+    video  = str(tmp_path / "calib.avi")
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 64))
+    frames = [rng.integers(0, 256, (64, 64, 3), dtype=np.uint8) for _ in range(8)]
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+    q8 = db.export_onnx("yolov8n.pt", 64, int8=True, calib=video)
+    assert db._is_static_int8(q8)
+    quant = onnx.load(q8)
+    tail  = {o for n in quant.graph.node if n.name in db._head_tail(model) for o in n.output}
+    qin   = {n.input[0] for n in quant.graph.node if n.op_type == "QuantizeLinear"}
+    assert qin and "images" in qin                                    # backbone runs INT8
+    assert not qin & tail and "output0" not in qin                    # decode tail stays fp32
+
+    blob = db.letterbox(frames[:2], 64)[0]
+    ref  = ort.InferenceSession(fp32, providers=["CPUExecutionProvider"]).run(None, {"images": blob})[0]
+    out  = ort.InferenceSession(q8, providers=["CPUExecutionProvider"]).run(None, {"images": blob})[0]
+    assert np.abs(out[:, 4:] - ref[:, 4:]).max() < 0.1                # scores keep their own range
+    assert np.abs(out[:, :4] - ref[:, :4]).mean() < 0.05 * np.abs(ref[:, :4]).mean()
+
+
+# ── Lazy model loading ────────────────────────────────────────────────────────
+
+class _FakeYOLO:
+    def __init__(self, classes):
+        self.classes = classes
+
+    def __call__(self, frame, verbose=False):
+        boxes = type("Boxes", (), {"cls": np.array(self.classes, dtype=float)})()
+        return [type("Result", (), {"boxes": boxes})()]
+
+
+def test_vehicle_detection_loads_lazily_once_and_unloads(monkeypatch):
+    import threading
+    from ai import vehicle_detection as vd
+    builds = []
+
+    def build(weights):
+        time.sleep(0.05)                       # widen the race window
+        builds.append(weights)
+        return _FakeYOLO([0, 1, 2, 2, 5, 7, 9, 3])
+
+    vd.unload()
+    monkeypatch.setattr(vd, "_YOLO_AVAILABLE", True)
+    monkeypatch.setattr(vd, "_build_model", build)
+    assert not vd.is_loaded() and vd.detect_vehicles(None) == 0
+
+    counts = []
+    threads = [threading.Thread(target=lambda: counts.append(vd.detect_vehicles(np.zeros((4, 4, 3)))))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counts == [6] * 4 and len(builds) == 1          # person + class 9 filtered out
+
+    assert vd.preload(pool_size=3) and len(builds) == 3
+    vd.unload()
+    assert not vd.is_loaded()
+
+
+def test_vehicle_detection_remembers_failed_load(monkeypatch):
+    from ai import vehicle_detection as vd
+    calls = []
+
+    def build(weights):
+        calls.append(weights)
+        raise RuntimeError("no weights")
+
+    vd.unload()
+    monkeypatch.setattr(vd, "_YOLO_AVAILABLE", True)
+    monkeypatch.setattr(vd, "_build_model", build)
+    assert vd.detect_vehicles(np.zeros((4, 4, 3))) == 0
+    assert vd.detect_vehicles(np.zeros((4, 4, 3))) == 0
+    assert len(calls) == 1
+    vd.unload()
+
+
+# ── Shared-memory count bridge ────────────────────────────────────────────────
+
+def test_count_bridge_round_trip_and_overrun():
+    from ai.count_bridge import CountBridge, BridgeReader, NO_VALUE
+    name = f"stc_test_{os.getpid()}"
+    late = BridgeReader(name=name)
+    assert late.poll() == []                                 # ring not created yet
+    with CountBridge.create(name, capacity=4) as bridge:
+        reader = bridge.reader()
+        bridge.publish({"frame": 7, "count": 3, "ns_count": 2, "ew_count": 1}, t_frame=1.5, camera=2)
+        bridge.publish({"count": 5, "rate_sb": 1.5, "rate_nb": 0, "rate_wb": 0, "rate_eb": 0})
+        recs = reader.poll()
+        assert [r["count"] for r in recs] == [3, 5]
+        assert recs[0]["frame"] == 7 and recs[0]["camera"] == 2 and recs[0]["t_frame"] == 1.5
+        assert recs[1]["ns_queue"] == NO_VALUE and recs[1]["has_rates"] == 1
+        assert recs[1]["rate_sb"] == pytest.approx(1.5)
+        assert reader.poll() == []
+
+        assert late.poll() == []                             # attaches, starts at head
+        for i in range(10):
+            bridge.publish({"count": i})
+        assert [r["count"] for r in reader.poll()] == [6, 7, 8, 9]
+        assert reader.lost == 6
+        assert [r["count"] for r in late.poll()] == [6, 7, 8, 9]
+        late.bridge.close()
+
+
+# ── Detection cache ───────────────────────────────────────────────────────────
+
+class _FakeBackend:
+    """Detector backend stand-in: one car box whose x follows the frame index."""
+
+    name  = "fake"
+    names = {2: "car"}
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, frames):
+        self.calls += len(frames)
+        out = []
+        for f in frames:
+            x = int(f[0, 0, 0]) % 40
+            out.append((np.array([[x, 20, x + 10, 30]]), np.array([2]), np.array([0.9])))
+        return out
+
+
+def test_detection_cache_replays_without_model(tmp_path, monkeypatch):
+    import csv
+    from ai import detect_video as dv
+
+    video = str(tmp_path / "clip.avi")
+    vw = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    for i in range(30):
+        vw.write(np.full((48, 64, 3), i * 8, np.uint8))
+    vw.release()
+
+    backend = _FakeBackend()
+    monkeypatch.setattr(dv, "resolve_backend", lambda *a, **k: ("fake", video))
+    monkeypatch.setattr(dv, "load_backend", lambda *a, **k: backend)
+    cache = str(tmp_path / "cache")
+    kw    = dict(headless=True, save_video=False, cache_dir=cache)
+
+    first = dv.run(video, counts_out=str(tmp_path / "a.csv"), **kw)
+    assert backend.calls == 30 and first["frames"] == 30
+    (entry,) = [os.path.join(d, f) for d, _, fs in os.walk(cache) for f in fs]
+    assert entry.endswith(".npz")
+
+    def no_model(*a, **k):
+        raise AssertionError("model loaded on replay")
+    monkeypatch.setattr(dv, "load_backend", no_model)
+    second = dv.run(video, counts_out=str(tmp_path / "b.csv"), **kw)
+    assert second["frames"] == 30
+    read = lambda name: list(csv.DictReader(open(tmp_path / name)))           # noqa: E731
+    assert read("a.csv") == read("b.csv")
+
+    # Downstream settings change freely on replay
+    sampled = dv.run(video, sample_every_s=0.2, sample_mode="grab", **kw)
+    assert sampled["frames"] == 6
+    roi = dv.run(video, rois=EXAMPLE_ROIS, counts_out=str(tmp_path / "c.csv"), **kw)
+    assert roi["frames"] == 30 and "ns_count" in read("c.csv")[0]
+
+
+def test_detection_cache_is_ignored_for_live_sources(tmp_path, monkeypatch, capsys):
+    from ai import detect_video as dv
+    backend = _FakeBackend()
+    monkeypatch.setattr(dv.cv2, "VideoCapture", lambda source: FakeCapture(5))
+    monkeypatch.setattr(dv, "load_backend", lambda *a, **k: backend)
+    cache = tmp_path / "cache"
+    for source in ("0", "rtsp://camera.local/stream"):
+        out = dv.run(source, headless=True, save_video=False, cache_dir=str(cache))
+        assert out["frames"] == 5
+    assert "cache ignored for live sources" in capsys.readouterr().out
+    assert not cache.exists() or not any(cache.rglob("*"))
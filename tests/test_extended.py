@@ -42,6 +42,154 @@ class TestLogger:
         logger.event("no_op", tick=0)
         logger.close()   # should not raise
 
+    def test_logger_writes_in_background_and_flushes(self):
+        tmpdir = tempfile.mkdtemp()
+        import simulation.logger as L
+        orig_dir = L.LOG_DIR
+        try:
+            L.LOG_DIR = tmpdir
+            logger = L.SimLogger(enabled=True)
+            for t in range(500):
+                logger.event("phase_change", tick=t, phase=t % 2, green_duration=30.2)
+            logger.snapshot(120, MockIntersection(), {"predicted_ns": 5.25})
+            logger.snapshot(121, MockIntersection(), {})          # not a snapshot tick
+            assert logger.flush(timeout=10)
+
+            with open(logger._event_path) as f:
+                events = list(csv.DictReader(f))
+            assert [int(r["sim_tick"]) for r in events] == list(range(500))
+            assert events[3]["details"] == "phase=1 | green_duration=30.2"
+            with open(logger._stats_path) as f:
+                snaps = list(csv.DictReader(f))
+            assert len(snaps) == 1
+            assert snaps[0]["avg_wait_s"] == "4.50" and snaps[0]["pred_ns"] == "5.25"
+
+            logger.close()
+            logger.event("after_close", tick=999)                  # dropped, no error
+            with open(logger._event_path) as f:
+                assert len(f.readlines()) == 501
+        finally:
+            L.LOG_DIR = orig_dir
+            shutil.rmtree(tmpdir)
+
+    def test_binary_logs_read_typed_and_convert_to_identical_csv(self):
+        import filecmp
+        import simulation.logger as L
+        from simulation.binlog import read_events, read_stats, csv_to_binary, binary_to_csv
+        tmpdir   = tempfile.mkdtemp()
+        orig_dir = L.LOG_DIR
+        try:
+            L.LOG_DIR = tmpdir
+            logs = [L.SimLogger(enabled=True), L.SimLogger(enabled=True, binary=True)]
+            for logger in logs:
+                logger.event("session_start", tick=0, mode="rush_hour")
+                for t in range(0, 600, 60):
+                    logger.event("phase_change", tick=t, phase=t // 60 % 2, adaptive_green_s=t / 8)
+                    logger.snapshot(t, MockIntersection(), {"predicted_ns": t / 3})
+                logger.event("pause_toggle", tick=601, paused=True)
+                logger.event("probe", tick=602, lane=3, note="new event")
+                logger.event("probe", tick=603, lane=4, extra=1.5)
+                logger.close()
+            text, binary = logs
+
+            events = read_events(binary._event_path)
+            assert events["phase_change"]["tick"].tolist() == list(range(0, 600, 60))
+            assert events["phase_change"]["adaptive_green_s"].dtype.kind == "f"
+            assert events["pause_toggle"]["paused"].tolist() == [True]
+            assert events["probe"]["note"].tolist() == ["new event", ""]
+            assert events["probe"]["extra"].tolist() == [0.0, 1.5]
+            stats = read_stats(binary._stats_path)
+            assert stats["sim_tick"].tolist() == list(range(0, 600, 60))
+            assert set(stats["signal_state"]) == {"green"}
+
+            for csv_path, bin_path in ((text._event_path, binary._event_path),
+                                       (text._stats_path, binary._stats_path)):
+                assert filecmp.cmp(binary_to_csv(bin_path, bin_path + ".csv"), csv_path, shallow=False)
+                back = binary_to_csv(csv_to_binary(csv_path, csv_path + ".bin"), csv_path + ".2.csv")
+                assert filecmp.cmp(back, csv_path, shallow=False)
+        finally:
+            L.LOG_DIR = orig_dir
+            shutil.rmtree(tmpdir)
+
+    def test_log_store_range_and_event_queries_match_a_scan(self):
+        import random
+        import simulation.logstore as LS
+        from simulation.binlog import BinaryEventLog, BinaryStatsLog
+        tmpdir     = tempfile.mkdtemp()
+        orig_every = LS.INDEX_EVERY
+        try:
+            LS.INDEX_EVERY = 16                      # many index blocks on a small log
+            rng   = random.Random(3)
+            ticks = sorted(rng.randrange(3000) for _ in range(400))
+            ticks[:50] = ticks[:50][::-1]            # out of order, as a late-logged event would be
+            kinds = ["phase_change", "emergency_preemption", "mode_change"]
+            recs  = [(1e9 + t, t, kinds[i % 7 % 3], {"phase": i % 4}) for i, t in enumerate(ticks)]
+            log   = BinaryEventLog(os.path.join(tmpdir, "events_s1.bin"))
+            log.write(recs)
+            log.close()
+            stats = BinaryStatsLog(os.path.join(tmpdir, "stats_s1.bin"))
+            stats.write([(1e9 + t, t, 1, 2, 0, 0, 1.5, 0, "green", 2.0, t, False, "normal", 0.0, 0.0)
+                         for t in range(0, 3000, 60)])
+            stats.close()
+
+            store = LS.LogStore(tmpdir)
+            assert store.sessions() == ["s1"]
+            for start, end in [(0, 2999), (100, 100), (500, 1500), (-5, 20), (2990, 4000), (1200, 1100)]:
+                for kind in (None, "emergency_preemption", "unknown"):
+                    got  = [(h["tick"], h["event"], h["details"]["phase"])
+                            for h in store.events(kind, start, end)]
+                    want = sorted(((t, e, kw["phase"]) for _, t, e, kw in recs
+                                   if start <= t <= end and kind in (None, e)), key=lambda r: r[0])
+                    assert got == want, (start, end, kind)
+            assert os.path.isdir(os.path.join(tmpdir, "events_s1.bin.idx"))
+
+            hits = store.incident("emergency_preemption", 1000, 1200, window=60)
+            for hit in hits:
+                assert all(abs(t - hit["tick"]) <= 60 for t in hit["stats"]["sim_tick"].tolist())
+                assert len(hit["stats"]["sim_tick"]) >= 2
+            assert store.describe()[0]["events"] == 400
+        finally:
+            LS.INDEX_EVERY = orig_every
+            shutil.rmtree(tmpdir)
+
+    def test_log_store_extends_a_live_session_index(self):
+        import simulation.logstore as LS
+        from simulation.binlog import BinaryEventLog
+        tmpdir     = tempfile.mkdtemp()
+        orig_every = LS.INDEX_EVERY
+        builds     = []
+        orig_build = LS.IndexedLog.build
+        try:
+            LS.INDEX_EVERY = 16
+            LS.IndexedLog.build = lambda self: (builds.append(self.path), orig_build(self))[1]
+            kinds = ["phase_change", "emergency_preemption"]
+            log   = BinaryEventLog(os.path.join(tmpdir, "events_live.bin"))
+            store = LS.LogStore(tmpdir)
+            recs  = []
+            for batch in range(6):                   # the simulation keeps logging between queries
+                new = [(1e9 + t, t, kinds[t % 5 == 0], {"phase": t % 4})
+                       for t in range(batch * 37, (batch + 1) * 37)]
+                if batch == 3:
+                    new.append((1e9, 5, "phase_change", {"phase": 1}))     # logged late
+                if batch == 4:
+                    new.append((1e9, 184, "lane_closed", {"lane": 2}))     # a new event type
+                log.write(new)
+                log.flush()
+                recs += new
+                for kind, start, end in [(None, 0, 10_000), ("emergency_preemption", 20, 170),
+                                         ("lane_closed", 0, 500), (None, 140, 160)]:
+                    got  = [(h["tick"], h["event"]) for h in store.events(kind, start, end)]
+                    want = sorted(((t, e) for _, t, e, _ in recs
+                                   if start <= t <= end and kind in (None, e)), key=lambda r: r[0])
+                    assert got == want, (batch, kind)
+            log.close()
+            # First query builds, the late record forces one rebuild; the rest extend
+            assert len(builds) == 2
+        finally:
+            LS.IndexedLog.build = orig_build
+            LS.INDEX_EVERY = orig_every
+            shutil.rmtree(tmpdir)
+
 
 # ── StatsCollector ────────────────────────────────────────────────────────────
 
@@ -116,6 +264,80 @@ def test_stats_summary_empty():
     sc.summary()   # should not raise on empty data
 
 
+def test_stats_ring_wraps_and_last_n_is_a_view():
+    from simulation.stats import StatsCollector
+    mock = MockIntersection()
+    sc   = StatsCollector(capacity=8)
+    for t in range(20):
+        mock.mode = "rush_hour" if t % 2 else "normal"
+        sc.record(t, mock, {})
+
+    assert len(sc) == 8
+    recent = sc.last_n(5)
+    assert recent["tick"].tolist() == [15, 16, 17, 18, 19]
+    assert recent["tick"].base is not None and not recent["tick"].flags.writeable
+    assert sc.last_n(100)["tick"].tolist() == list(range(12, 20))
+    assert list(sc.decoded(recent)["mode"]) == ["rush_hour", "normal", "rush_hour", "normal", "rush_hour"]
+    assert sc.records[0]["tick"] == 12 and sc.records[0]["signal_state"] == "green"
+    assert sc._compute_summary()["total_ticks"] == 8
+
+
+def test_stats_spill_keeps_the_full_run():
+    from simulation.stats import StatsCollector, read_spill
+    tmpdir = tempfile.mkdtemp()
+    try:
+        mock  = MockIntersection()
+        path  = os.path.join(tmpdir, "run.csv")
+        spill = StatsCollector(capacity=10, spill=path, chunk=4)
+        raw   = StatsCollector(capacity=10, spill=os.path.join(tmpdir, "run.bin"), chunk=4)
+        full  = StatsCollector(capacity=100)
+        for t in range(35):
+            mock.total_vehicles_passed = t
+            for sc in (spill, raw, full):
+                sc.record(t, mock, {"predicted_ns": t / 7})
+        assert len(spill) == 10                          # memory stays at the ring size
+        assert spill._compute_summary() == full._compute_summary()
+        spill.close()
+        raw.close()
+
+        with open(path) as f:
+            rows = list(csv.DictReader(f))
+        assert [r["tick"] for r in rows] == [str(t) for t in range(35)]
+        full.export_csv(os.path.join(tmpdir, "full.csv"))
+        with open(os.path.join(tmpdir, "full.csv")) as f:
+            assert list(csv.DictReader(f)) == rows
+        cols = read_spill(os.path.join(tmpdir, "run.bin"))
+        assert cols["total_passed"].tolist() == list(range(35))
+        assert set(cols["mode"]) == {"normal"}
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_stats_spill_reads_back_before_close():
+    import time
+    from simulation.stats import StatsCollector, read_spill
+    tmpdir = tempfile.mkdtemp()
+    try:
+        mock  = MockIntersection()
+        path  = os.path.join(tmpdir, "run.bin")
+        stats = StatsCollector(capacity=10, spill=path, chunk=4)
+        assert read_spill(path)["tick"].tolist() == []       # header exists from the start
+        for t in range(14):
+            mock.mode = "normal" if t < 6 else "rush_hour"    # a new label mid-run
+            stats.record(t, mock, {})
+        deadline = time.monotonic() + 5
+        while stats.sink.rows < 12 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with open(path, "ab") as f:
+            f.write(b"torn")                                   # killed mid-record
+        cols = read_spill(path)                                # no close(): as after a crash
+        assert cols["tick"].tolist() == list(range(12))
+        assert cols["mode"].tolist() == ["normal"] * 6 + ["rush_hour"] * 6
+        stats.close()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
 # ── ML Predictor edge cases ───────────────────────────────────────────────────
 
 def test_predictor_retrain_trigger():
@@ -130,6 +352,25 @@ def test_predictor_retrain_trigger():
     assert isinstance(pred, dict)
 
 
+def test_predictor_retrains_off_the_simulation_thread():
+    import time
+    from simulation.ml_predictor import MLPredictor, ML_AVAILABLE
+    if not ML_AVAILABLE:
+        return
+    p      = MLPredictor()
+    before = p._bundle
+    p.retrain_every = 10
+    slowest = 0.0
+    for t in range(10):
+        t0 = time.perf_counter()
+        p.record(t, ns_count=t % 8, ew_count=(t + 2) % 6, ns_queue=1, ew_queue=0)
+        slowest = max(slowest, time.perf_counter() - t0)
+    assert p._training is not None                  # the fit was handed to a thread
+    assert slowest < 0.05                           # a synchronous fit takes ~150 ms
+    p.wait_for_training(timeout=30)
+    assert p._bundle is not before and p.trained
+
+
 def test_predictor_get_history():
     from simulation.ml_predictor import MLPredictor
     p = MLPredictor()
@@ -141,6 +382,218 @@ def test_predictor_get_history():
     assert len(ew_hist) > 0
 
 
+def test_predictor_multi_horizon():
+    from simulation.ml_predictor import MLPredictor
+    p = MLPredictor()
+    traj = p.predict_horizons(500)
+    assert list(traj["horizons"]) == sorted(traj["horizons"])
+    assert len(traj["predicted_ns"]) == len(traj["horizons"])
+    assert len(traj["predicted_ew"]) == len(traj["horizons"])
+    assert all(v >= 0 for v in traj["predicted_ns"])
+
+
+def test_predictor_batch_matches_single():
+    from simulation.ml_predictor import MLPredictor
+    p     = MLPredictor()
+    feats = p.feature_matrix()
+    assert feats.shape == (len(p.history_ns) - 120, MLPredictor.N_FEATURES)
+
+    out = p.predict_batch(feats)
+    assert out["predicted_ns"].shape == (len(feats), len(p.horizons))
+
+    single = p.predict_horizons(9999)
+    batch  = p.predict_batch([p._extract_latest_features(9999)] * 3)
+    assert all(abs(a - b) < 1e-9 for a, b in zip(single["predicted_ns"], batch["predicted_ns"][2]))
+
+
+def test_predictor_interval_brackets_forecast():
+    from simulation.ml_predictor import MLPredictor, _tree_predictions
+    p = MLPredictor()
+    assert p.trained
+    pred = p.predict(500)
+    for axis in ("ns", "ew"):
+        assert pred[f"lower_{axis}"] <= pred[f"predicted_{axis}"] <= pred[f"upper_{axis}"]
+    assert 0.0 <= pred["confidence"] <= 1.0
+
+    # Vectorised tree walk must agree with sklearn's own forest average
+    X   = p.feature_matrix()
+    ref = p.model_ns.predict(p.scaler_ns.transform(X))
+    assert abs(_tree_predictions(p._forest["ns"], X).mean(axis=0) - ref).max() < 1e-9
+
+
+def test_predictor_low_traffic_forecast_has_confidence():
+    from simulation.ml_predictor import MLPredictor, _confidence
+    p    = MLPredictor()
+    pred = p.predict(500)
+    assert pred["predicted_ns"] < 5 and pred["predicted_ew"] < 5
+    assert pred["confidence"] > 0.0
+    # ±1.5 vehicles around a 1.5-vehicle forecast is a usable prediction
+    assert _confidence(1.5, 0.0, 3.0) > 0.5
+    assert _confidence(1.5, 0.0, 3.0) == _confidence(0.2, 0.0, 3.0)
+    assert _confidence(40.0, 30.0, 50.0) == 0.75
+
+
+def test_adaptive_green_plans_on_upper_bound():
+    from simulation.traffic_light import IntersectionController
+    ctrl = IntersectionController()
+    pred = {"predicted_ns": 2.0, "upper_ns": 12.0, "predicted_ew": 2.0, "upper_ew": 12.0}
+    base = ctrl._compute_adaptive_green([], pred)
+    ctrl.plan_on_upper = True
+    assert ctrl._compute_adaptive_green([], pred) > base
+
+
+# ── Model hot reload ──────────────────────────────────────────────────────────
+
+class RecordingLogger:
+    def __init__(self):
+        self.events = []
+
+    def event(self, event_type, tick=0, **kwargs):
+        self.events.append((event_type, tick, kwargs))
+
+
+def test_model_watcher_hot_swaps_new_bundle():
+    import pickle
+    from simulation.ml_predictor import MLPredictor
+    from simulation.model_watcher import ModelWatcher
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        live    = MLPredictor()
+        tuned   = MLPredictor()
+        watcher = ModelWatcher(model_dir=tmpdir)
+        log     = RecordingLogger()
+
+        tuned.save(os.path.join(tmpdir, "ml_predictor.pkl"))
+        with open(os.path.join(tmpdir, "ml_predictor_bad.pkl"), "wb") as f:
+            pickle.dump({"schema": "something_else"}, f)
+
+        watcher.scan()
+        assert watcher.apply(live, log, tick=42)
+        assert live.online_training is False
+        assert live.model_version == tuned.model_version
+        assert isinstance(live.predict(100)["predicted_ns"], float)
+
+        kinds = [e[0] for e in log.events]
+        assert "model_reload" in kinds and "model_rejected" in kinds
+        assert all(e[1] == 42 for e in log.events)
+
+        watcher.scan()                                 # nothing new on disk
+        assert not watcher.apply(live, log, tick=43)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+# ── Prediction server ─────────────────────────────────────────────────────────
+
+def test_prediction_server_batches_concurrent_requests():
+    import asyncio
+    import socket
+    if not hasattr(socket, "AF_UNIX"):
+        return
+    from ai.prediction_server import PredictionServer, ModelRegistry, AsyncPredictionClient
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        address  = os.path.join(tmpdir, "p.sock")
+        registry = ModelRegistry(offline_path=None)
+        server   = PredictionServer(address, registry, max_batch=16, max_delay_ms=20)
+        rows     = registry.live.feature_matrix()[:8]
+
+        async def scenario():
+            await server.start()
+            client  = await AsyncPredictionClient(address).connect()
+            results = await asyncio.gather(*(client.predict(r) for r in rows))
+            bad     = await client.predict(rows[0], model="offline")
+            await client.close()
+            await server.stop()
+            return results, bad
+
+        results, bad = asyncio.run(scenario())
+        direct = registry.live.predict_batch(rows)["predicted_ns"]
+        assert [r["predicted_ns"] for r in results] == direct.tolist()
+        assert server.batcher.batches < len(rows)
+        assert "error" in bad
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_prediction_server_serves_and_reloads_live_bundles():
+    from simulation.ml_predictor import MLPredictor
+    from simulation.model_watcher import ModelWatcher
+    from ai.prediction_server import ModelRegistry, MicroBatcher, newest_live_bundle
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        saved = MLPredictor()
+        path  = os.path.join(tmpdir, "ml_predictor.pkl")
+        saved.save(path)
+        assert newest_live_bundle(tmpdir) == path
+
+        watcher  = ModelWatcher(model_dir=tmpdir)
+        registry = ModelRegistry(offline_path=None, live_bundle=path, watcher=watcher)
+        assert registry.live.model_version == saved.model_version
+        assert registry.live.online_training is False
+
+        tuned = MLPredictor()
+        tuned._bundle["version"] = "tuned"                  # versions are per second
+        tuned.save(os.path.join(tmpdir, "ml_predictor_tuned.pkl"))
+        watcher.scan()
+        rows = registry.live.feature_matrix()[:2].tolist()
+        MicroBatcher(registry)._dispatch([])                # swaps between batches
+        assert registry.live.model_version == "tuned"
+        assert registry.predict("live", rows) == ModelRegistry(
+            offline_path=None, live=tuned).predict("live", rows)
+        registry.close()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_prediction_server_isolates_bad_requests_in_a_batch():
+    import asyncio
+    import socket
+    if not hasattr(socket, "AF_UNIX"):
+        return
+    from ai.prediction_server import PredictionServer, ModelRegistry, AsyncPredictionClient
+
+    class Flaky(ModelRegistry):
+        """Fails any batched call that contains a poisoned row."""
+        def predict(self, kind, rows):
+            if len(rows) > 1 and any(r[0] == -999 for r in rows):
+                raise RuntimeError("batch failed")
+            if rows[0][0] == -999:
+                raise RuntimeError("poisoned row")
+            return super().predict(kind, rows)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        address  = os.path.join(tmpdir, "p.sock")
+        registry = Flaky(offline_path=None)
+        server   = PredictionServer(address, registry, max_batch=16, max_delay_ms=20)
+        rows     = registry.live.feature_matrix()[:3].tolist()
+        short    = rows[1][:11]
+        poisoned = [-999.0] + rows[2][1:]
+
+        async def scenario():
+            await server.start()
+            client = await AsyncPredictionClient(address).connect()
+            first  = await asyncio.gather(client.predict(rows[0]), client.predict(short),
+                                          client.predict(rows[2]))
+            second = await asyncio.gather(client.predict(rows[0]), client.predict(poisoned),
+                                          client.predict(rows[1]))
+            await client.close()
+            await server.stop()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert "predicted_ns" in first[0] and "predicted_ns" in first[2]
+        assert "expects 12 features, got 11" in first[1]["error"] and first[1]["id"] is not None
+        assert "predicted_ns" in second[0] and "predicted_ns" in second[2]
+        assert second[1]["error"] == "poisoned row"
+    finally:
+        shutil.rmtree(tmpdir)
+
+
 # ── Config completeness ───────────────────────────────────────────────────────
 
 def test_all_color_keys_are_tuples():
@@ -180,20 +633,231 @@ def test_generate_data_script():
         os.unlink(tmpf.name)
 
 
+def test_generate_data_deterministic_across_workers():
+    from scripts.generate_data import generate
+    tmpdir = tempfile.mkdtemp()
+    try:
+        serial   = os.path.join(tmpdir, "serial.csv")
+        parallel = os.path.join(tmpdir, "parallel.csv")
+        generate(days=3, out_path=serial,   seed=7, ticks_per_hour=12, workers=1)
+        generate(days=3, out_path=parallel, seed=7, ticks_per_hour=12, workers=2)
+        with open(serial) as a, open(parallel) as b:
+            assert a.read() == b.read()
+        with open(serial) as f:
+            rows = list(csv.DictReader(f))
+        assert [int(r["tick"]) for r in rows] == list(range(3 * 12 * 24))
+        assert {r["signal_state"] for r in rows} <= {"green", "yellow", "all_red"}
+        assert all(float(r["avg_wait_s"]) >= 0 for r in rows)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+# ── Batch detection ───────────────────────────────────────────────────────────
+
+def test_batch_detect_resumes_and_writes_history_schema():
+    import cv2
+    import numpy as np
+    from scripts.batch_detect import run_batch
+    from scripts.generate_data import COLUMNS
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        clips = os.path.join(tmpdir, "clips")
+        os.makedirs(clips)
+        for name in ("cam_20240301_073000.avi", "cam_20240302_180000.avi"):
+            vw = cv2.VideoWriter(os.path.join(clips, name), cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+            for i in range(40):
+                vw.write(np.full((48, 64, 3), i * 5, np.uint8))
+            vw.release()
+        rois = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data", "rois", "example.json")
+        out  = os.path.join(tmpdir, "out")
+
+        first = run_batch(clips, out, rois=rois, workers=2, sample_every_s=1.0, ticks_per_hour=3600)
+        assert first["processed"] == 2 and not first["failed"]
+        with open(first["output"]) as f:
+            reader = csv.DictReader(f)
+            rows   = list(reader)
+        assert reader.fieldnames == COLUMNS
+        assert len(rows) == 8                              # 4 s per clip at 1 tick/s
+        assert [(r["day"], r["hour"], r["minute"]) for r in rows][::4] == [("0", "7", "30"), ("1", "18", "0")]
+        assert rows[4]["tick"] == str(86400 + 18 * 3600)
+
+        again = run_batch(clips, out, rois=rois, workers=2, ticks_per_hour=3600)
+        assert again["skipped"] == 2 and again["processed"] == 0 and again["rows"] == 8
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_batch_detect_keeps_cameras_apart_and_unobserved_columns_empty():
+    import numpy as np
+    import pandas as pd
+    from scripts.batch_detect import consolidate
+    from ai.traffic_predictor import preprocess
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        parts = os.path.join(tmpdir, "parts")
+        os.makedirs(parts)
+        t0 = 1709278200.0                                 # both junctions, same seconds
+        for cam, ns in (("north_jct", 2), ("south_jct", 10)):
+            pd.DataFrame({"ts": t0 + np.arange(4), "ns_count": ns, "ew_count": 1, "ns_queue": 0,
+                          "ew_queue": 0, "video": f"{cam}.mp4", "camera": cam}
+                         ).to_csv(os.path.join(parts, f"{cam}.csv"), index=False)
+        written = consolidate(parts, os.path.join(tmpdir, "traffic_history.csv"), ticks_per_hour=3600)
+        assert sorted(written) == ["north_jct", "south_jct"]
+        north = pd.read_csv(written["north_jct"][0])
+        south = pd.read_csv(written["south_jct"][0])
+        assert north["ns_count"].tolist() == [2] * 4 and south["ns_count"].tolist() == [10] * 4
+        assert north[["signal_phase", "signal_state", "emergency", "avg_wait_s"]].isna().all().all()
+
+        # Mixed with generated history, the empty columns must not become features
+        generated = north.assign(signal_phase=1, signal_state="green", emergency=0, avg_wait_s=3.5)
+        _, _, features, _ = preprocess(pd.concat([generated, south], ignore_index=True))
+        assert not {"signal_phase", "signal_state", "emergency", "avg_wait_s"} & set(features)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+# ── Synthetic video + detection benchmark ───────────────────────────────────
+
+def test_synth_video_is_deterministic_and_scores_a_perfect_detector():
+    import numpy as np
+    from ai.approach_roi import ApproachROIs
+    from scripts.synth_video import render_clip, load_truth
+    from scripts.bench_detection import score
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        kw   = dict(frames=12, seed=5, scale=1.0, warmup_s=10.0)
+        a    = render_clip(os.path.join(tmpdir, "a.avi"), **kw)
+        b    = render_clip(os.path.join(tmpdir, "b.avi"), **kw)
+        with open(a["truth"]) as fa, open(b["truth"]) as fb:
+            assert fa.read() == fb.read()
+        truth = load_truth(a["video"])
+        assert len(truth) == 12 and a["size"] == (460, 430)
+        assert sum(r["count"] for r in truth) > 0
+        for r in truth:
+            assert r["count"] == sum(r["visible"]) == r["ns_count"] + r["ew_count"]
+            assert len(r["boxes"]) == len(r["cls"]) == len(r["direction"])
+
+        rois = ApproachROIs.load(a["rois"]).resolve(*a["size"])
+        assert rois.names == ["ns", "ns", "ew", "ew"]
+        with open(a["rois"]) as f:
+            assert len(json.load(f)["stop_lines"]) == 4
+
+        frames = iter(truth)
+
+        def oracle(frame):                               # the visible ground-truth boxes
+            r = next(frames)
+            return np.array(r["boxes"]).reshape(-1, 4)[np.array(r["visible"], bool)]
+
+        s = score(a["video"], truth, oracle, warmup=0, iou=0.5)
+        assert s["frames"] == 12
+        assert s["mae"] == 0 and s["recall"] == 1.0 and s["precision"] == 1.0
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+# ── Measured arrival rates ────────────────────────────────────────────────────
+
+def test_intersection_spawns_from_arrival_rates():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import random
+    from collections import Counter
+    from simulation.config import FPS
+    from simulation.intersection import Intersection
+
+    random.seed(3)
+    inter = Intersection()
+    inter.set_arrival_rates({"N→S": 30.0, "E→W": 0.0})
+    for _ in range(FPS * 60 * 5):
+        inter._maybe_spawn()
+    spawned = Counter(v.direction for v in inter.vehicles)
+    assert 115 < spawned["N→S"] < 185          # 150 expected, Poisson σ ≈ 12
+    assert spawned["E→W"] == spawned["S→N"] == spawned["W→E"] == 0
+
+    inter.set_arrival_rates(None)               # back to mode-based spawning
+    for _ in range(FPS * 10):
+        inter._maybe_spawn()
+    assert Counter(v.direction for v in inter.vehicles)["W→E"] > 0
+
+
+def test_intersection_live_source_tops_up_approaches():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import time
+    from simulation.config import FPS
+    from simulation.intersection import Intersection
+
+    class Source:
+        def __init__(self):
+            self.pending = []
+
+        def poll(self):
+            out, self.pending = self.pending, []
+            return out
+
+    def rec(ns, ew, **kw):
+        return {"t_frame": time.monotonic() - 0.02, "count": ns + ew, "ns_count": ns,
+                "ew_count": ew, "has_rates": 0, **kw}
+
+    src   = Source()
+    inter = Intersection()
+    inter.set_live_source(src)
+    src.pending = [rec(1, 1), rec(3, 2)]          # only the newest record is used
+    for _ in range(FPS):
+        inter._maybe_spawn()
+    dens = inter.current_density()
+    assert (dens["ns"], dens["ew"]) == (3, 2)
+    lat = inter.live_latency()
+    assert lat["n"] == 1 and 20 <= lat["p50_ms"] < 1000
+
+    src.pending = [rec(0, 0, has_rates=1, rate_sb=12.0, rate_nb=0.0, rate_wb=0.0, rate_eb=6.0)]
+    inter._maybe_spawn()
+    assert inter.arrival_rates == {"N→S": 12.0, "S→N": 0.0, "E→W": 0.0, "W→E": 6.0}
+    assert inter.live_targets is None
+
+    inter.set_live_source(None)
+    assert inter.arrival_rates is None
+
+
 # ── Manual runner ─────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
     tests = [
         ("logger_creates_files",   TestLogger().test_logger_creates_files),
         ("logger_disabled",        TestLogger().test_logger_disabled),
+        ("logger_background",      TestLogger().test_logger_writes_in_background_and_flushes),
+        ("logger_binary",          TestLogger().test_binary_logs_read_typed_and_convert_to_identical_csv),
+        ("log_store_queries",      TestLogger().test_log_store_range_and_event_queries_match_a_scan),
+        ("log_store_live_index",   TestLogger().test_log_store_extends_a_live_session_index),
         ("stats_record_export",    test_stats_record_and_export),
         ("stats_export_json",      test_stats_export_json),
         ("stats_summary_empty",    test_stats_summary_empty),
+        ("stats_ring_last_n",      test_stats_ring_wraps_and_last_n_is_a_view),
+        ("stats_spill_full_run",   test_stats_spill_keeps_the_full_run),
+        ("stats_spill_mid_run",    test_stats_spill_reads_back_before_close),
         ("predictor_retrain",      test_predictor_retrain_trigger),
+        ("predictor_retrain_bg",   test_predictor_retrains_off_the_simulation_thread),
         ("predictor_get_history",  test_predictor_get_history),
+        ("predictor_multi_horizon", test_predictor_multi_horizon),
+        ("predictor_batch",        test_predictor_batch_matches_single),
+        ("predictor_interval",     test_predictor_interval_brackets_forecast),
+        ("predictor_low_conf",     test_predictor_low_traffic_forecast_has_confidence),
+        ("plan_on_upper",          test_adaptive_green_plans_on_upper_bound),
+        ("model_hot_reload",       test_model_watcher_hot_swaps_new_bundle),
+        ("prediction_server",      test_prediction_server_batches_concurrent_requests),
+        ("prediction_server_bad",  test_prediction_server_isolates_bad_requests_in_a_batch),
+        ("prediction_server_live", test_prediction_server_serves_and_reloads_live_bundles),
         ("color_keys_valid",       test_all_color_keys_are_tuples),
         ("vehicle_types_complete", test_vehicle_types_complete),
         ("generate_data_script",   test_generate_data_script),
+        ("generate_data_workers",  test_generate_data_deterministic_across_workers),
+        ("batch_detect_resume",    test_batch_detect_resumes_and_writes_history_schema),
+        ("batch_detect_cameras",   test_batch_detect_keeps_cameras_apart_and_unobserved_columns_empty),
+        ("synth_video_benchmark",  test_synth_video_is_deterministic_and_scores_a_perfect_detector),
+        ("arrival_rate_spawning",  test_intersection_spawns_from_arrival_rates),
+        ("live_source_spawning",   test_intersection_live_source_tops_up_approaches),
     ]
 
     passed = 0
@@ -130,6 +130,21 @@ class TestTrafficPredictor:
         loaded_pred   = loaded.predict([[8, 1]])[0]
         assert original_pred == loaded_pred, "Saved/loaded model should give identical predictions"
 
+    def test_multi_horizon_forecast(self, sample_df):
+        from traffic_predictor import make_horizon_targets, train_multi_horizon, forecast
+
+        X = sample_df[["hour", "day_of_week"]].values
+        y = sample_df["vehicle_count"].values
+
+        Y = make_horizon_targets(y, [1, 3])
+        assert Y.shape == (len(y) - 3, 2)
+        assert Y[0, 0] == y[1] and Y[0, 1] == y[3]
+
+        model = train_multi_horizon(X, y, horizons=[1, 3])
+        preds = forecast(model, X[:4])
+        assert set(preds) == {1, 3}
+        assert all(len(v) == 4 for v in preds.values())
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # 3.  Simulation — Traffic Light logic